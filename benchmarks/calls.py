@@ -0,0 +1,71 @@
+"""
+Measure client side overhead of small API calls (validation,
+request encoding and response decoding) without any network::
+
+    python -m benchmarks.calls --seconds 2
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import json
+import random
+import re
+from timeit import default_timer
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.transport import LocalTransport
+
+from .payloads import photo, response
+from .run import AUTH, calls_per_second
+
+
+class Responder(object):
+    """
+    :class:`LocalTransport` handler which returns a response
+    with the id of the request hence responses pass validation.
+    """
+
+    def __init__(self, result):
+        self.content = json.dumps(response(result, request_id=0))
+
+    def __call__(self, method, url, params, data, headers):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        request_id = re.search(r'"id": ?(\d+)', data).group(1)
+        # only the id differs between responses
+        return self.content.replace('"id": 0', '"id": ' + request_id, 1)
+
+
+def run(seconds):
+    api = PyZenfolio(auth=AUTH)
+    photo_result = photo(random.Random(0), 1)
+
+    benchmarks = {
+        'UpdatePhoto': (photo_result, lambda: api.UpdatePhoto(
+            1, {'Title': 'Title', 'Caption': 'Caption', 'Keywords': ['a', 'b']})),
+        'UpdatePhotoSet': (None, lambda: api.UpdatePhotoSet(
+            2, {'Title': 'Title', 'Keywords': ['a', 'b']})),
+        'UpdatePhotoSetAccess': (None, lambda: api.UpdatePhotoSetAccess(
+            2, {'AccessMask': 'ProtectOriginals', 'AccessType': 'Public'})),
+        'LoadPhoto': (photo_result, lambda: api.LoadPhoto(1)),
+    }
+
+    results = {}
+    for name, (result, call) in sorted(benchmarks.items()):
+        api.transport = LocalTransport(Responder(result))
+        results['calls.{0}.calls_per_second'.format(name)] = calls_per_second(call, seconds)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=2)
+    args = parser.parse_args()
+
+    started = default_timer()
+    for name, value in sorted(run(args.seconds).items()):
+        print('{0:45} {1:>12.0f}'.format(name, value))
+    print('total {0:.1f}s'.format(default_timer() - started))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Compare response decoding of the two pass ``AttrDict`` +
+``convert_to_datetime`` path with the single pass ``decode_json``::
+
+    python -m benchmarks.decode --photos 10000
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import json
+import timeit
+
+from pyzenfolio.utils import AttrDict, convert_to_datetime, decode_json
+
+from .payloads import photos, response
+
+
+def two_pass_decode(content):
+    return convert_to_datetime(AttrDict(json.loads(content)))
+
+
+def run(count, repeat):
+    content = json.dumps(response(photos(count))).encode('utf-8')
+    assert two_pass_decode(content) == decode_json(content)
+
+    results = {}
+    for name, decode in (('two_pass', two_pass_decode), ('single_pass', decode_json)):
+        results[name] = min(timeit.repeat(lambda: decode(content), number=1, repeat=repeat))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--photos', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.photos, args.repeat)
+    for name, seconds in sorted(results.items()):
+        print('{0:12} {1:8.1f} ms  {2:6.2f} ms/1k photos'.format(
+            name, seconds * 1000, seconds * 1000 * 1000 / args.photos))
+    print('speedup      {0:8.2f}x'.format(results['two_pass'] / results['single_pass']))
+
+
+if __name__ == '__main__':
+    main()
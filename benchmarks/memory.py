@@ -0,0 +1,55 @@
+"""
+Measure memory used per decoded photo with ``AttrDict``s and with
+``__slots__`` based :mod:`pyzenfolio.models`::
+
+    python -m benchmarks.memory --photos 10000
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import gc
+import json
+import tracemalloc
+
+import six
+
+from pyzenfolio.models import INTERNED, decode_model
+from pyzenfolio.utils import decode_json, decode_object
+
+from .payloads import photos
+
+
+def measure(content, hook):
+    if six.PY2:
+        INTERNED.clear()
+    gc.collect()
+    tracemalloc.start()
+    snapshot = tracemalloc.take_snapshot()
+    decoded = decode_json(content, hook)
+    gc.collect()
+    size = sum(i.size_diff for i in tracemalloc.take_snapshot().compare_to(snapshot, 'filename'))
+    tracemalloc.stop()
+    del decoded
+    return size
+
+
+def run(count):
+    content = json.dumps(photos(count))
+    return {
+        'attrdict': measure(content, decode_object) / float(count),
+        'models': measure(content, decode_model) / float(count),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--photos', type=int, default=10000)
+    args = parser.parse_args()
+
+    results = run(args.photos)
+    for name, size in sorted(results.items()):
+        print('{0:10} {1:8.0f} bytes/photo'.format(name, size))
+    print('reduction  {0:8.2f}x'.format(results['attrdict'] / results['models']))
+
+
+if __name__ == '__main__':
+    main()
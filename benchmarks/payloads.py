@@ -0,0 +1,148 @@
+from __future__ import print_function, unicode_literals
+import random
+
+
+def datetime_value(rnd):
+    return {
+        '$type': 'DateTime',
+        'Value': '20{0:02d}-{1:02d}-{2:02d} {3:02d}:{4:02d}:{5:02d}'.format(
+            rnd.randint(10, 25), rnd.randint(1, 12), rnd.randint(1, 28),
+            rnd.randint(0, 23), rnd.randint(0, 59), rnd.randint(0, 59)),
+    }
+
+
+def access_descriptor(rnd):
+    return {
+        '$type': 'AccessDescriptor',
+        'RealmId': rnd.randint(1, 10 ** 6),
+        'AccessType': 'Public',
+        'IsDerived': True,
+        'AccessMask': 'None',
+        'PasswordHint': None,
+        'SrcPasswordHint': None,
+    }
+
+
+def photo(rnd, photo_id):
+    return {
+        '$type': 'Photo',
+        'Id': photo_id,
+        'Width': 6000,
+        'Height': 4000,
+        'Sequence': 'v{0}'.format(rnd.randint(1, 20)),
+        'AccessDescriptor': access_descriptor(rnd),
+        'Owner': 'photographer',
+        'Title': 'Photo {0}'.format(photo_id),
+        'Mimetype': 'image/jpeg',
+        'Size': rnd.randint(10 ** 6, 3 * 10 ** 7),
+        'Gallery': 1000,
+        'OriginalUrl': 'https://photographer.zenfolio.com/img/s/v-10/p{0}.jpg'.format(photo_id),
+        'UrlCore': '/img/s/v-10/p{0}'.format(photo_id),
+        'UrlHost': 'photographer.zenfolio.com',
+        'UrlToken': None,
+        'PageUrl': 'https://photographer.zenfolio.com/p1000/h{0:x}'.format(photo_id),
+        'MailboxId': 'm{0}'.format(photo_id),
+        'TextCn': rnd.randint(0, 10),
+        'Flags': 'HasTitle',
+        'IsVideo': False,
+        'Duration': 0,
+        'Caption': 'Caption of photo {0}'.format(photo_id),
+        'FileName': 'IMG_{0:05d}.JPG'.format(photo_id % 100000),
+        'UploadedOn': datetime_value(rnd),
+        'TakenOn': datetime_value(rnd),
+        'Keywords': ['event', 'keyword{0}'.format(rnd.randint(1, 50))],
+        'Categories': [],
+        'Copyright': 'photographer',
+        'Rotation': 'None',
+        'ExifTags': [],
+        'ShortExif': 'ISO 100, f/2.8, 1/250',
+        'Views': rnd.randint(0, 1000),
+    }
+
+
+def photos(count, seed=0, start=10 ** 8):
+    rnd = random.Random(seed)
+    return [photo(rnd, start + i) for i in range(count)]
+
+
+def photoset(rnd, photoset_id, photo_count=0):
+    return {
+        '$type': 'PhotoSet',
+        'Id': photoset_id,
+        'GroupIndex': 0,
+        'Title': 'Gallery {0}'.format(photoset_id),
+        'AccessDescriptor': access_descriptor(rnd),
+        'Owner': 'photographer',
+        'HideBranding': False,
+        'Type': 'Gallery',
+        'Caption': '',
+        'CreatedOn': datetime_value(rnd),
+        'ModifiedOn': datetime_value(rnd),
+        'PhotoCount': photo_count,
+        'VideoCount': 0,
+        'PhotoBytes': photo_count * 10 ** 7,
+        'Views': rnd.randint(0, 10000),
+        'TitlePhoto': None,
+        'IsRandomTitlePhoto': False,
+        'ParentGroups': [],
+        'Photos': [],
+        'Keywords': ['event'],
+        'Categories': [],
+        'UploadUrl': 'https://up.zenfolio.com/photographer/p{0}/upload.ushx'.format(photoset_id),
+        'VideoUploadUrl': 'https://up.zenfolio.com/photographer/p{0}/video.ushx'.format(photoset_id),
+        'PageUrl': 'https://photographer.zenfolio.com/p{0}'.format(photoset_id),
+        'MailboxId': 'm{0}'.format(photoset_id),
+        'TextCn': 0,
+        'FeaturedIndex': -1,
+        'CustomReference': 'galleries/{0}'.format(photoset_id),
+    }
+
+
+def group(rnd, group_id, title, elements):
+    return {
+        '$type': 'Group',
+        'Id': group_id,
+        'GroupIndex': 0,
+        'Title': title,
+        'AccessDescriptor': access_descriptor(rnd),
+        'Owner': 'photographer',
+        'HideBranding': False,
+        'CreatedOn': datetime_value(rnd),
+        'ModifiedOn': datetime_value(rnd),
+        'PageUrl': 'https://photographer.zenfolio.com/f{0}'.format(group_id),
+        'TitlePhoto': None,
+        'MailboxId': 'm{0}'.format(group_id),
+        'ImmediateChildrenCount': len(elements),
+        'TextCn': 0,
+        'Caption': '',
+        'CollectionCount': 0,
+        'SubGroupCount': sum(1 for i in elements if i['$type'] == 'Group'),
+        'GalleryCount': sum(1 for i in elements if i['$type'] == 'PhotoSet'),
+        'PhotoCount': 0,
+        'ParentGroups': [],
+        'Elements': elements,
+        'CustomReference': '',
+    }
+
+
+def hierarchy(groups=20, sets_per_group=50, seed=0):
+    rnd = random.Random(seed)
+    next_id = [10 ** 6]
+
+    def new_id():
+        next_id[0] += 1
+        return next_id[0]
+
+    children = []
+    for i in range(groups):
+        sets = [photoset(rnd, new_id(), rnd.randint(0, 500)) for _ in range(sets_per_group)]
+        children.append(group(rnd, new_id(), 'Group {0}'.format(i), sets))
+    return group(rnd, new_id(), 'Root', children)
+
+
+def response(result, request_id=1):
+    return {
+        'id': request_id,
+        'result': result,
+        'error': None,
+    }
@@ -0,0 +1,303 @@
+"""
+Run all benchmarks against a local fake Zenfolio server and write
+machine readable results which can be compared across runs::
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json --compare before.json
+
+Unless ``--endpoint`` is given, the server is started in a separate
+process so it does not compete with the client for the GIL.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import asyncio
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from timeit import default_timer
+
+import pyzenfolio
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.images import ThumbnailCache
+from pyzenfolio.pool import PooledPyZenfolio
+from pyzenfolio.transport import RequestsTransport
+
+from . import decode, memory
+
+
+AUTH = {'username': 'photographer', 'token': 'benchmark'}
+
+
+def start_server(photos_per_set):
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.server',
+                                '--photos-per-set', str(photos_per_set)],
+                               stdout=subprocess.PIPE)
+    endpoint = process.stdout.readline().decode('utf-8').strip()
+    if not endpoint:
+        process.kill()
+        raise RuntimeError('Benchmark server did not start')
+    return process, endpoint
+
+
+def get_photoset(api):
+    root = api.LoadGroupHierarchy('photographer')
+    return root.Elements[0].Elements[0]
+
+
+def calls_per_second(function, seconds):
+    calls = 0
+    started = default_timer()
+    while True:
+        function()
+        calls += 1
+        elapsed = default_timer() - started
+        if elapsed >= seconds:
+            return calls / elapsed
+
+
+def bench_rpc(endpoint, seconds):
+    api = PyZenfolio(auth=AUTH, endpoint=endpoint)
+    photoset = get_photoset(api)
+    return {
+        'rpc.LoadPhoto.calls_per_second': calls_per_second(
+            lambda: api.LoadPhoto(1), seconds),
+        'rpc.LoadPhotoSet.calls_per_second': calls_per_second(
+            lambda: api.LoadPhotoSet(photoset.Id), seconds),
+        'rpc.LoadPhotoSetPhotos.calls_per_second': calls_per_second(
+            lambda: api.LoadPhotoSetPhotos(photoset.Id, 0, 500), seconds),
+        'rpc.LoadGroupHierarchy.calls_per_second': calls_per_second(
+            lambda: api.LoadGroupHierarchy('photographer'), seconds),
+    }
+
+
+def bench_decode(photos, repeat):
+    results = decode.run(photos, repeat)
+    return {
+        'decode.{0}.ms_per_1k_photos'.format(name): seconds * 1000 * 1000 / photos
+        for name, seconds in results.items()
+    }
+
+
+def bench_memory(photos):
+    return {
+        'memory.{0}.bytes_per_photo'.format(name): size
+        for name, size in memory.run(photos).items()
+    }
+
+
+def bench_upload(endpoint, megabytes, repeat):
+    api = PyZenfolio(auth=AUTH, endpoint=endpoint)
+    photoset = get_photoset(api)
+    data = b'\0' * (megabytes * 1024 * 1024)
+
+    results = {}
+    for name, chunked in (('content_length', False), ('chunked', True)):
+        best = min(timeit_once(lambda: api.UploadPhoto(photoset, data, 'photo.jpg',
+                                                       chunked=chunked))
+                   for _ in range(repeat))
+        results['upload.{0}.megabytes_per_second'.format(name)] = megabytes / best
+    return results
+
+
+def bench_transport(endpoint, seconds):
+    results = {}
+    for name, compress in (('gzip', True), ('identity', False)):
+        transport = RequestsTransport(compress=compress)
+        api = PyZenfolio(auth=AUTH, endpoint=endpoint, transport=transport)
+        photoset = get_photoset(api)
+        received, decoded = transport.received_bytes, transport.decoded_bytes
+        results['transport.{0}.LoadPhotoSet.calls_per_second'.format(name)] = calls_per_second(
+            lambda: api.LoadPhotoSet(photoset.Id), seconds)
+        results['transport.{0}.received_ratio'.format(name)] = (
+            float(transport.received_bytes - received) / (transport.decoded_bytes - decoded))
+    return results
+
+
+def bench_stream(endpoint, photos_per_set, repeat):
+    api = PyZenfolio(auth=AUTH, endpoint=endpoint)
+    photoset = get_photoset(api)
+    modes = {
+        'buffered': lambda: iter(api.LoadPhotoSetPhotos(photoset.Id, 0, photos_per_set)),
+        'streamed': lambda: api.stream_photoset_photos(photoset.Id, 0, photos_per_set),
+    }
+
+    results = {}
+    for name, fetch in modes.items():
+        results['stream.{0}.first_item_ms'.format(name)] = 1000 * min(
+            timeit_once(lambda: next(fetch())) for _ in range(repeat))
+        tracemalloc.start()
+        for _ in fetch():
+            pass
+        results['stream.{0}.peak_megabytes'.format(name)] = (
+            tracemalloc.get_traced_memory()[1] / 1024.0 / 1024)
+        tracemalloc.stop()
+    return results
+
+
+def bench_thumbnails(endpoint, workers):
+    api = PooledPyZenfolio(auth=AUTH, endpoint=endpoint, pool_maxsize=max(workers))
+    photoset = api.LoadPhotoSet(get_photoset(api).Id, 'Level1', True)
+    results = {}
+    for count in workers:
+        directory = tempfile.mkdtemp()
+        try:
+            cache = ThumbnailCache(api, directory, workers=count, scheme='http')
+            report = cache.prewarm_photoset(photoset)
+            results['thumbnails.workers_{0}.images_per_second'.format(count)] = (
+                report.files_per_second)
+            started = default_timer()
+            cache.prewarm_photoset(photoset)
+            results['thumbnails.cached.images_per_second'] = (
+                len(cache) / (default_timer() - started))
+        finally:
+            shutil.rmtree(directory)
+    return results
+
+
+def timeit_once(function):
+    started = default_timer()
+    function()
+    return default_timer() - started
+
+
+def bench_threads(endpoint, threads, calls, pooled=False):
+    if pooled:
+        api = PooledPyZenfolio(auth=AUTH, endpoint=endpoint, pool_maxsize=threads)
+        clients = [api] * threads
+    else:
+        # one client and connection pool per thread
+        clients = [PyZenfolio(auth=AUTH, endpoint=endpoint) for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def work(api):
+        barrier.wait()
+        for i in range(calls):
+            api.LoadPhoto(i)
+
+    workers = [threading.Thread(target=work, args=(i,)) for i in clients]
+    for worker in workers:
+        worker.start()
+    started = default_timer()
+    barrier.wait()
+    for worker in workers:
+        worker.join()
+    return threads * calls / (default_timer() - started)
+
+
+def bench_async(endpoint, concurrency, calls):
+    from pyzenfolio.aio import AsyncPyZenfolio
+
+    async def work(api):
+        for i in range(calls):
+            await api.LoadPhoto(i)
+
+    async def main():
+        async with AsyncPyZenfolio(auth=AUTH, endpoint=endpoint, limit=concurrency) as api:
+            await api.LoadPhoto(0)
+            started = default_timer()
+            await asyncio.gather(*[work(api) for _ in range(concurrency)])
+            return concurrency * calls / (default_timer() - started)
+
+    return asyncio.run(main())
+
+
+def bench_scaling(endpoint, levels, calls):
+    results = {}
+    for level in levels:
+        results['scaling.threads_{0}.calls_per_second'.format(level)] = bench_threads(
+            endpoint, level, calls)
+        results['scaling.pooled_threads_{0}.calls_per_second'.format(level)] = bench_threads(
+            endpoint, level, calls, pooled=True)
+    try:
+        import aiohttp  # noqa
+    except ImportError:
+        return results
+    for level in levels:
+        results['scaling.asyncio_{0}.calls_per_second'.format(level)] = bench_async(
+            endpoint, level, calls)
+    return results
+
+
+def get_metadata():
+    return {
+        'pyzenfolio': pyzenfolio.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def compare(results, baseline):
+    print('{0:50} {1:>12} {2:>12} {3:>8}'.format('benchmark', 'baseline', 'current', 'change'))
+    for name in sorted(set(results) | set(baseline)):
+        before, after = baseline.get(name), results.get(name)
+        change = ''
+        if before and after is not None:
+            change = '{0:+.1f}%'.format((after - before) * 100.0 / before)
+        print('{0:50} {1:>12} {2:>12} {3:>8}'.format(
+            name, format_value(before), format_value(after), change))
+
+
+def format_value(value):
+    return '-' if value is None else '{0:.2f}'.format(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoint', help='use already running benchmark server')
+    parser.add_argument('--seconds', type=float, default=2, help='duration of each RPC benchmark')
+    parser.add_argument('--photos', type=int, default=10000, help='photos to decode')
+    parser.add_argument('--photos-per-set', type=int, default=500, help='size of served photosets')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--upload-mb', type=int, default=64)
+    parser.add_argument('--scaling', default='1,2,4,8', help='concurrency levels')
+    parser.add_argument('--scaling-calls', type=int, default=500, help='calls per worker')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--compare', help='JSON results of a previous run')
+    args = parser.parse_args()
+
+    process = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        process, endpoint = start_server(args.photos_per_set)
+
+    results = {}
+    try:
+        results.update(bench_rpc(endpoint, args.seconds))
+        results.update(bench_decode(args.photos, args.repeat))
+        results.update(bench_memory(args.photos))
+        results.update(bench_upload(endpoint, args.upload_mb, args.repeat))
+        results.update(bench_transport(endpoint, args.seconds))
+        results.update(bench_stream(endpoint, args.photos_per_set, args.repeat))
+        results.update(bench_thumbnails(endpoint, [1, 8]))
+        results.update(bench_scaling(endpoint,
+                                     [int(i) for i in args.scaling.split(',')],
+                                     args.scaling_calls))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report = {'metadata': get_metadata(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as fid:
+            json.dump(report, fid, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as fid:
+            compare(results, json.load(fid)['results'])
+    else:
+        for name, value in sorted(results.items()):
+            print('{0:50} {1:>12.2f}'.format(name, value))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""
+Local stand-in for the Zenfolio ``zfapi.asmx`` JSON-RPC endpoint.
+
+Serves synthetic ``LoadGroupHierarchy``, ``LoadPhotoSet``,
+``LoadPhotoSetPhotos`` and ``LoadPhoto`` responses (including
+JSON-RPC batches), accepts uploads to the photoset ``UploadUrl`` and
+serves synthetic images of photo ``UrlCore`` URLs::
+
+    python -m benchmarks.server --port 8800 --groups 20 --sets-per-group 50
+
+Serialized responses are cached so the server does as little work
+as possible per request and client side costs dominate.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import json
+import random
+import re
+import socket
+import sys
+import threading
+import zlib
+
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import urlparse
+
+from pyzenfolio.constants import PHOTO_RESOLUTIONS
+
+from .payloads import hierarchy, photo
+
+
+IMAGE_PATH = re.compile(r'^/img/.*-(\d+)\.jpg$')
+
+
+class FakeZenfolio(object):
+    """
+    Synthetic account with ``groups`` top level groups each having
+    ``sets_per_group`` photosets of ``photos_per_set`` photos.
+    """
+
+    def __init__(self, base_url, groups=20, sets_per_group=50, photos_per_set=500, seed=0):
+        self.base_url = base_url
+        self.host = urlparse(base_url).netloc
+        self.photos_per_set = photos_per_set
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.encoded = {}
+        self.images = {}
+        self.uploads = 0
+        self.uploaded_bytes = 0
+
+        self.hierarchy = hierarchy(groups, sets_per_group, seed)
+        self.photosets = {}
+        for group in self.hierarchy['Elements']:
+            for photoset in group['Elements']:
+                photoset['PhotoCount'] = photos_per_set
+                photoset['UploadUrl'] = '{0}upload/{1}'.format(base_url, photoset['Id'])
+                photoset['VideoUploadUrl'] = photoset['UploadUrl']
+                self.photosets[photoset['Id']] = photoset
+
+    def get_photos(self, photoset_id):
+        rnd = random.Random(self.seed + photoset_id)
+        start = photoset_id * 10 ** 4
+        photos = [photo(rnd, start + i) for i in range(self.photos_per_set)]
+        for i in photos:
+            i['UrlHost'] = self.host
+        return photos
+
+    def LoadGroupHierarchy(self, login_name=None):
+        return self.hierarchy
+
+    def LoadPhotoSet(self, photoset_id, level='Level1', include_photos=False):
+        photoset = dict(self.photosets[photoset_id])
+        if include_photos:
+            photoset['Photos'] = self.get_photos(photoset_id)
+        return photoset
+
+    def LoadPhotoSetPhotos(self, photoset_id, start, limit):
+        return self.get_photos(photoset_id)[start:start + limit]
+
+    def LoadPhoto(self, photo_id, level='Level1'):
+        return photo(random.Random(photo_id), photo_id)
+
+    def get_result(self, method, params):
+        """
+        Serialized result of ``method`` which is cached
+        since all responses are deterministic.
+        """
+        key = (method, json.dumps(params))
+        encoded = self.encoded.get(key)
+        if encoded is None:
+            handler = getattr(self, method, None)
+            if handler is None or not method.startswith('Load'):
+                raise LookupError('Unknown method `{0}`'.format(method))
+            encoded = json.dumps(handler(*params))
+            with self.lock:
+                self.encoded[key] = encoded
+        return encoded
+
+    def respond(self, request):
+        try:
+            result = self.get_result(request['method'], request.get('params') or [])
+        except (LookupError, TypeError) as e:
+            error = json.dumps({'code': 'E_INVALIDPARAM', 'message': '{0}'.format(e)})
+            return '{{"id": {0}, "result": null, "error": {1}}}'.format(
+                json.dumps(request.get('id')), error)
+        return '{{"id": {0}, "result": {1}, "error": null}}'.format(
+            json.dumps(request.get('id')), result)
+
+    def rpc(self, body):
+        request = json.loads(body.decode('utf-8'))
+        if isinstance(request, list):
+            return '[{0}]'.format(', '.join(self.respond(i) for i in request))
+        return self.respond(request)
+
+    def image(self, size):
+        """
+        Synthetic image of ``size`` of roughly the size of a JPEG
+        of its resolution. Images are cached as all of them are alike.
+        """
+        image = self.images.get(size)
+        if image is None:
+            width, height = PHOTO_RESOLUTIONS[size]
+            image = b'\xff' * (width * height // 8)
+            with self.lock:
+                self.images[size] = image
+        return image
+
+    def upload(self, size):
+        with self.lock:
+            self.uploads += 1
+            self.uploaded_bytes += size
+            return self.uploads
+
+
+class RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # responses are written in one go hence Nagle only adds latency
+    disable_nagle_algorithm = True
+    read_size = 1024 * 1024
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, body, status=200, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        # images are compressed already
+        gzipped = (content_type == 'application/json'
+                   and len(body) >= self.server.compress_min_size
+                   and 'gzip' in self.headers.get('Accept-Encoding', ''))
+        if gzipped:
+            # fastest level since compression is done for each response
+            compressor = zlib.compressobj(1, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            body = compressor.compress(body) + compressor.flush()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def consume_body(self):
+        """
+        Read and discard request body without buffering it.
+        """
+        size = 0
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                chunk_size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if not chunk_size:
+                    self.rfile.readline()
+                    return size
+                left = chunk_size
+                while left:
+                    left -= len(self.rfile.read(min(left, self.read_size)))
+                self.rfile.readline()
+                size += chunk_size
+
+        left = int(self.headers.get('Content-Length') or 0)
+        while left:
+            chunk = self.rfile.read(min(left, self.read_size))
+            if not chunk:
+                break
+            left -= len(chunk)
+            size += len(chunk)
+        return size
+
+    def do_GET(self):
+        match = IMAGE_PATH.match(urlparse(self.path).path)
+        if match and int(match.group(1)) in PHOTO_RESOLUTIONS:
+            self.send_body(self.server.zenfolio.image(int(match.group(1))),
+                           content_type='image/jpeg')
+        else:
+            self.send_body('Not Found', status=404, content_type='text/plain')
+
+    def do_POST(self):
+        zenfolio = self.server.zenfolio
+        path = urlparse(self.path).path
+        if path.startswith('/upload/'):
+            photo_id = zenfolio.upload(self.consume_body())
+            self.send_body('{0}'.format(photo_id), content_type='text/plain')
+        elif path == '/api':
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            self.send_body(zenfolio.rpc(body))
+        else:
+            self.consume_body()
+            self.send_body('Not Found', status=404, content_type='text/plain')
+
+
+class FakeZenfolioServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    Threaded HTTP server for :class:`FakeZenfolio`. Use ``endpoint``
+    as the client endpoint::
+
+        with FakeZenfolioServer(photos_per_set=100) as server:
+            api = PyZenfolio(endpoint=server.endpoint)
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+    # many concurrent clients connect at once in scaling benchmarks
+    request_queue_size = 256
+    # large responses are gzipped when the client accepts it
+    compress_min_size = 1024
+
+    def __init__(self, host='127.0.0.1', port=0, **kwargs):
+        BaseHTTPServer.HTTPServer.__init__(self, (host, port), RequestHandler)
+        self.url = 'http://{0}:{1}/'.format(*self.server_address[:2])
+        self.endpoint = self.url + 'api'
+        self.zenfolio = FakeZenfolio(self.url, **kwargs)
+        self.thread = None
+
+    def handle_error(self, request, client_address):
+        # streaming clients may close the connection before
+        # reading whole response
+        if not isinstance(sys.exc_info()[1], socket.error):
+            BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--sets-per-group', type=int, default=50)
+    parser.add_argument('--photos-per-set', type=int, default=500)
+    args = parser.parse_args()
+
+    server = FakeZenfolioServer(args.host, args.port,
+                                groups=args.groups,
+                                sets_per_group=args.sets_per_group,
+                                photos_per_set=args.photos_per_set)
+    # first line tells the parent process where to connect
+    print(server.endpoint)
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,446 @@
+from __future__ import print_function, unicode_literals
+import asyncio
+
+import aiohttp
+
+from .api import PyZenfolio
+from .batch import Batch
+from .cache import MISSING
+from .constants import (
+    API_ENDPOINT,
+    BATCH_SIZE,
+    BATCH_UNSUPPORTED_STATUS_CODES,
+    STREAM_CHUNK_SIZE,
+)
+from .exceptions import APIError, HTTPError, TransportError, ZenfolioError
+from .pagination import DONE, get_page_items
+from .singleflight import SingleFlight
+from .utils import UploadStream
+
+
+async def aiter_items(fetch, page_size, prefetch=1, key=None):
+    """
+    asyncio flavour of :func:`pyzenfolio.pagination.iter_items`
+    where ``fetch`` returns an awaitable page.
+    """
+    if prefetch < 1:
+        offset = 0
+        while True:
+            page = get_page_items(await fetch(offset, page_size), key)
+            for item in page:
+                yield item
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    pages = asyncio.Queue(maxsize=prefetch)
+
+    async def produce():
+        offset = 0
+        try:
+            while True:
+                page = get_page_items(await fetch(offset, page_size), key)
+                await pages.put(page)
+                if len(page) < page_size:
+                    break
+                offset += page_size
+            await pages.put(DONE)
+        except Exception as e:
+            await pages.put(e)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            page = await pages.get()
+            if page is DONE:
+                return
+            if isinstance(page, Exception):
+                raise page
+            for item in page:
+                yield item
+    finally:
+        producer.cancel()
+
+
+class AsyncBatch(Batch):
+    """
+    :class:`Batch` for :class:`AsyncPyZenfolio`::
+
+        async with api.batch() as batch:
+            photos = [batch.LoadPhoto(i) for i in ids]
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.execute()
+
+    async def execute(self):
+        pending, self.pending = self.pending, []
+        results = await self.api.call_many([(i.method, i.params) for i in pending],
+                                           self.batch_size)
+        for placeholder, value in zip(pending, results):
+            placeholder.set(value)
+        return pending
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    :class:`SingleFlight` for asyncio tasks.
+
+    Shared call runs in its own task hence cancelling one of
+    the waiting callers does not cancel the call for the others.
+    """
+
+    async def do(self, key, function):
+        task = self.calls.get(key)
+        if task is None:
+            task = self.calls[key] = asyncio.ensure_future(function())
+
+            def done(_):
+                if self.calls.get(key) is task:
+                    del self.calls[key]
+
+            task.add_done_callback(done)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+
+class AsyncPyZenfolio(PyZenfolio):
+    """
+    asyncio flavour of :class:`PyZenfolio`.
+
+    All API methods are inherited from the sync client so validation
+    and response decoding are shared. Since each of them returns
+    ``self.call(...)`` which here is a coroutine, they all have to be
+    awaited::
+
+        async with AsyncPyZenfolio(auth={...}) as api:
+            await api.Authenticate()
+            photoset = await api.LoadPhotoSet(set_id)
+
+    All requests go through a single pooled ``aiohttp`` session which
+    allows up to ``limit`` concurrent connections.
+    """
+
+    # aiohttp session replaces the transport session
+    session = None
+
+    def __init__(self, config_file=None, auth=None, cache=None, models=False,
+                 token_store=None, retry=None, circuit_breaker=None, hooks=None,
+                 endpoint=API_ENDPOINT, codec=None, validate=True, single_flight=None,
+                 limit=100):
+        self.limit = limit
+        self.async_auth_lock = None
+        super(AsyncPyZenfolio, self).__init__(config_file, auth, cache, models, token_store,
+                                              retry, circuit_breaker, hooks, endpoint, codec,
+                                              validate, single_flight)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    # ---------------------------------------------------------------#
+    #                      Authentication                            #
+    # ---------------------------------------------------------------#
+
+    async def Authenticate(self, force=False):
+        if 'token' in self.auth and self.auth.token and not force:
+            return
+
+        if self.token_store is not None:
+            # token store locks would block the event loop hence only
+            # already stored tokens are reused
+            token = self.get_stored_token(force)
+            if token is not None:
+                return token
+
+        _challenge = await self.GetChallenge()
+        proof = self.get_challenge_proof(_challenge)
+
+        token = await self.call('Authenticate', [_challenge.Challenge, proof])
+        self.store_token(token)
+        return token
+
+    async def AuthenticatePlain(self):
+        token = await self.call('AuthenticatePlain', [self.auth.username, self.auth.password])
+        self.store_token(token)
+
+    async def AuthenticateVisitor(self):
+        visitor_key = await self.GetVisitorKey()
+        token = await self.call('AuthenticateVisitor', [visitor_key])
+        self.auth.token = token
+
+    # ---------------------------------------------------------------#
+    #                       Create methods                           #
+    # ---------------------------------------------------------------#
+
+    async def UploadPhoto(self, photoset, path, filename=None, callback=None, chunked=False):
+        upload_url, params, headers = self.get_upload_request(photoset, path, filename)
+        session = self.get_session()
+
+        info = self.start_call('UploadPhoto', [photoset.get('Id')])
+        try:
+            with UploadStream.open(path, callback, chunked) as stream:
+                if stream.len is not None:
+                    headers['Content-Length'] = str(stream.len)
+
+                async def data():
+                    loop = asyncio.get_event_loop()
+                    while True:
+                        if stream.fid is None:
+                            chunk = stream.read()
+                        else:
+                            # files are read in a thread so that
+                            # the event loop is not blocked
+                            chunk = await loop.run_in_executor(None, stream.read)
+                        if not chunk:
+                            break
+                        yield chunk
+
+                try:
+                    async with session.post(upload_url,
+                                            params=params,
+                                            data=data(),
+                                            headers=headers) as response:
+                        content = await response.read()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    raise TransportError(str(e))
+                if info is not None:
+                    info.request_bytes = stream.sent
+                    info.response_bytes = len(content)
+                if response.status != 200:
+                    raise HTTPError(upload_url,
+                                    response.status,
+                                    response.headers,
+                                    content)
+        except Exception as e:
+            self.finish_call(info, e)
+            raise
+        self.finish_call(info)
+        result = content.decode(response.charset or 'utf-8')
+        # invalidated once uploaded so that results loaded
+        # during the upload are not cached
+        if self.cache is not None:
+            self.cache.update('UploadPhoto', [photoset.get('Id')], result, self.get_identity())
+        return result
+
+    # ---------------------------------------------------------------#
+    #                           Internals                            #
+    # ---------------------------------------------------------------#
+
+    def paginate(self, fetch, page_size, prefetch, key=None):
+        """
+        ``iter_*`` methods return async generators::
+
+            async for photo in api.iter_photoset_photos(set_id):
+                ...
+        """
+        return aiter_items(fetch, page_size, prefetch, key)
+
+    async def stream(self, method, params=None, key=None):
+        """
+        ``stream`` and ``stream_*`` methods return async generators::
+
+            async for photo in api.stream_photoset_photos(set_id):
+                ...
+        """
+        data = self.build_request(method, params)
+        token = self.auth.get('token')
+        info = self.start_call(method, data.params)
+        error = None
+        try:
+            try:
+                async for item in self.stream_response(data, key, info):
+                    yield item
+            except ZenfolioError as e:
+                if not self.should_reauthenticate(method, e, token):
+                    raise
+                await self.reauthenticate(token)
+                data = self.build_request(method, params)
+                async for item in self.stream_response(data, key, info):
+                    yield item
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.finish_call(info, error)
+
+    async def stream_response(self, data, key=None, info=None):
+        parser = self.get_stream_parser(key)
+        response = await self.post(data, info, stream=True)
+        try:
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                if info is not None:
+                    info.response_bytes += len(chunk)
+                for item in parser.feed(chunk):
+                    yield item
+            for item in parser.close():
+                yield item
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise TransportError(str(e))
+        finally:
+            response.release()
+        self.check_stream_response(data, parser)
+
+    def init_session(self):
+        # aiohttp sessions have to be created within a running loop
+        # hence the session is created lazily on the first call
+        self.session = None
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def post(self, data, info=None, stream=False):
+        attempt = 0
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_call()
+            try:
+                response = await self.send(data, info, stream)
+            except (TransportError, HTTPError) as e:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure(e)
+                if self.retry is None or not self.retry.should_retry(self.get_methods(data), e, attempt):
+                    raise
+                delay = self.retry.get_delay(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+            except Exception:
+                # server responded (e.g. with an undecodable body)
+                # hence it is healthy from the transport point of view
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_success()
+                raise
+            except BaseException:
+                # e.g. cancelled hence the probe slot has to be freed
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.release()
+                raise
+            else:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_success()
+                return response
+
+    async def send(self, data, info=None, stream=False):
+        session = self.get_session()
+        body = self.codec.encode(data)
+
+        content = None
+        try:
+            response = await session.post(self.endpoint,
+                                          data=body,
+                                          headers=self.get_request_headers())
+            if not stream or response.status != 200:
+                async with response:
+                    content = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise TransportError(str(e))
+        if info is not None:
+            info.request_bytes += len(body)
+            if content is not None:
+                info.response_bytes += len(content)
+        if response.status != 200:
+            raise HTTPError(self.endpoint,
+                            response.status,
+                            response.headers,
+                            content)
+
+        if stream:
+            return response
+        return self.decode(content, info)
+
+    async def call(self, method, params=None):
+        data = self.build_request(method, params)
+
+        if self.cache is not None:
+            result = self.cache.get(method, data.params, self.get_identity())
+            if result is not MISSING:
+                return result
+
+        if self.single_flight is not None and self.single_flight.should_coalesce(method):
+            key = self.single_flight.get_key(method, data.params, self.auth.get('token'))
+            return await self.single_flight.do(key, lambda: self.execute_call(method, params, data))
+        return await self.execute_call(method, params, data)
+
+    async def execute_call(self, method, params, data):
+        token = self.auth.get('token')
+        info = self.start_call(method, data.params)
+        try:
+            try:
+                result = self.parse_response(data, await self.post(data, info))
+            except ZenfolioError as e:
+                if not self.should_reauthenticate(method, e, token):
+                    raise
+                await self.reauthenticate(token)
+                data = self.build_request(method, params)
+                result = self.parse_response(data, await self.post(data, info))
+        except Exception as e:
+            self.finish_call(info, e)
+            raise
+        self.finish_call(info)
+
+        self.cache_result(data, result)
+        return result
+
+    async def reauthenticate(self, expired_token):
+        if self.async_auth_lock is None:
+            self.async_auth_lock = asyncio.Lock()
+        async with self.async_auth_lock:
+            if self.auth.get('token') != expired_token:
+                return
+            if self.token_store is not None:
+                self.token_store.delete(self.auth.username, expired_token)
+            await self.Authenticate(force=True)
+
+    async def call_batch(self, batch):
+        if self.batch_supported:
+            try:
+                response = await self.post(batch)
+            except HTTPError as e:
+                if e.status_code not in BATCH_UNSUPPORTED_STATUS_CODES:
+                    # e.g. a transient server error which
+                    # tells nothing about batch support
+                    return [e] * len(batch)
+                response = None
+            except APIError as e:
+                # e.g. transport errors or open circuit fail
+                # calls of this batch only
+                return [e] * len(batch)
+            if isinstance(response, list):
+                return self.parse_batch_response(batch, response)
+            self.batch_supported = False
+
+        async def call_one(data):
+            try:
+                return self.parse_response(data, await self.post(data))
+            except APIError as e:
+                return e
+
+        return await asyncio.gather(*[call_one(data) for data in batch])
+
+    async def call_many(self, calls, batch_size=BATCH_SIZE):
+        batches = self.split_batch(calls, batch_size)
+        results = await asyncio.gather(*[self.call_batch(batch) for batch in batches])
+        for batch, batch_results in zip(batches, results):
+            for data, result in zip(batch, batch_results):
+                self.cache_result(data, result)
+        return [result for batch_results in results for result in batch_results]
+
+    def batch(self, batch_size=BATCH_SIZE):
+        return AsyncBatch(self, batch_size)
@@ -1,33 +1,77 @@
 from __future__ import print_function, unicode_literals
+import itertools
 import json
 import mimetypes
 import os
+import threading
+import time
 import urllib
 from hashlib import sha256
-from random import randint
+from uuid import uuid4
 
-import requests
 import six
 
+from .batch import Batch
+from .cache import MISSING
+from .codec import get_codec
 from .constants import (
     API_ENDPOINT,
+    AUTH_ERROR_CODES,
+    AUTH_METHODS,
+    BATCH_SIZE,
+    BATCH_UNSUPPORTED_STATUS_CODES,
     DEFAULT_CONFIG,
     DEFAULT_OBJECTS,
+    PAGE_SIZE,
     REQUEST_HEADERS,
+    STREAM_CHUNK_SIZE,
+)
+from .exceptions import (
+    APIError,
+    ConfigError,
+    HTTPError,
+    TransportError,
+    ZenfolioError,
+)
+from .metrics import CallInfo
+from .models import decode_model
+from .pagination import iter_items
+from .stream import ResponseParser
+from .transport import RequestsTransport
+from .utils import (
+    AttrDict,
+    UploadStream,
+    convert_from_datetime,
+    decode_object,
 )
-from .exceptions import APIError, ConfigError, HTTPError, ZenfolioError
-from .utils import AttrDict, convert_from_datetime, convert_to_datetime
 from .validate import assert_type, validate_object, validate_value
 
 
 class PyZenfolio(object):
-    def __init__(self, config_file=None, auth=None):
+    def __init__(self, config_file=None, auth=None, cache=None, models=False, token_store=None,
+                 retry=None, circuit_breaker=None, hooks=None, endpoint=API_ENDPOINT,
+                 codec=None, validate=True, single_flight=None, transport=None):
+        self.endpoint = endpoint
+        self.transport = transport
+        self.single_flight = single_flight
+        self.codec = codec if codec is not None else get_codec()
+        self.validate = validate
+        self.cache = cache
+        self.hooks = list(hooks or [])
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
+        self.models = models
+        self.token_store = token_store
+        self.auth_lock = threading.Lock()
+        self.auth = AttrDict({})
         self.config = AttrDict(DEFAULT_CONFIG)
         if config_file:
             self.config.update(self.get_config(config_file))
             self.auth = self.config.auth
         if auth:
             self.auth = AttrDict(auth)
+        self.request_ids = itertools.count(1)
+        self.batch_supported = True
         self.init_session()
 
     # ---------------------------------------------------------------#
@@ -38,16 +82,23 @@ class PyZenfolio(object):
         if 'token' in self.auth and self.auth.token and not force:
             return
 
-        _challenge = self.GetChallenge()
-        salt = b''.join(map(six.int2byte, _challenge.PasswordSalt))
-        challenge = b''.join(map(six.int2byte, _challenge.Challenge))
+        if self.token_store is None:
+            return self.authenticate_challenge()
 
-        password_hash = sha256(salt + self.auth.password.encode('utf-8')).digest()
-        proof = sha256(challenge + password_hash).digest()
-        proof_as_ints = list(six.iterbytes(proof))
+        # only one client authenticates at a time while others
+        # wait and then reuse the token it stored
+        with self.token_store.lock(self.auth.username):
+            token = self.get_stored_token(force)
+            if token is None:
+                token = self.authenticate_challenge()
+            return token
 
-        token = self.call('Authenticate', [_challenge.Challenge, proof_as_ints])
-        self.auth.token = token
+    def authenticate_challenge(self):
+        _challenge = self.GetChallenge()
+        proof = self.get_challenge_proof(_challenge)
+
+        token = self.call('Authenticate', [_challenge.Challenge, proof])
+        self.store_token(token)
         return token
 
     def GetChallenge(self):
@@ -55,7 +106,7 @@ class PyZenfolio(object):
 
     def AuthenticatePlain(self):
         token = self.call('AuthenticatePlain', [self.auth.username, self.auth.password])
-        self.auth.token = token
+        self.store_token(token)
 
     def AuthenticateVisitor(self):
         visitor_key = self.GetVisitorKey()
@@ -79,18 +130,18 @@ class PyZenfolio(object):
         return self.call('GetPopularPhotos', [offset, limit])
 
     def GetPopularSets(self, set_type='Gallery', offset=0, limit=1000):
-        validate_value(set_type, 'PhotoSetType', 'GetPopularSets')
+        self.validate_value(set_type, 'PhotoSetType', 'GetPopularSets')
         return self.call('GetPopularSets', [set_type, offset, limit])
 
     def GetRecentPhotos(self, offset=0, limit=1000):
         return self.call('GetRecentPhotos', [offset, limit])
 
     def GetRecentSets(self, set_type='Gallery', offset=0, limit=1000):
-        validate_value(set_type, 'PhotoSetType', 'GetRecentSets')
+        self.validate_value(set_type, 'PhotoSetType', 'GetRecentSets')
         return self.call('GetRecentSets', [set_type, offset, limit])
 
     def GetVideoPlaybackUrl(self, photo_id, mode='Http', width=1920, height=1080):
-        validate_value(mode, 'VideoPlaybackMode', 'GetVideoPlaybackUrl')
+        self.validate_value(mode, 'VideoPlaybackMode', 'GetVideoPlaybackUrl')
         return self.call('GetVideoPlaybackUrl', [photo_id, mode, width, height])
 
     # ---------------------------------------------------------------#
@@ -101,7 +152,7 @@ class PyZenfolio(object):
         return self.call('LoadAccessRealm', realm_id)
 
     def LoadGroup(self, id, info_level='Full', recursive=False):
-        validate_value(info_level, 'InformationLevel', 'LoadGroup')
+        self.validate_value(info_level, 'InformationLevel', 'LoadGroup')
         return self.call('LoadGroup', [id, info_level, recursive])
 
     def LoadGroupHierarchy(self, username=None):
@@ -117,11 +168,11 @@ class PyZenfolio(object):
         return self.call('LoadSharedFavoritesSets')
 
     def LoadPhoto(self, photo_id, info_level='Full'):
-        validate_value(info_level, 'InformationLevel', 'LoadPhoto')
+        self.validate_value(info_level, 'InformationLevel', 'LoadPhoto')
         return self.call('LoadPhoto', [photo_id, info_level])
 
     def LoadPhotoSet(self, set_id, info_level='Full', with_photos=True):
-        validate_value(info_level, 'InformationLevel', 'LoadPhotoSet')
+        self.validate_value(info_level, 'InformationLevel', 'LoadPhotoSet')
         return self.call('LoadPhotoSet', [set_id, info_level, with_photos])
 
     def LoadPhotoSetPhotos(self, set_id, start_index=0, limit=5000):
@@ -147,7 +198,7 @@ class PyZenfolio(object):
             group = {}
         updater = dict(DEFAULT_OBJECTS['GroupUpdater'])
         updater.update(group)
-        validate_object(group, 'GroupUpdater', 'CreateGroup')
+        self.validate_object(group, 'GroupUpdater', 'CreateGroup')
         return self.call('CreateGroup', [parent_id, updater])
 
     def CreatePhotoFromUrl(self, photoset_id, url, cookies=None):
@@ -157,12 +208,12 @@ class PyZenfolio(object):
         return self.call('CreatePhotoFromUrl', [photoset_id, url, cookies])
 
     def CreatePhotoSet(self, group_id, set_type='Gallery', photoset=None):
-        validate_value(set_type, 'PhotoSetType', 'CreatePhotoSet')
+        self.validate_value(set_type, 'PhotoSetType', 'CreatePhotoSet')
         if photoset is None:
             photoset = {}
         updater = dict(DEFAULT_OBJECTS['PhotoSetUpdater'])
         updater.update(photoset)
-        validate_object(updater, 'PhotoSetUpdater', 'CreatePhotoSet')
+        self.validate_object(updater, 'PhotoSetUpdater', 'CreatePhotoSet')
         return self.call('CreatePhotoSet', [group_id, set_type, updater])
 
     def CreateVideoFromUrl(self, photoset_id, url, cookies=None):
@@ -171,36 +222,51 @@ class PyZenfolio(object):
                                 for c in cookies.items()])
         return self.call('CreateVideoFromUrl', [photoset_id, url, cookies])
 
-    def UploadPhoto(self, photoset, path, filename=None):
-        assert_type(photoset, 'PhotoSet', 'photoset', 'UploadPhoto')
-        upload_url = photoset.UploadUrl
+    def UploadPhoto(self, photoset, path, filename=None, callback=None, chunked=False):
+        """
+        Upload photo or video to the photoset.
 
-        with open(path, 'rb') as fid:
-            data = fid.read()
-            filename = filename or os.path.basename(path)
+        ``path`` can be a file path, an open binary file object or a
+        buffer (e.g. ``memoryview`` or ``mmap``). Data is streamed in
+        chunks hence the memory usage does not depend on the file size.
+        ``callback`` is called with ``(sent, total)`` bytes as the upload
+        progresses.
+        """
+        upload_url, params, headers = self.get_upload_request(photoset, path, filename)
 
-            headers = self.get_request_headers()
-            headers.update({
-                'Content-Type': mimetypes.guess_type(filename)[0],
-            })
-            params = {
-                'filename': filename,
-            }
-            request = requests.post(upload_url,
-                                    params=params,
-                                    data=data,
-                                    headers=headers)
-            if request.status_code != 200:
-                raise HTTPError(API_ENDPOINT,
-                                request.status_code,
-                                request.headers,
-                                request.content)
-            return request.text
-
-        raise APIError('Could not upload photo')
+        info = self.start_call('UploadPhoto', [photoset.get('Id')])
+        try:
+            with UploadStream.open(path, callback, chunked) as data:
+                try:
+                    request = self.transport.post(upload_url,
+                                                  params=params,
+                                                  data=data,
+                                                  headers=headers)
+                except APIError:
+                    raise
+                except Exception as e:
+                    raise TransportError(six.text_type(e))
+                if info is not None:
+                    info.request_bytes = data.sent
+                    info.response_bytes = len(request.content)
+                if request.status_code != 200:
+                    raise HTTPError(upload_url,
+                                    request.status_code,
+                                    request.headers,
+                                    request.content)
+        except Exception as e:
+            self.finish_call(info, e)
+            raise
+        self.finish_call(info)
+        # invalidated once uploaded so that results loaded
+        # during the upload are not cached
+        if self.cache is not None:
+            self.cache.update('UploadPhoto', [photoset.get('Id')], request.text,
+                              self.get_identity())
+        return request.text
 
     def AddMessage(self, mail_id, message):
-        validate_object(message, 'MessageUpdater', 'AddMessage')
+        self.validate_object(message, 'MessageUpdater', 'AddMessage')
         return self.call('AddMessage', [mail_id, message])
 
     # ---------------------------------------------------------------#
@@ -228,7 +294,7 @@ class PyZenfolio(object):
             group = {}
         updater = dict(DEFAULT_OBJECTS['GroupUpdater'])
         updater.update(group)
-        validate_object(updater, 'GroupUpdater', 'UpdateGroup')
+        self.validate_object(updater, 'GroupUpdater', 'UpdateGroup')
         return self.call('UpdateGroup', [group_id, updater])
 
     def UpdateGroupAccess(self, group_id, group_access=None):
@@ -236,7 +302,7 @@ class PyZenfolio(object):
             group_access = {}
         updater = dict(DEFAULT_OBJECTS['AccessUpdater'])
         updater.update(group_access)
-        validate_object(updater, 'AccessUpdater', 'UpdateGroupAccess')
+        self.validate_object(updater, 'AccessUpdater', 'UpdateGroupAccess')
         return self.call('UpdateGroupAccess', [group_id, updater])
 
     def UpdatePhoto(self, photo_id, photo=None):
@@ -244,7 +310,7 @@ class PyZenfolio(object):
             photo = {}
         updater = dict(DEFAULT_OBJECTS['PhotoUpdater'])
         updater.update(photo)
-        validate_object(updater, 'PhotoUpdater', 'UpdatePhoto')
+        self.validate_object(updater, 'PhotoUpdater', 'UpdatePhoto')
         return self.call('UpdatePhoto', [photo_id, updater])
 
     def UpdatePhotoAccess(self, photo_id, photo_access=None):
@@ -252,7 +318,7 @@ class PyZenfolio(object):
             photo_access = {}
         updater = dict(DEFAULT_OBJECTS['AccessUpdater'])
         updater.update(photo_access)
-        validate_object(updater, 'AccessUpdater', 'UpdatePhotoAccess')
+        self.validate_object(updater, 'AccessUpdater', 'UpdatePhotoAccess')
         return self.call('UpdatePhotoAccess', [photo_id, updater])
 
     def UpdatePhotoSet(self, photoset_id, photoset=None):
@@ -260,7 +326,7 @@ class PyZenfolio(object):
             photoset = {}
         updater = dict(DEFAULT_OBJECTS['PhotoSetUpdater'])
         updater.update(photoset)
-        validate_object(updater, 'PhotoSetUpdater', 'UpdatePhotoSet')
+        self.validate_object(updater, 'PhotoSetUpdater', 'UpdatePhotoSet')
         return self.call('UpdatePhotoSet', [photoset_id, updater])
 
     def UpdatePhotoSetAccess(self, photoset_id, photoset_access=None):
@@ -268,7 +334,7 @@ class PyZenfolio(object):
             photoset_access = {}
         updater = dict(DEFAULT_OBJECTS['AccessUpdater'])
         updater.update(photoset_access)
-        validate_object(updater, 'AccessUpdater', 'UpdatePhotoSetAccess')
+        self.validate_object(updater, 'AccessUpdater', 'UpdatePhotoSetAccess')
         return self.call('UpdatePhotoSetAccess', [photoset_id, updater])
 
     # ---------------------------------------------------------------#
@@ -292,21 +358,21 @@ class PyZenfolio(object):
     # ---------------------------------------------------------------#
 
     def SearchPhotoByCategory(self, search_id, sort, category, offset, limit):
-        validate_value(sort, 'SortOrder', 'SearchPhotoByCategory')
+        self.validate_value(sort, 'SortOrder', 'SearchPhotoByCategory')
         return self.call('SearchPhotoByCategory', [search_id, sort, category, offset, limit])
 
     def SearchPhotoByText(self, search_id, sort, query, offset, limit):
-        validate_value(sort, 'SortOrder', 'SearchPhotoByText')
+        self.validate_value(sort, 'SortOrder', 'SearchPhotoByText')
         return self.call('SearchPhotoByText', [search_id, sort, query, offset, limit])
 
     def SearchSetByCategory(self, search_id, photoset_type, sort, category, offset, limit):
-        validate_value(photoset_type, 'PhotoSetType', 'SearchSetByCategory')
-        validate_value(sort, 'SortOrder', 'SearchSetByCategory')
+        self.validate_value(photoset_type, 'PhotoSetType', 'SearchSetByCategory')
+        self.validate_value(sort, 'SortOrder', 'SearchSetByCategory')
         return self.call('SearchSetByCategory', [search_id, photoset_type, sort, category, offset, limit])
 
     def SearchSetByText(self, search_id, photoset_type, sort, query, offset, limit):
-        validate_value(photoset_type, 'PhotoSetType', 'SearchSetByText')
-        validate_value(sort, 'SortOrder', 'SearchSetByText')
+        self.validate_value(photoset_type, 'PhotoSetType', 'SearchSetByText')
+        self.validate_value(sort, 'SortOrder', 'SearchSetByText')
         return self.call('SearchSetByText', [search_id, photoset_type, sort, query, offset, limit])
 
     # ---------------------------------------------------------------#
@@ -354,18 +420,18 @@ class PyZenfolio(object):
         return self.call('RemovePhotoSetTitlePhoto', [photoset_id])
 
     def ReorderGroup(self, group_id, order):
-        validate_value(order, 'GroupShiftOrder', 'ReorderGroup')
+        self.validate_value(order, 'GroupShiftOrder', 'ReorderGroup')
         return self.call('ReorderGroup', [group_id, order])
 
     def ReorderPhotoSet(self, photoset_id, order):
-        validate_value(order, 'ShiftOrder', 'ReorderPhotoSet')
+        self.validate_value(order, 'ShiftOrder', 'ReorderPhotoSet')
         return self.call('ReorderPhotoSet', [photoset_id, order])
 
     def ReplacePhoto(self, original_id, replacement_id):
         return self.call('ReplacePhoto', [original_id, replacement_id])
 
     def RotatePhoto(self, photo_id, rotation):
-        validate_value(rotation, 'PhotoRotation', 'RotatePhoto')
+        self.validate_value(rotation, 'PhotoRotation', 'RotatePhoto')
         return self.call('RotatePhoto', [photo_id, rotation])
 
     def ShareFavoritesSet(self, favset_id, favset_name, name, email, message):
@@ -374,6 +440,82 @@ class PyZenfolio(object):
     def UndeleteMessage(self, mailbox_id, message_index):
         return self.call('UndeleteMessage', [mailbox_id, message_index])
 
+    # ---------------------------------------------------------------#
+    #                           Iterators                            #
+    # ---------------------------------------------------------------#
+
+    def iter_photoset_photos(self, set_id, page_size=PAGE_SIZE, prefetch=1):
+        return self.paginate(
+            lambda offset, limit: self.LoadPhotoSetPhotos(set_id, offset, limit),
+            page_size, prefetch)
+
+    def iter_popular_photos(self, page_size=PAGE_SIZE, prefetch=1):
+        return self.paginate(self.GetPopularPhotos, page_size, prefetch)
+
+    def iter_popular_sets(self, set_type='Gallery', page_size=PAGE_SIZE, prefetch=1):
+        self.validate_value(set_type, 'PhotoSetType', 'GetPopularSets')
+        return self.paginate(
+            lambda offset, limit: self.GetPopularSets(set_type, offset, limit),
+            page_size, prefetch)
+
+    def iter_recent_photos(self, page_size=PAGE_SIZE, prefetch=1):
+        return self.paginate(self.GetRecentPhotos, page_size, prefetch)
+
+    def iter_recent_sets(self, set_type='Gallery', page_size=PAGE_SIZE, prefetch=1):
+        self.validate_value(set_type, 'PhotoSetType', 'GetRecentSets')
+        return self.paginate(
+            lambda offset, limit: self.GetRecentSets(set_type, offset, limit),
+            page_size, prefetch)
+
+    def iter_search_photos_by_category(self, category, sort='Date', search_id=None,
+                                       page_size=PAGE_SIZE, prefetch=1):
+        self.validate_value(sort, 'SortOrder', 'SearchPhotoByCategory')
+        search_id = search_id or uuid4().hex
+        return self.paginate(
+            lambda offset, limit: self.SearchPhotoByCategory(
+                search_id, sort, category, offset, limit),
+            page_size, prefetch, 'Photos')
+
+    def iter_search_photos_by_text(self, query, sort='Date', search_id=None,
+                                   page_size=PAGE_SIZE, prefetch=1):
+        self.validate_value(sort, 'SortOrder', 'SearchPhotoByText')
+        search_id = search_id or uuid4().hex
+        return self.paginate(
+            lambda offset, limit: self.SearchPhotoByText(
+                search_id, sort, query, offset, limit),
+            page_size, prefetch, 'Photos')
+
+    def iter_search_sets_by_category(self, category, photoset_type='Gallery', sort='Date',
+                                     search_id=None, page_size=PAGE_SIZE, prefetch=1):
+        self.validate_value(photoset_type, 'PhotoSetType', 'SearchSetByCategory')
+        self.validate_value(sort, 'SortOrder', 'SearchSetByCategory')
+        search_id = search_id or uuid4().hex
+        return self.paginate(
+            lambda offset, limit: self.SearchSetByCategory(
+                search_id, photoset_type, sort, category, offset, limit),
+            page_size, prefetch, 'PhotoSets')
+
+    def iter_search_sets_by_text(self, query, photoset_type='Gallery', sort='Date',
+                                 search_id=None, page_size=PAGE_SIZE, prefetch=1):
+        self.validate_value(photoset_type, 'PhotoSetType', 'SearchSetByText')
+        self.validate_value(sort, 'SortOrder', 'SearchSetByText')
+        search_id = search_id or uuid4().hex
+        return self.paginate(
+            lambda offset, limit: self.SearchSetByText(
+                search_id, photoset_type, sort, query, offset, limit),
+            page_size, prefetch, 'PhotoSets')
+
+    # ---------------------------------------------------------------#
+    #                           Streaming                            #
+    # ---------------------------------------------------------------#
+
+    def stream_photoset(self, set_id, info_level='Full'):
+        self.validate_value(info_level, 'InformationLevel', 'LoadPhotoSet')
+        return self.stream('LoadPhotoSet', [set_id, info_level, True], 'Photos')
+
+    def stream_photoset_photos(self, set_id, start_index=0, limit=5000):
+        return self.stream('LoadPhotoSetPhotos', [set_id, start_index, limit])
+
     # ---------------------------------------------------------------#
     #                           Internals                            #
     # ---------------------------------------------------------------#
@@ -386,6 +528,74 @@ class PyZenfolio(object):
             except ValueError:
                 raise ConfigError('Could not open config file')
 
+    def paginate(self, fetch, page_size, prefetch, key=None):
+        return iter_items(fetch, page_size, prefetch, key)
+
+    def get_stored_token(self, force=False):
+        token = self.token_store.get(self.auth.username)
+        # when forced, current token is known to be invalid however
+        # stored token might have been already refreshed by another client
+        if not token or (force and token == self.auth.get('token')):
+            return None
+        self.auth.token = token
+        return token
+
+    def store_token(self, token):
+        self.auth.token = token
+        if self.token_store is not None:
+            self.token_store.set(self.auth.username, token)
+
+    def get_identity(self):
+        """
+        Account whose token is sent with calls or ``None`` for
+        anonymous calls. Token hash is used when username is unknown.
+        """
+        token = self.auth.get('token')
+        if not token:
+            return None
+        return self.auth.get('username') or sha256(token.encode('utf-8')).hexdigest()
+
+    def should_reauthenticate(self, method, error, token):
+        return (error.code in AUTH_ERROR_CODES
+                and token
+                and 'password' in self.auth
+                and method not in AUTH_METHODS)
+
+    def reauthenticate(self, expired_token):
+        with self.auth_lock:
+            if self.auth.get('token') != expired_token:
+                # another thread already re-authenticated
+                return
+            if self.token_store is not None:
+                self.token_store.delete(self.auth.username, expired_token)
+            self.Authenticate(force=True)
+
+    def get_challenge_proof(self, challenge):
+        salt = b''.join(map(six.int2byte, challenge.PasswordSalt))
+        challenge = b''.join(map(six.int2byte, challenge.Challenge))
+
+        password_hash = sha256(salt + self.auth.password.encode('utf-8')).digest()
+        proof = sha256(challenge + password_hash).digest()
+        return list(six.iterbytes(proof))
+
+    def get_upload_request(self, photoset, path, filename=None):
+        self.assert_type(photoset, 'PhotoSet', 'photoset', 'UploadPhoto')
+        if not filename:
+            name = path if isinstance(path, six.string_types) else getattr(path, 'name', None)
+            if not isinstance(name, six.string_types):
+                raise APIError('`filename` is required when uploading '
+                               'from a file object or a buffer.')
+            filename = os.path.basename(name)
+
+        headers = self.get_request_headers()
+        headers.update({
+            'Content-Type': mimetypes.guess_type(filename)[0],
+        })
+        params = {
+            'filename': filename,
+        }
+        return photoset.UploadUrl, params, headers
+
     def get_request_headers(self):
         headers = dict(REQUEST_HEADERS)
         if 'token' in self.auth:
@@ -395,34 +605,31 @@ class PyZenfolio(object):
         return headers
 
     def init_session(self):
-        self.session = requests.Session()
-
-    def call(self, method, params=None):
+        if self.transport is None:
+            self.transport = RequestsTransport()
+
+    @property
+    def session(self):
+        """
+        ``requests.Session`` of the calling thread when the transport
+        has one (kept for code which used ``api.session`` directly).
+        """
+        return getattr(self.transport, 'session', None)
+
+    def build_request(self, method, params=None):
         if params is None:
             params = []
         elif not isinstance(params, (list, tuple)):
             params = [params]
 
-        data = AttrDict({
-            'method': method,
-            'params': params,
-            'id': randint(0, 2 ** 16 - 1)
-        })
-
-        try:
-            request = self.session.post(API_ENDPOINT,
-                                        data=json.dumps(data),
-                                        headers=self.get_request_headers())
-        except Exception as e:
-            raise APIError(e.message)
-        if request.status_code != 200:
-            raise HTTPError(API_ENDPOINT,
-                            request.status_code,
-                            request.headers,
-                            request.content)
-
-        body = convert_to_datetime(AttrDict(request.json()))
+        # params are sent as they are hence there is no need
+        # to recursively convert them to AttrDicts
+        request = AttrDict.__new__(AttrDict)
+        dict.__init__(request, method=method, params=params, id=next(self.request_ids))
+        request.__dict__ = request
+        return request
 
+    def parse_response(self, data, body):
         if body.error:
             code = None
             if 'code' in body.error:
@@ -433,3 +640,292 @@ class PyZenfolio(object):
             raise APIError('Response ID does match request ID')
 
         return body.result
+
+    def get_methods(self, data):
+        if isinstance(data, list):
+            return [i.method for i in data]
+        return [data.method]
+
+    def validate_value(self, value, data_struct, method):
+        if self.validate:
+            validate_value(value, data_struct, method)
+
+    def validate_object(self, value, data_struct, method):
+        if self.validate:
+            validate_object(value, data_struct, method)
+
+    def assert_type(self, value, expected_type, param, method):
+        if self.validate:
+            assert_type(value, expected_type, param, method)
+
+    def start_call(self, method, params):
+        """
+        Run ``before_call`` hooks. Returns ``None`` when there are
+        no hooks so uninstrumented calls do not collect anything.
+        """
+        if not self.hooks:
+            return None
+        info = CallInfo(method, params)
+        for hook in self.hooks:
+            hook.before_call(info)
+        return info
+
+    def finish_call(self, info, error=None):
+        if info is None:
+            return
+        info.finish(error)
+        for hook in self.hooks:
+            hook.after_call(info)
+
+    def post(self, data, info=None, stream=False):
+        attempt = 0
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_call()
+            try:
+                response = self.send(data, info, stream)
+            except (TransportError, HTTPError) as e:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure(e)
+                if self.retry is None or not self.retry.should_retry(self.get_methods(data), e, attempt):
+                    raise
+                delay = self.retry.get_delay(attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+            except Exception:
+                # server responded (e.g. with an undecodable body)
+                # hence it is healthy from the transport point of view
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_success()
+                raise
+            except BaseException:
+                # e.g. cancelled hence the probe slot has to be freed
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.release()
+                raise
+            else:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_success()
+                return response
+
+    def send(self, data, info=None, stream=False):
+        """
+        Send request and decode its response. When ``stream`` is set,
+        response is returned as soon as its headers are received
+        without reading (and decoding) its body.
+        """
+        body = self.codec.encode(data)
+        try:
+            request = self.transport.post(self.endpoint,
+                                          data=body,
+                                          headers=self.get_request_headers(),
+                                          stream=stream)
+        except APIError:
+            raise
+        except Exception as e:
+            raise TransportError(six.text_type(e))
+        if info is not None:
+            info.request_bytes += len(body)
+            if not stream:
+                info.response_bytes += len(request.content)
+        if request.status_code != 200:
+            raise HTTPError(self.endpoint,
+                            request.status_code,
+                            request.headers,
+                            request.content)
+
+        if stream:
+            return request
+        return self.decode(request.content, info)
+
+    def decode(self, content, info=None):
+        hook = decode_model if self.models else decode_object
+        if info is not None:
+            return info.decode(content, hook, self.codec)
+        return self.codec.decode(content, hook)
+
+    def call(self, method, params=None):
+        data = self.build_request(method, params)
+
+        if self.cache is not None:
+            result = self.cache.get(method, data.params, self.get_identity())
+            if result is not MISSING:
+                return result
+
+        if self.single_flight is not None and self.single_flight.should_coalesce(method):
+            key = self.single_flight.get_key(method, data.params, self.auth.get('token'))
+            return self.single_flight.do(key, lambda: self.execute_call(method, params, data))
+        return self.execute_call(method, params, data)
+
+    def execute_call(self, method, params, data):
+        token = self.auth.get('token')
+        info = self.start_call(method, data.params)
+        try:
+            try:
+                result = self.parse_response(data, self.post(data, info))
+            except ZenfolioError as e:
+                if not self.should_reauthenticate(method, e, token):
+                    raise
+                # token expired so authenticate again and replay the call once
+                self.reauthenticate(token)
+                data = self.build_request(method, params)
+                result = self.parse_response(data, self.post(data, info))
+        except Exception as e:
+            self.finish_call(info, e)
+            raise
+        self.finish_call(info)
+
+        self.cache_result(data, result)
+        return result
+
+    def stream(self, method, params=None, key=None):
+        """
+        Call ``method`` and yield items of its list result (or of the
+        list under ``key`` of its result) one by one while the response
+        is still being received. Items are decoded (including ``DateTime``
+        values) as soon as they are complete so the first item is
+        available long before the whole response is downloaded and
+        memory does not grow with the size of the response.
+
+        Streamed calls are neither cached nor coalesced.
+        """
+        data = self.build_request(method, params)
+        token = self.auth.get('token')
+        info = self.start_call(method, data.params)
+        error = None
+        try:
+            try:
+                for item in self.stream_response(data, key, info):
+                    yield item
+            except ZenfolioError as e:
+                # errors are returned without any result hence
+                # nothing was yielded yet and the call can be replayed
+                if not self.should_reauthenticate(method, e, token):
+                    raise
+                self.reauthenticate(token)
+                data = self.build_request(method, params)
+                for item in self.stream_response(data, key, info):
+                    yield item
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.finish_call(info, error)
+
+    def get_stream_parser(self, key=None):
+        path = ('result',) if key is None else ('result', key)
+        return ResponseParser(path, decode_model if self.models else decode_object)
+
+    def stream_response(self, data, key=None, info=None):
+        parser = self.get_stream_parser(key)
+        response = self.post(data, info, stream=True)
+        size = 0
+        try:
+            for chunk in self.iter_chunks(response):
+                size += len(chunk)
+                if info is not None:
+                    info.response_bytes += len(chunk)
+                for item in parser.feed(chunk):
+                    yield item
+            for item in parser.close():
+                yield item
+            self.transport.record(response, size)
+        finally:
+            response.close()
+        self.check_stream_response(data, parser)
+
+    @staticmethod
+    def iter_chunks(response):
+        """
+        Chunks of streamed ``response``. Read errors of any transport
+        are raised as ``TransportError``.
+        """
+        chunks = response.iter_content(STREAM_CHUNK_SIZE)
+        while True:
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            except APIError:
+                raise
+            except Exception as e:
+                raise TransportError(six.text_type(e))
+            yield chunk
+
+    def check_stream_response(self, data, parser):
+        # streamed list is not kept in the envelope
+        body = AttrDict(parser.envelope)
+        body.setdefault('result', None)
+        self.parse_response(data, body)
+
+    def cache_result(self, data, result):
+        if self.cache is not None and not isinstance(result, Exception):
+            self.cache.update(data.method, data.params, result, self.get_identity())
+
+    def split_batch(self, calls, batch_size):
+        data = [self.build_request(method, params) for method, params in calls]
+        return [data[i:i + batch_size]
+                for i in range(0, len(data), batch_size)]
+
+    def parse_batch_response(self, batch, response):
+        responses = {i.get('id'): i for i in response}
+
+        results = []
+        for data in batch:
+            try:
+                if data.id not in responses:
+                    raise APIError('No response for request ID {0}'.format(data.id))
+                results.append(self.parse_response(data, responses[data.id]))
+            except APIError as e:
+                results.append(e)
+        return results
+
+    def call_batch(self, batch):
+        if self.batch_supported:
+            try:
+                response = self.post(batch)
+            except HTTPError as e:
+                if e.status_code not in BATCH_UNSUPPORTED_STATUS_CODES:
+                    # e.g. a transient server error which
+                    # tells nothing about batch support
+                    return [e] * len(batch)
+                response = None
+            except APIError as e:
+                # e.g. transport errors or open circuit fail
+                # calls of this batch only
+                return [e] * len(batch)
+            if isinstance(response, list):
+                return self.parse_batch_response(batch, response)
+            self.batch_supported = False
+
+        # server does not understand JSON-RPC batches so simply
+        # send requests one by one reusing the keep-alive session
+        results = []
+        for data in batch:
+            try:
+                results.append(self.parse_response(data, self.post(data)))
+            except APIError as e:
+                results.append(e)
+        return results
+
+    def call_many(self, calls, batch_size=BATCH_SIZE):
+        """
+        Call multiple methods using JSON-RPC batch requests.
+
+        ``calls`` is an iterable of ``(method, params)`` tuples.
+        Returns results in the same order as ``calls``. Failed calls
+        do not fail the whole batch - instead their exception
+        (e.g. ``ZenfolioError``) is returned in place of the result.
+        """
+        results = []
+        for batch in self.split_batch(calls, batch_size):
+            batch_results = self.call_batch(batch)
+            for data, result in zip(batch, batch_results):
+                self.cache_result(data, result)
+            results.extend(batch_results)
+        return results
+
+    def batch(self, batch_size=BATCH_SIZE):
+        return Batch(self, batch_size)
@@ -0,0 +1,82 @@
+from __future__ import print_function, unicode_literals
+
+import six
+
+from .exceptions import APIError
+
+
+class BatchResult(object):
+    """
+    Placeholder for a result of a call queued within a :class:`Batch`.
+    """
+
+    def __init__(self, method, params):
+        self.method = method
+        self.params = params
+        self.done = False
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+        self.done = True
+
+    @property
+    def error(self):
+        if isinstance(self.value, Exception):
+            return self.value
+
+    @property
+    def result(self):
+        if not self.done:
+            raise APIError('`{0}` batch call was not executed yet'.format(self.method))
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class Batch(object):
+    """
+    Collects API calls and sends them as JSON-RPC batches.
+
+    All regular API methods can be called on the batch however
+    instead of results they return :class:`BatchResult` placeholders
+    which are populated once the batch is executed::
+
+        with api.batch() as batch:
+            photos = [batch.LoadPhoto(i) for i in ids]
+        photos = [i.result for i in photos]
+
+    Only methods which make a single ``call`` can be batched
+    (e.g. not ``Authenticate`` or ``UploadPhoto``).
+    """
+
+    def __init__(self, api, batch_size):
+        self.api = api
+        self.batch_size = batch_size
+        self.pending = []
+
+    def __getattr__(self, name):
+        attr = getattr(type(self.api), name, None)
+        if callable(attr):
+            return six.create_bound_method(six.get_unbound_function(attr), self)
+        return getattr(self.api, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+    def call(self, method, params=None):
+        result = BatchResult(method, params)
+        self.pending.append(result)
+        return result
+
+    def execute(self):
+        pending, self.pending = self.pending, []
+        results = self.api.call_many([(i.method, i.params) for i in pending],
+                                     self.batch_size)
+        for placeholder, value in zip(pending, results):
+            placeholder.set(value)
+        return pending
@@ -0,0 +1,318 @@
+from __future__ import print_function, unicode_literals
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+import six
+
+from .constants import CACHE_MAX_BYTES, CACHE_SIZE, CACHE_TTLS, READ_METHOD_PREFIXES
+from .models import Model, decode_model
+from .utils import convert_from_datetime, decode_json, decode_object
+
+
+MISSING = object()
+
+
+def is_read_method(method):
+    return method.startswith(READ_METHOD_PREFIXES)
+
+
+def find_ids(value, ids=None):
+    """
+    Find all object ``Id``s within API result.
+    """
+    if ids is None:
+        ids = set()
+    if isinstance(value, (dict, Model)):
+        if isinstance(value.get('Id'), six.integer_types):
+            ids.add(value['Id'])
+        for v in value.values():
+            if isinstance(v, (dict, list, tuple, Model)):
+                find_ids(v, ids)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            if isinstance(v, (dict, list, tuple, Model)):
+                find_ids(v, ids)
+    return ids
+
+
+def find_param_ids(params):
+    ids = set()
+    for param in params:
+        if isinstance(param, (list, tuple)):
+            ids.update(i for i in param
+                       if isinstance(i, six.integer_types) and not isinstance(i, bool))
+        elif isinstance(param, six.integer_types) and not isinstance(param, bool):
+            ids.add(param)
+    return ids
+
+
+class BaseCache(object):
+    """
+    Base class for API response caches.
+
+    Only methods listed in ``ttls`` are cached. Each cached result is
+    tagged with object ids it contains so when a mutating method
+    (e.g. ``UpdatePhoto`` or ``MovePhotos``) is called with any of
+    those ids, the result is invalidated.
+
+    Cached results are shared between callers and should be treated
+    as read-only. Results are keyed by the identity of the account
+    (see :meth:`pyzenfolio.api.PyZenfolio.get_identity`) hence private
+    results of one account are never returned to another one.
+
+    Subclasses implement the storage via ``load``, ``store``,
+    ``delete_tags`` and ``clear``.
+    """
+
+    def __init__(self, ttls=None):
+        self.ttls = dict(CACHE_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def get_key(self, method, params, identity=None):
+        return json.dumps([identity, method, params], sort_keys=True, default=six.text_type)
+
+    def get_tags(self, params, result):
+        tags = find_ids(result)
+        if params and isinstance(params[0], six.integer_types):
+            tags.add(params[0])
+        return tags
+
+    def get(self, method, params, identity=None):
+        if not self.ttls.get(method):
+            return MISSING
+        value = self.load(self.get_key(method, params, identity))
+        with self.lock:
+            if value is MISSING:
+                self.misses[method] += 1
+            else:
+                self.hits[method] += 1
+        return value
+
+    def set(self, method, params, value, identity=None):
+        ttl = self.ttls.get(method)
+        if ttl:
+            self.store(self.get_key(method, params, identity), value,
+                       time.time() + ttl, self.get_tags(params, value))
+
+    def invalidate(self, method, params):
+        tags = find_param_ids(params)
+        if tags:
+            self.delete_tags(tags)
+
+    def update(self, method, params, result, identity=None):
+        """
+        Cache ``result`` of a read method or invalidate cached
+        results touched by a mutating method (of any account).
+        """
+        if is_read_method(method):
+            self.set(method, params, result, identity)
+        else:
+            self.invalidate(method, params)
+
+    def load(self, key):
+        raise NotImplementedError
+
+    def store(self, key, value, expires, tags):
+        raise NotImplementedError
+
+    def delete_tags(self, tags):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryCache(BaseCache):
+    """
+    In-process thread-safe LRU cache with up to ``maxsize`` results.
+    """
+
+    def __init__(self, ttls=None, maxsize=CACHE_SIZE):
+        super(MemoryCache, self).__init__(ttls)
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.tags = {}
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires, tags = entry
+            if expires < time.time():
+                self.remove(key)
+                return MISSING
+            # mark as recently used
+            self.entries[key] = self.entries.pop(key)
+            return value
+
+    def store(self, key, value, expires, tags):
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = (value, expires, tags)
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(key)
+            while len(self.entries) > self.maxsize:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def remove(self, key):
+        value, expires, tags = self.entries.pop(key)
+        for tag in tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def delete_tags(self, tags):
+        with self.lock:
+            for tag in tags:
+                for key in list(self.tags.get(tag, ())):
+                    self.remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tags.clear()
+
+
+class SQLiteCache(BaseCache):
+    """
+    Persistent cache stored in a SQLite database in WAL mode.
+
+    Multiple processes on the same host can safely share the same
+    database file hence a freshly started worker can reuse results
+    already fetched by its siblings. Once the cached values exceed
+    ``max_bytes``, least recently used results are evicted.
+
+    Values are stored as zlib compressed JSON with datetimes
+    serialized back into Zenfolio ``DateTime`` objects. When ``models``
+    is set, values are decoded into :mod:`pyzenfolio.models`.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            expires REAL NOT NULL,
+            accessed REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+        CREATE TABLE IF NOT EXISTS tags (
+            tag INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            PRIMARY KEY (tag, key)
+        );
+        CREATE INDEX IF NOT EXISTS tags_key ON tags (key);
+        CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache
+        BEGIN
+            DELETE FROM tags WHERE key = old.key;
+        END;
+    """
+
+    def __init__(self, path, ttls=None, max_bytes=CACHE_MAX_BYTES, timeout=30, models=False):
+        super(SQLiteCache, self).__init__(ttls)
+        self.path = path
+        self.models = models
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.local = threading.local()
+        with self.connection as connection:
+            connection.executescript(self.SCHEMA)
+
+    @property
+    def connection(self):
+        # sqlite connections cannot be shared across threads
+        # or inherited by forked worker processes
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def encode(value):
+        def default(value):
+            if isinstance(value, datetime):
+                return convert_from_datetime(value)
+            elif isinstance(value, Model):
+                return value.to_dict()
+            raise TypeError(repr(value))
+
+        return zlib.compress(json.dumps({'result': value}, default=default).encode('utf-8'))
+
+    def decode(self, value):
+        hook = decode_model if self.models else decode_object
+        return decode_json(zlib.decompress(value), hook).result
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def load(self, key):
+        now = time.time()
+        with self.connection as connection:
+            row = connection.execute('SELECT value, expires FROM cache WHERE key = ?',
+                                     (key,)).fetchone()
+            if row is None:
+                return MISSING
+            value, expires = row
+            if expires < now:
+                connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+                return MISSING
+            connection.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return self.decode(value)
+
+    def store(self, key, value, expires, tags):
+        value = self.encode(value)
+        with self.connection as connection:
+            connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+            connection.execute('INSERT INTO cache (key, value, size, expires, accessed) '
+                               'VALUES (?, ?, ?, ?, ?)',
+                               (key, sqlite3.Binary(value), len(value), expires, time.time()))
+            connection.executemany('INSERT OR IGNORE INTO tags (tag, key) VALUES (?, ?)',
+                                   [(tag, key) for tag in tags])
+            self.evict(connection)
+
+    def evict(self, connection):
+        connection.execute('DELETE FROM cache WHERE expires < ?', (time.time(),))
+        size = connection.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+        if size <= self.max_bytes:
+            return
+        rows = connection.execute('SELECT key, size FROM cache ORDER BY accessed')
+        evict = []
+        for key, entry_size in rows:
+            if size <= self.max_bytes:
+                break
+            evict.append((key,))
+            size -= entry_size
+        connection.executemany('DELETE FROM cache WHERE key = ?', evict)
+
+    def delete_tags(self, tags):
+        with self.connection as connection:
+            connection.executemany('DELETE FROM cache WHERE key IN '
+                                   '(SELECT key FROM tags WHERE tag = ?)',
+                                   [(tag,) for tag in tags])
+
+    def clear(self):
+        with self.connection as connection:
+            connection.execute('DELETE FROM cache')
@@ -0,0 +1,78 @@
+from __future__ import print_function, unicode_literals
+import json
+
+import six
+
+from .utils import decode_object
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONCodec(object):
+    """
+    Encode requests and decode responses with the stdlib ``json``.
+    """
+
+    name = 'json'
+
+    def __init__(self):
+        self.decoders = {}
+
+    @staticmethod
+    def default(value):
+        # models passed back as params
+        if hasattr(value, 'to_dict'):
+            return value.to_dict()
+        raise TypeError('{0!r} is not JSON serializable'.format(value))
+
+    def encode(self, data):
+        return json.dumps(data, default=self.default)
+
+    def decode(self, content, hook=decode_object, reuse=True):
+        """
+        Same as :func:`pyzenfolio.utils.decode_json` except that decoders
+        are reused instead of creating a new one for each response.
+        Decoders of hooks created for a single response (e.g. timing
+        hooks of metrics) should not be reused.
+        """
+        decoder = self.decoders.get(hook) if reuse else None
+        if decoder is None:
+            decoder = json.JSONDecoder(object_pairs_hook=hook)
+            if reuse:
+                self.decoders[hook] = decoder
+        if isinstance(content, six.binary_type):
+            content = content.decode('utf-8')
+        return decoder.decode(content)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Encode requests with ``orjson``.
+
+    Responses are still decoded with the stdlib ``json`` since its
+    ``object_pairs_hook`` decodes objects in a single pass which is
+    faster than converting plain ``orjson`` output afterwards.
+    """
+
+    name = 'orjson'
+
+    def encode(self, data):
+        return orjson.dumps(data, default=self.default)
+
+
+CODECS = {
+    'json': JSONCodec,
+    'orjson': OrjsonCodec,
+}
+
+
+def get_codec(name=None):
+    """
+    Codec by ``name``. By default the fastest available one.
+    """
+    if name is None:
+        name = 'json' if orjson is None else 'orjson'
+    return CODECS[name]()
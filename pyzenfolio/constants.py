@@ -8,9 +8,80 @@ DEFAULT_CONFIG = {}
 REQUEST_HEADERS = {
     'Content-Type': 'application/json',
 }
+BATCH_SIZE = 100
+# responses to JSON-RPC batches of servers which do not support them
+BATCH_UNSUPPORTED_STATUS_CODES = (400, 404, 405)
+SYNC_BATCH_SIZE = 10
+
+AUTH_METHODS = (
+    'Authenticate',
+    'AuthenticatePlain',
+    'AuthenticateVisitor',
+    'GetChallenge',
+    'GetVisitorKey',
+)
+# methods whose params or results are passwords, tokens or keys
+SECRET_METHODS = AUTH_METHODS + (
+    'GetDownloadOriginalKey',
+    'KeyringAddKeyPlain',
+)
+# errors which mean that authentication token is invalid or expired
+AUTH_ERROR_CODES = (
+    'E_NOTAUTHENTICATED',
+)
+PAGE_SIZE = 500
+UPLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+THUMBNAIL_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+THUMBNAIL_SIZES = (10, 4)
+STREAM_CHUNK_SIZE = 64 * 1024
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 64
+# seconds to establish a connection and to wait for data on it
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 300
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
 
 DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
 
+# methods which do not modify anything on the server
+READ_METHOD_PREFIXES = (
+    'Authenticate',
+    'Get',
+    'Keyring',
+    'Load',
+    'Search',
+)
+
+# methods which are safe to retry
+IDEMPOTENT_METHOD_PREFIXES = (
+    'Get',
+    'Load',
+    'Search',
+)
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# default cache time-to-live in seconds of cacheable methods
+CACHE_TTLS = {
+    'GetCategories': 3600,
+    'GetPopularPhotos': 300,
+    'GetPopularSets': 300,
+    'GetRecentPhotos': 60,
+    'GetRecentSets': 60,
+    'LoadAccessRealm': 60,
+    'LoadGroup': 60,
+    'LoadGroupHierarchy': 60,
+    'LoadPhoto': 60,
+    'LoadPhotoSet': 60,
+    'LoadPhotoSetPhotos': 60,
+    'LoadPrivateProfile': 300,
+    'LoadPublicProfile': 300,
+}
+CACHE_SIZE = 1000
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+INTERNED_MAX_SIZE = 10000
+
 PROFILE_RESOLUTIONS = {
     50: (120, 120),
     51: (80, 80),
@@ -26,6 +97,8 @@ PHOTO_RESOLUTIONS = {
     10: (120, 120),
     11: (120, 120),
 }
+# sizes which are cropped to a square instead of being scaled
+SQUARE_PHOTO_RESOLUTIONS = frozenset([1])
 VIDEO_RESOLUTIONS = {
     200: 1080,
     210: 720,
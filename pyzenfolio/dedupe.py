@@ -0,0 +1,216 @@
+from __future__ import print_function, unicode_literals
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .constants import HASH_CHUNK_SIZE
+
+
+def hash_file(path, chunk_size=HASH_CHUNK_SIZE):
+    """
+    SHA-256 hex digest of file at ``path`` read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fid:
+        while True:
+            chunk = fid.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DuplicateIndex(object):
+    """
+    SQLite index of uploaded files by content hash and size per photoset.
+
+    Uploading a file whose content was already uploaded into the same
+    photoset only creates a duplicate hence uploads can be checked
+    against the index first::
+
+        index = DuplicateIndex('uploads.db')
+        duplicates = index.find_duplicates(photoset.Id, paths)
+
+    Files are hashed by ``workers`` threads (``hashlib`` releases the
+    GIL while hashing so all cores are used). Hashes are kept by path,
+    size and modification time so unchanged files are not hashed again.
+    ``reconcile`` matches the index against photos in the photoset.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS uploads (
+            photoset INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            photo INTEGER NOT NULL,
+            filename TEXT,
+            recorded REAL NOT NULL,
+            PRIMARY KEY (photoset, hash, size)
+        );
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            hash TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path, workers=None, chunk_size=HASH_CHUNK_SIZE, timeout=30):
+        self.path = path
+        self.workers = workers or multiprocessing.cpu_count()
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        with self.connection as connection:
+            connection.executescript(self.SCHEMA)
+
+    @property
+    def connection(self):
+        # sqlite connections cannot be shared across threads
+        # or inherited by forked worker processes
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            # each connection is only used by its thread but all of
+            # them are closed by the thread which closes the index
+            connection = sqlite3.connect(self.path, timeout=self.timeout,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+            with self.lock:
+                self.connections.append((self.local.pid, connection))
+        return connection
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM uploads').fetchone()[0]
+
+    def hash(self, path):
+        """
+        ``(size, hash)`` of file at ``path`` which is only
+        hashed when it changed since it was hashed last time.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        row = self.connection.execute('SELECT size, mtime, hash FROM files WHERE path = ?',
+                                      (path,)).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            return stat.st_size, row[2]
+
+        digest = hash_file(path, self.chunk_size)
+        with self.connection as connection:
+            connection.execute('INSERT OR REPLACE INTO files (path, size, mtime, hash) '
+                               'VALUES (?, ?, ?, ?)', (path, stat.st_size, stat.st_mtime, digest))
+        return stat.st_size, digest
+
+    def hash_files(self, paths):
+        """
+        Iterate ``(path, size, hash)`` of all ``paths`` hashed in parallel.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            paths = list(paths)
+            for path, (size, digest) in zip(paths, executor.map(self.hash, paths)):
+                yield path, size, digest
+
+    def lookup(self, photoset_id, digest, size):
+        """
+        Id of photo uploaded with the same content or ``None``.
+        """
+        row = self.connection.execute(
+            'SELECT photo FROM uploads WHERE photoset = ? AND hash = ? AND size = ?',
+            (photoset_id, digest, size)).fetchone()
+        return row[0] if row is not None else None
+
+    def add(self, photoset_id, digest, size, photo_id, filename=None):
+        self.add_many([(photoset_id, digest, size, photo_id, filename)])
+
+    def add_many(self, entries):
+        now = time.time()
+        with self.connection as connection:
+            connection.executemany('INSERT OR REPLACE INTO uploads '
+                                   '(photoset, hash, size, photo, filename, recorded) '
+                                   'VALUES (?, ?, ?, ?, ?, ?)',
+                                   [tuple(i) + (now,) for i in entries])
+
+    def find_duplicates(self, photoset_id, paths):
+        """
+        Map paths whose content was already uploaded into
+        the photoset to the id of the uploaded photo.
+        """
+        duplicates = {}
+        for path, size, digest in self.hash_files(paths):
+            photo_id = self.lookup(photoset_id, digest, size)
+            if photo_id is not None:
+                duplicates[path] = photo_id
+        return duplicates
+
+    def reconcile(self, api, photoset, paths=()):
+        """
+        Bring the index of ``photoset`` in line with its photos as
+        returned by ``LoadPhotoSetPhotos``. Entries of photos which no
+        longer exist are removed and ``paths`` whose file name and size
+        match a photo which is not indexed yet are added (paths which do
+        not exist are skipped).
+        Returns ``(added, removed)`` number of entries.
+        """
+        photos = {}
+        for photo in api.iter_photoset_photos(photoset.Id):
+            photos[photo.Id] = photo
+
+        indexed = set()
+        stale = []
+        for photo_id, digest, size in self.connection.execute(
+                'SELECT photo, hash, size FROM uploads WHERE photoset = ?', (photoset.Id,)):
+            if photo_id in photos:
+                indexed.add(photo_id)
+            else:
+                stale.append((photoset.Id, digest, size))
+        if stale:
+            with self.connection as connection:
+                connection.executemany('DELETE FROM uploads '
+                                       'WHERE photoset = ? AND hash = ? AND size = ?', stale)
+
+        by_name = {}
+        for photo in photos.values():
+            if photo.Id not in indexed and photo.get('FileName'):
+                by_name[(photo.FileName.lower(), photo.get('Size'))] = photo.Id
+
+        # only files which might match are hashed
+        candidates = []
+        for path in paths:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                # missing files cannot match any photo
+                continue
+            if (os.path.basename(path).lower(), size) in by_name:
+                candidates.append(path)
+        entries = []
+        for path, size, digest in self.hash_files(candidates):
+            photo_id = by_name.pop((os.path.basename(path).lower(), size), None)
+            if photo_id is not None:
+                entries.append((photoset.Id, digest, size, photo_id, os.path.basename(path)))
+        if entries:
+            self.add_many(entries)
+        return len(entries), len(stale)
+
+    def clear(self):
+        with self.connection as connection:
+            connection.execute('DELETE FROM uploads')
+            connection.execute('DELETE FROM files')
+
+    def close(self):
+        """
+        Close connections of all threads.
+        """
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for pid, connection in connections:
+            if pid == os.getpid():
+                connection.close()
@@ -0,0 +1,175 @@
+from __future__ import print_function, unicode_literals
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import six
+
+from .constants import BATCH_SIZE, DOWNLOAD_CHUNK_SIZE
+from .exceptions import APIError, HTTPError
+from .utils import TransferReport
+
+
+class DownloadReport(TransferReport):
+    """
+    Aggregate statistics of a bulk download.
+    """
+
+    verb = 'downloaded'
+
+    @property
+    def downloaded(self):
+        return self.completed
+
+
+class BulkDownloader(object):
+    """
+    Download original files of many photos using a pool of worker threads.
+
+    Download keys (``GetDownloadOriginalKey``) and, for photos given
+    by id, photo details (``LoadPhoto``) are resolved in batches of
+    ``batch_size``. Files are streamed to disk in chunks so memory
+    usage does not depend on the file size.
+
+    Files which already exist with the expected size are skipped.
+    Interrupted downloads are kept as ``.part`` files and resumed
+    with HTTP ``Range`` requests.
+    """
+
+    def __init__(self, api, destination, workers=4, password=None,
+                 batch_size=BATCH_SIZE, chunk_size=DOWNLOAD_CHUNK_SIZE, callback=None):
+        self.api = api
+        self.destination = destination
+        self.workers = workers
+        self.password = password
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.callback = callback
+
+    def get_path(self, photo):
+        filename = photo.get('FileName') or '{0}'.format(photo.Id)
+        # photo id prefix guarantees unique names even when multiple
+        # photos were uploaded with the same filename
+        return os.path.join(self.destination, '{0}_{1}'.format(photo.Id, filename))
+
+    def get_url(self, photo, key):
+        return photo.OriginalUrl, ({'key': key} if key else {})
+
+    def resolve_photos(self, photos):
+        """
+        Resolve photo ids into photo objects using batched
+        ``LoadPhoto`` calls and yield ``(photo, download_key)``.
+        Photos which could not be loaded and keys which could not be
+        resolved are yielded as exceptions.
+        """
+        photos = iter(photos)
+        while True:
+            batch = [i for _, i in zip(range(self.batch_size), photos)]
+            if not batch:
+                return
+
+            ids = [i for i in batch if isinstance(i, six.integer_types)]
+            if ids:
+                loaded = iter(self.api.call_many([('LoadPhoto', [i, 'Level2']) for i in ids],
+                                                 self.batch_size))
+                batch = [next(loaded) if isinstance(i, six.integer_types) else i
+                         for i in batch]
+
+            photo_ids = [i.Id for i in batch if not isinstance(i, Exception)]
+            key = None
+            if photo_ids:
+                try:
+                    key = self.api.GetDownloadOriginalKey(photo_ids, self.password)
+                except APIError as e:
+                    # fails photos of this batch instead of the whole download
+                    key = e
+            for photo in batch:
+                yield photo, key
+
+    def download_file(self, photo, key, report):
+        path = None
+        try:
+            if isinstance(photo, Exception):
+                raise photo
+            path = self.get_path(photo)
+            size = photo.get('Size')
+            if size is not None and os.path.exists(path) and os.path.getsize(path) == size:
+                report.add_skipped(path)
+                return
+            if isinstance(key, Exception):
+                raise key
+            self.fetch(photo, key, path)
+            report.add_completed(path, os.path.getsize(path), photo.Id)
+        except Exception as e:
+            report.add_failed(path or photo, e)
+            if self.callback is not None:
+                self.callback(photo, path, e)
+        else:
+            if self.callback is not None:
+                self.callback(photo, path, None)
+
+    def fetch(self, photo, key, path):
+        url, params = self.get_url(photo, key)
+        partial = path + '.part'
+        headers = self.api.get_request_headers()
+        headers.pop('Content-Type', None)
+
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        if offset:
+            headers['Range'] = 'bytes={0}-'.format(offset)
+
+        size = photo.get('Size')
+        response = self.api.transport.get(url, params=params, headers=headers, stream=True)
+        try:
+            if response.status_code == 416:
+                # requested range not satisfiable - partial file should be
+                # complete otherwise it cannot be resumed and is restarted
+                if size is not None and offset != size:
+                    if offset:
+                        os.remove(partial)
+                    raise APIError('Cannot resume `{0}` from {1} bytes of {2} bytes.'
+                                   ''.format(url, offset, size))
+            elif response.status_code in (200, 206):
+                mode = 'ab' if response.status_code == 206 else 'wb'
+                with open(partial, mode) as fid:
+                    for chunk in response.iter_content(self.chunk_size):
+                        fid.write(chunk)
+            else:
+                raise HTTPError(url,
+                                response.status_code,
+                                response.headers,
+                                response.content)
+        finally:
+            response.close()
+
+        received = os.path.getsize(partial)
+        if size is not None and received != size:
+            if received > size:
+                # cannot be completed by resuming it
+                os.remove(partial)
+            raise APIError('Downloaded {0} bytes of `{1}` instead of {2} bytes.'
+                           ''.format(received, url, size))
+        os.rename(partial, path)
+
+    def download(self, photos):
+        """
+        Download originals of ``photos`` which is an iterable of photo
+        objects and/or photo ids. Returns :class:`DownloadReport`.
+        """
+        if not os.path.isdir(self.destination):
+            os.makedirs(self.destination)
+
+        report = DownloadReport()
+        pending = set()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for photo, key in self.resolve_photos(photos):
+                if len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.add(executor.submit(self.download_file, photo, key, report))
+            wait(pending)
+
+        report.finish()
+        return report
+
+    def download_photoset(self, photoset_id):
+        return self.download(self.api.iter_photoset_photos(photoset_id))
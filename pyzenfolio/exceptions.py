@@ -11,6 +11,18 @@ class ConfigError(APIError):
     pass
 
 
+class TransportError(APIError):
+    pass
+
+
+class CircuitOpenError(APIError):
+    pass
+
+
+class ReplayError(APIError):
+    pass
+
+
 @six.python_2_unicode_compatible
 class ZenfolioError(APIError):
     def __init__(self, code, message):
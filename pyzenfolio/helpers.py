@@ -1,23 +1,283 @@
 from __future__ import print_function, unicode_literals
+import bisect
+
+from .utils import AttrDict
 
 
 class Helper(object):
     pass
 
 
+class HierarchyIndex(object):
+    """
+    Index of the group hierarchy of an account.
+
+    Hierarchy is loaded once with ``LoadGroupHierarchy`` and indexed
+    by ``Id``, ``CustomReference``, parent and keywords so lookups do
+    not walk the whole tree::
+
+        index = HierarchyIndex(api)
+        index.get(photoset_id)
+        index.search('wedding')
+        index.get_path(photoset_id)
+
+    ``refresh`` reloads the hierarchy and only reindexes elements
+    which were added, removed or changed.
+    """
+
+    SIGNATURE_FIELDS = ('Title', 'CustomReference', 'ModifiedOn', 'PhotoCount', 'Keywords')
+
+    def __init__(self, api, username=None, root=None):
+        self.api = api
+        self.username = username
+        self.root = None
+        self.by_id = {}
+        self.by_reference = {}
+        self.by_keyword = {}
+        self.parents = {}
+        self.signatures = {}
+        self.reset_search()
+        if root is None:
+            self.refresh()
+        else:
+            self.update_root(root)
+
+    def reset_search(self):
+        # search structures are rebuilt lazily on the first search
+        # after any change hence many updates cost a single rebuild
+        self.elements = None
+        self.positions = None
+        self.titles = None
+        self.offsets = None
+        self.sorted_titles = None
+
+    # ---------------------------------------------------------------#
+    #                           Indexing                             #
+    # ---------------------------------------------------------------#
+
+    @staticmethod
+    def walk(element, parent_id=None):
+        """
+        Yield ``(element, parent_id)`` of all elements in
+        depth-first order starting with ``element`` itself.
+        """
+        stack = [(element, parent_id)]
+        while stack:
+            element, parent_id = stack.pop()
+            yield element, parent_id
+            children = element.get('Elements') or []
+            stack.extend((i, element.Id) for i in reversed(children))
+
+    @staticmethod
+    def get_keywords(element):
+        return {i.lower() for i in element.get('Keywords') or []}
+
+    def get_signature(self, element, parent_id):
+        return (parent_id,) + tuple(
+            tuple(value) if isinstance(value, list) else value
+            for value in (element.get(i) for i in self.SIGNATURE_FIELDS)
+        )
+
+    def add(self, element, parent_id):
+        self.by_id[element.Id] = element
+        self.parents[element.Id] = parent_id
+        self.signatures[element.Id] = self.get_signature(element, parent_id)
+        reference = element.get('CustomReference')
+        if reference:
+            self.by_reference[reference] = element
+        for keyword in self.get_keywords(element):
+            self.by_keyword.setdefault(keyword, set()).add(element.Id)
+
+    def remove(self, element_id):
+        element = self.by_id.pop(element_id)
+        self.parents.pop(element_id)
+        self.signatures.pop(element_id)
+        reference = element.get('CustomReference')
+        if reference and self.by_reference.get(reference) is element:
+            del self.by_reference[reference]
+        for keyword in self.get_keywords(element):
+            ids = self.by_keyword.get(keyword)
+            if ids is not None:
+                ids.discard(element_id)
+                if not ids:
+                    del self.by_keyword[keyword]
+
+    def update_root(self, root):
+        """
+        Index ``root`` hierarchy reusing index entries of unchanged
+        elements. Returns ids of ``added``, ``modified`` and
+        ``removed`` elements.
+        """
+        changes = AttrDict({'added': [], 'modified': [], 'removed': []})
+        seen = set()
+
+        for element, parent_id in self.walk(root):
+            seen.add(element.Id)
+            signature = self.signatures.get(element.Id)
+            if signature is None:
+                self.add(element, parent_id)
+                changes.added.append(element.Id)
+            elif signature != self.get_signature(element, parent_id):
+                self.remove(element.Id)
+                self.add(element, parent_id)
+                changes.modified.append(element.Id)
+            else:
+                # same data but keep the latest objects
+                self.by_id[element.Id] = element
+                if element.get('CustomReference'):
+                    self.by_reference[element.CustomReference] = element
+
+        changes.removed.extend(i for i in self.by_id if i not in seen)
+        for element_id in changes.removed:
+            self.remove(element_id)
+
+        self.root = root
+        if changes.added or changes.modified or changes.removed:
+            self.reset_search()
+        else:
+            # unchanged elements have new objects hence
+            # only the element list needs to be updated
+            self.elements = None
+        return changes
+
+    def refresh(self):
+        return self.update_root(self.api.LoadGroupHierarchy(self.username))
+
+    # ---------------------------------------------------------------#
+    #                           Lookups                              #
+    # ---------------------------------------------------------------#
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, element_id):
+        return element_id in self.by_id
+
+    def get(self, element_id, default=None):
+        return self.by_id.get(element_id, default)
+
+    def get_by_reference(self, reference, default=None):
+        return self.by_reference.get(reference, default)
+
+    def get_parent(self, element_id):
+        parent_id = self.parents.get(element_id)
+        return None if parent_id is None else self.by_id[parent_id]
+
+    def get_path(self, element_id):
+        """
+        List of elements from the root group down to ``element_id``.
+        """
+        path = []
+        while element_id is not None:
+            path.append(self.by_id[element_id])
+            element_id = self.parents[element_id]
+        return path[::-1]
+
+    def get_photosets(self):
+        return [i for i in self.get_elements() if i.get('$type') == 'PhotoSet']
+
+    def get_groups(self):
+        return [i for i in self.get_elements() if i.get('$type') == 'Group']
+
+    def get_elements(self):
+        """
+        All elements in depth-first order.
+        """
+        if self.elements is None:
+            self.elements = [element for element, _ in self.walk(self.root)]
+            self.positions = {element.Id: i for i, element in enumerate(self.elements)}
+        return self.elements
+
+    # ---------------------------------------------------------------#
+    #                            Search                              #
+    # ---------------------------------------------------------------#
+
+    def build_search(self):
+        elements = self.get_elements()
+        titles = [(i.get('Title') or '').lower() for i in elements]
+        # all titles in a single string so that substring search
+        # is a few str.find calls instead of a loop over all titles
+        self.titles = '\n'.join(titles)
+        self.offsets = []
+        offset = 0
+        for title in titles:
+            self.offsets.append(offset)
+            offset += len(title) + 1
+        self.sorted_titles = sorted((title, position) for position, title in enumerate(titles))
+
+    def search(self, title, types=None):
+        """
+        Elements (excluding the root group) with ``title`` in their
+        title ignoring case in depth-first order. ``types`` can limit
+        results to e.g. ``('PhotoSet',)``.
+        """
+        if self.titles is None:
+            self.build_search()
+        title = title.lower()
+        elements = self.get_elements()
+        if not title:
+            return self.filter(elements, types)
+        if '\n' in title:
+            return []
+
+        positions = []
+        start = self.titles.find(title)
+        # title without a newline cannot match across two titles
+        while start != -1:
+            position = bisect.bisect_right(self.offsets, start) - 1
+            positions.append(position)
+            if position + 1 == len(self.offsets):
+                break
+            start = self.titles.find(title, self.offsets[position + 1])
+
+        return self.filter([elements[i] for i in positions], types)
+
+    def search_prefix(self, prefix, types=None):
+        """
+        Elements whose title starts with ``prefix`` ignoring case.
+        """
+        if self.titles is None:
+            self.build_search()
+        prefix = prefix.lower()
+        elements = self.get_elements()
+
+        positions = []
+        index = bisect.bisect_left(self.sorted_titles, (prefix,))
+        while index < len(self.sorted_titles) and self.sorted_titles[index][0].startswith(prefix):
+            positions.append(self.sorted_titles[index][1])
+            index += 1
+
+        return self.filter([elements[i] for i in sorted(positions)], types)
+
+    def search_keyword(self, keyword, types=None):
+        ids = self.by_keyword.get(keyword.lower(), ())
+        elements = self.get_elements()
+        positions = sorted(self.positions[i] for i in ids)
+        return self.filter([elements[i] for i in positions], types)
+
+    def filter(self, elements, types):
+        # root group is the account itself and never a search result
+        elements = [i for i in elements if i is not self.root]
+        if types is None:
+            return elements
+        return [i for i in elements if i.get('$type') in types]
+
+
 class SearchSetsByTitle(Helper):
-    def search(self, title, elements):
-        results = []
-        for element in elements:
-            if title.lower() in element.Title.lower():
-                results.append(element)
-            if 'Elements' in element:
-                results += self.search(title, element.Elements)
-        return results
-
-    def __call__(self, api, title, username=None):
-        hierarchy = api.LoadGroupHierarchy(username)
-        return self.search(title, hierarchy.Elements)
+    """
+    Search elements by title. Each call loads the hierarchy into a new
+    :class:`HierarchyIndex` hence repeated searches should search the
+    same index instead (pass it as ``index`` or use it directly)::
+
+        index = HierarchyIndex(api)
+        search_sets_by_title(api, 'wedding', index=index)
+        index.search('birthday')
+    """
+
+    def __call__(self, api, title, username=None, index=None):
+        if index is None:
+            index = HierarchyIndex(api, username)
+        return index.search(title)
 
 
 search_sets_by_title = SearchSetsByTitle()
@@ -0,0 +1,272 @@
+from __future__ import print_function, unicode_literals
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from six.moves.urllib.parse import quote
+
+from .constants import (
+    DOWNLOAD_CHUNK_SIZE,
+    PHOTO_RESOLUTIONS,
+    PROFILE_RESOLUTIONS,
+    SQUARE_PHOTO_RESOLUTIONS,
+    THUMBNAIL_CACHE_MAX_BYTES,
+    THUMBNAIL_SIZES,
+    VIDEO_RESOLUTIONS,
+)
+from .download import DownloadReport
+from .exceptions import APIError, HTTPError
+
+
+def get_resolution(size):
+    """
+    Bounding box ``(width, height)`` of photo ``size``.
+    """
+    resolution = PHOTO_RESOLUTIONS.get(size) or PROFILE_RESOLUTIONS.get(size)
+    if resolution is None:
+        raise APIError('Unknown photo size `{0}`'.format(size))
+    return resolution
+
+
+def build_url(photo, suffix, scheme):
+    host, core = photo.get('UrlHost'), photo.get('UrlCore')
+    if not host or not core:
+        raise APIError('Photo `{0}` has no `UrlHost` and `UrlCore`'.format(photo.get('Id')))
+
+    url = '{0}://{1}{2}-{3}'.format(scheme, host, core, suffix)
+    query = []
+    if photo.get('Sequence'):
+        query.append('sn=' + quote(photo.Sequence))
+    if photo.get('UrlToken'):
+        query.append('tk=' + quote(photo.UrlToken))
+    if query:
+        url += '?' + '&'.join(query)
+    return url
+
+
+def get_photo_url(photo, size, scheme='https'):
+    """
+    URL of ``photo`` image of ``size`` (key of ``PHOTO_RESOLUTIONS``
+    or ``PROFILE_RESOLUTIONS``) built from its ``UrlHost``,
+    ``UrlCore``, ``Sequence`` and ``UrlToken`` without any API call.
+    """
+    get_resolution(size)
+    return build_url(photo, '{0}.jpg'.format(size), scheme)
+
+
+def get_video_url(photo, resolution=210, scheme='https'):
+    """
+    URL of ``photo`` video of ``resolution`` (key of ``VIDEO_RESOLUTIONS``).
+    """
+    if resolution not in VIDEO_RESOLUTIONS:
+        raise APIError('Unknown video resolution `{0}`'.format(resolution))
+    if not photo.get('IsVideo'):
+        raise APIError('Photo `{0}` is not a video'.format(photo.get('Id')))
+    return build_url(photo, '{0}.mp4'.format(resolution), scheme)
+
+
+def get_photo_size(photo, size):
+    """
+    Dimensions ``(width, height)`` of ``photo`` image of ``size``.
+    Images are scaled down to fit the bounding box of ``size``
+    (but never up) except for square thumbnails.
+    """
+    max_width, max_height = get_resolution(size)
+    width, height = photo.get('Width'), photo.get('Height')
+    if size in SQUARE_PHOTO_RESOLUTIONS or not width or not height:
+        return max_width, max_height
+    scale = min(1.0, float(max_width) / width, float(max_height) / height)
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+def get_best_photo_size(photo, width, height):
+    """
+    Smallest (not square) photo size which fills ``width`` x ``height``
+    box when scaled to fit it or the largest one when none of them does.
+    """
+    sizes = sorted((get_photo_size(photo, size), size) for size in PHOTO_RESOLUTIONS
+                   if size not in SQUARE_PHOTO_RESOLUTIONS)
+    for (size_width, size_height), size in sizes:
+        if size_width >= width or size_height >= height:
+            return size
+    return sizes[-1][1]
+
+
+class ThumbnailCache(object):
+    """
+    Bounded on-disk cache of photo images of ``PHOTO_RESOLUTIONS`` sizes.
+
+    Files are named by photo id, size and ``Sequence`` which changes
+    whenever the photo is replaced or rotated hence outdated images are
+    never served. Once cached files exceed ``max_bytes``, least recently
+    used ones are removed. ``prewarm`` downloads images of chosen sizes
+    using ``workers`` threads so page renders find them on disk::
+
+        cache = ThumbnailCache(api, 'thumbnails')
+        cache.prewarm_photoset(photoset, sizes=(10, 4))
+        path = cache.get_cached(photo, 10)
+    """
+
+    def __init__(self, api, directory, max_bytes=THUMBNAIL_CACHE_MAX_BYTES, workers=8,
+                 scheme='https', chunk_size=DOWNLOAD_CHUNK_SIZE):
+        self.api = api
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.scheme = scheme
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+        self.files = None
+        self.bytes = 0
+
+    def get_path(self, photo, size):
+        name = '{0}'.format(photo.Id)
+        if photo.get('Sequence'):
+            name += '_' + re.sub(r'[^\w-]', '', photo.Sequence)
+        return os.path.join(self.directory, '{0}'.format(size), name + '.jpg')
+
+    def get_index(self):
+        """
+        Cached files in the least recently used first order. Index is
+        loaded from the cache directory once and then kept up to date.
+        """
+        if self.files is None:
+            files = []
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.endswith('.jpg'):
+                        stat = os.stat(os.path.join(root, name))
+                        files.append((stat.st_mtime, os.path.join(root, name), stat.st_size))
+            self.files = OrderedDict((path, size) for _, path, size in sorted(files))
+            self.bytes = sum(self.files.values())
+        return self.files
+
+    def __len__(self):
+        with self.lock:
+            return len(self.get_index())
+
+    def get_cached(self, photo, size):
+        """
+        Path of cached image or ``None`` when it is not cached.
+        """
+        path = self.get_path(photo, size)
+        with self.lock:
+            files = self.get_index()
+            if path not in files:
+                return None
+            files[path] = files.pop(path)
+        try:
+            # modification time keeps the order across processes
+            os.utime(path, None)
+        except OSError:
+            with self.lock:
+                self.bytes -= self.files.pop(path, 0)
+            return None
+        return path
+
+    def get(self, photo, size):
+        """
+        Path of cached image which is downloaded first when not cached.
+        """
+        path = self.get_cached(photo, size)
+        if path is None:
+            path, _ = self.fetch(photo, size)
+        return path
+
+    def fetch(self, photo, size):
+        url = get_photo_url(photo, size, self.scheme)
+        path = self.get_path(photo, size)
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError:
+            if not os.path.isdir(os.path.dirname(path)):
+                raise
+
+        headers = self.api.get_request_headers()
+        headers.pop('Content-Type', None)
+        # same image might be fetched by multiple threads at once
+        partial = '{0}.{1}.part'.format(path, threading.current_thread().ident)
+        try:
+            response = self.api.transport.get(url, headers=headers, stream=True)
+            try:
+                if response.status_code != 200:
+                    raise HTTPError(url,
+                                    response.status_code,
+                                    response.headers,
+                                    response.content)
+                with open(partial, 'wb') as fid:
+                    for chunk in response.iter_content(self.chunk_size):
+                        fid.write(chunk)
+            finally:
+                response.close()
+            os.rename(partial, path)
+        except Exception:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+        size = os.path.getsize(path)
+        self.add(path, size)
+        return path, size
+
+    def add(self, path, size):
+        with self.lock:
+            files = self.get_index()
+            self.bytes += size - files.pop(path, 0)
+            files[path] = size
+            while self.bytes > self.max_bytes and len(files) > 1:
+                evicted, evicted_size = files.popitem(last=False)
+                self.bytes -= evicted_size
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+
+    def warm(self, photo, size, report):
+        path = None
+        try:
+            path = self.get_cached(photo, size)
+            if path is not None:
+                report.add_skipped(path)
+                return
+            path, file_size = self.fetch(photo, size)
+            report.add_completed(path, file_size, photo.Id)
+        except Exception as e:
+            report.add_failed(path or photo, e)
+
+    def prewarm(self, photos, sizes=THUMBNAIL_SIZES):
+        """
+        Cache images of ``sizes`` of all ``photos``.
+        Returns :class:`pyzenfolio.download.DownloadReport`.
+        """
+        report = DownloadReport()
+        pending = set()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for photo in photos:
+                for size in sizes:
+                    if len(pending) >= self.workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    pending.add(executor.submit(self.warm, photo, size, report))
+            wait(pending)
+
+        report.finish()
+        return report
+
+    def prewarm_photoset(self, photoset, sizes=THUMBNAIL_SIZES):
+        photos = photoset.get('Photos')
+        if photos is None:
+            photos = self.api.iter_photoset_photos(photoset.Id)
+        return self.prewarm(photos, sizes)
+
+    def clear(self):
+        with self.lock:
+            for path in self.get_index():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.files.clear()
+            self.bytes = 0
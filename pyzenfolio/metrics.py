@@ -0,0 +1,213 @@
+from __future__ import print_function, unicode_literals
+import bisect
+import threading
+from collections import Counter
+from timeit import default_timer
+
+from .constants import LATENCY_BUCKETS
+from .exceptions import HTTPError, ZenfolioError
+
+
+class CallInfo(object):
+    """
+    Details of a single API call passed to the hooks.
+
+    Sizes and decode times are only known for calls which reached
+    the API. Since responses are decoded in a single pass, JSON
+    parsing time is the total decode time minus the time spent
+    converting ``DateTime`` objects.
+    """
+
+    __slots__ = (
+        'method', 'params', 'started', 'elapsed', 'request_bytes',
+        'response_bytes', 'decode_seconds', 'datetime_seconds', 'error',
+    )
+
+    def __init__(self, method, params):
+        self.method = method
+        self.params = params
+        self.started = default_timer()
+        self.elapsed = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.decode_seconds = 0.0
+        self.datetime_seconds = 0.0
+        self.error = None
+
+    @property
+    def parse_seconds(self):
+        return self.decode_seconds - self.datetime_seconds
+
+    def decode(self, content, hook, codec):
+        """
+        Decode ``content`` with ``codec`` (the one used by the client
+        hence the measured decode path is the same as without hooks).
+        """
+        timer = default_timer
+        datetime_seconds = [0.0]
+
+        def timed_hook(pairs):
+            if pairs and pairs[0][0] == '$type' and pairs[0][1] == 'DateTime':
+                started = timer()
+                value = hook(pairs)
+                datetime_seconds[0] += timer() - started
+                return value
+            return hook(pairs)
+
+        started = timer()
+        try:
+            return codec.decode(content, timed_hook, reuse=False)
+        finally:
+            self.decode_seconds += timer() - started
+            self.datetime_seconds += datetime_seconds[0]
+
+    def finish(self, error=None):
+        self.elapsed = default_timer() - self.started
+        self.error = error
+
+
+def get_error_label(error):
+    if isinstance(error, ZenfolioError):
+        return error.code or 'unknown'
+    if isinstance(error, HTTPError):
+        return '{0}'.format(error.status_code)
+    return type(error).__name__
+
+
+class Histogram(object):
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        Yield ``(upper_bound, count)`` pairs where each count includes
+        all lower buckets. Last bound is ``+Inf``.
+        """
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class MethodMetrics(object):
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.latency = Histogram(buckets)
+        self.calls = 0
+        self.errors = Counter()
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.parse_seconds = 0.0
+        self.datetime_seconds = 0.0
+
+
+class Metrics(object):
+    """
+    Hook which collects per method latency histograms,
+    payload sizes, decode times and error counts.
+
+    ``export`` renders all metrics in the Prometheus text format.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, prefix='zenfolio'):
+        self.buckets = buckets
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.methods = {}
+
+    def before_call(self, info):
+        pass
+
+    def after_call(self, info):
+        with self.lock:
+            metrics = self.methods.get(info.method)
+            if metrics is None:
+                metrics = self.methods[info.method] = MethodMetrics(self.buckets)
+            metrics.calls += 1
+            metrics.latency.observe(info.elapsed)
+            metrics.request_bytes += info.request_bytes
+            metrics.response_bytes += info.response_bytes
+            metrics.parse_seconds += info.parse_seconds
+            metrics.datetime_seconds += info.datetime_seconds
+            if info.error is not None:
+                metrics.errors[get_error_label(info.error)] += 1
+
+    def reset(self):
+        with self.lock:
+            self.methods = {}
+
+    @staticmethod
+    def format_labels(**labels):
+        return ','.join('{0}="{1}"'.format(k, format_label_value(v))
+                        for k, v in sorted(labels.items()))
+
+    def export(self):
+        with self.lock:
+            methods = sorted(self.methods.items())
+            lines = []
+
+            def add(name, type_, help_, samples):
+                name = '{0}_{1}'.format(self.prefix, name)
+                lines.append('# HELP {0} {1}'.format(name, help_))
+                lines.append('# TYPE {0} {1}'.format(name, type_))
+                for suffix, labels, value in samples:
+                    lines.append('{0}{1}{{{2}}} {3}'.format(name, suffix, labels,
+                                                            format_number(value)))
+
+            add('request_duration_seconds', 'histogram', 'Latency of API calls.', [
+                sample
+                for method, metrics in methods
+                for sample in self.get_histogram_samples(method, metrics.latency)
+            ])
+            add('requests_total', 'counter', 'Number of API calls.', [
+                ('', self.format_labels(method=method), metrics.calls)
+                for method, metrics in methods
+            ])
+            add('request_bytes_total', 'counter', 'Size of request bodies.', [
+                ('', self.format_labels(method=method), metrics.request_bytes)
+                for method, metrics in methods
+            ])
+            add('response_bytes_total', 'counter', 'Size of response bodies.', [
+                ('', self.format_labels(method=method), metrics.response_bytes)
+                for method, metrics in methods
+            ])
+            add('decode_seconds_total', 'counter',
+                'Time spent decoding responses by phase.', [
+                    ('', self.format_labels(method=method, phase=phase), value)
+                    for method, metrics in methods
+                    for phase, value in (('parse', metrics.parse_seconds),
+                                         ('datetime', metrics.datetime_seconds))
+                ])
+            add('errors_total', 'counter', 'Number of failed API calls by error code.', [
+                ('', self.format_labels(method=method, code=code), count)
+                for method, metrics in methods
+                for code, count in sorted(metrics.errors.items())
+            ])
+
+        return '\n'.join(lines) + '\n'
+
+    def get_histogram_samples(self, method, histogram):
+        for bound, count in histogram.cumulative():
+            yield '_bucket', self.format_labels(method=method, le=format_number(bound)), count
+        yield '_sum', self.format_labels(method=method), histogram.sum
+        yield '_count', self.format_labels(method=method), histogram.count
+
+
+def format_label_value(value):
+    return ('{0}'.format(value)
+            .replace('\\', '\\\\')
+            .replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else '{0}'.format(value)
@@ -0,0 +1,266 @@
+from __future__ import print_function, unicode_literals
+import sys
+
+import six
+
+from .constants import INTERNED_MAX_SIZE
+from .utils import decode_object, parse_datetime
+
+
+MODELS = {}
+INTERNED = {}
+
+
+def intern_string(value):
+    """
+    Intern repeated strings such as owner names, hosts or mimetypes.
+
+    Strings interned with ``sys.intern`` are released once no model
+    refers to them. ``sys.intern`` does not support unicode strings on
+    Python 2 hence a lookup table of up to ``INTERNED_MAX_SIZE`` strings
+    is used instead.
+    """
+    if six.PY3:
+        return sys.intern(value)
+    if len(INTERNED) >= INTERNED_MAX_SIZE and value not in INTERNED:
+        return value
+    return INTERNED.setdefault(value, value)
+
+
+def register(cls):
+    cls.FIELDS = frozenset(cls.__slots__)
+    MODELS[cls.__name__] = cls
+    return cls
+
+
+class Model(object):
+    """
+    Compact ``__slots__`` based alternative to ``AttrDict``.
+
+    Known fields are stored in slots. Any unexpected fields are kept
+    in a separate dict so no data returned by the API is lost.
+    Models are attribute and item compatible with ``AttrDict``
+    (``photoset.UploadUrl``, ``photoset['$type']``,
+    ``'Elements' in group``, etc).
+    """
+
+    __slots__ = ('_extra',)
+    FIELDS = frozenset()
+    INTERN = frozenset()
+
+    def __init__(self, data=None, **kwargs):
+        self._extra = None
+        data = dict(data or {}, **kwargs)
+        data.pop('$type', None)
+        for key, value in data.items():
+            self[key] = value
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        obj = cls.__new__(cls)
+        obj._extra = None
+        fields, intern = cls.FIELDS, cls.INTERN
+        for key, value in pairs:
+            if key in intern:
+                if isinstance(value, six.text_type):
+                    value = intern_string(value)
+                elif isinstance(value, list):
+                    value = [intern_string(i) if isinstance(i, six.text_type) else i
+                             for i in value]
+            if key in fields:
+                setattr(obj, key, value)
+            elif key != '$type':
+                if obj._extra is None:
+                    obj._extra = {}
+                obj._extra[key] = value
+        return obj
+
+    def __getattr__(self, name):
+        # only called when the slot is not set
+        extra = object.__getattribute__(self, '_extra')
+        if extra is not None and name in extra:
+            return extra[name]
+        raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if key == '$type':
+            return type(self).__name__
+        if key in self.FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == '$type':
+            return
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __contains__(self, key):
+        if key in self.FIELDS:
+            return hasattr(self, key)
+        return key == '$type' or (self._extra is not None and key in self._extra)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Model, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<{0} {1}>'.format(type(self).__name__, getattr(self, 'Id', ''))
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        keys = ['$type']
+        keys.extend(i for i in self.__slots__ if hasattr(self, i))
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+
+    def values(self):
+        return [self[i] for i in self.keys()]
+
+    def items(self):
+        return [(i, self[i]) for i in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+@register
+class AccessDescriptor(Model):
+    __slots__ = (
+        'RealmId', 'AccessType', 'IsDerived', 'AccessMask', 'PasswordHint',
+        'SrcPasswordHint', 'Viewers',
+    )
+    INTERN = frozenset(('AccessType', 'AccessMask'))
+
+
+@register
+class Photo(Model):
+    __slots__ = (
+        'Id', 'Width', 'Height', 'Sequence', 'AccessDescriptor', 'Owner', 'Title',
+        'Mimetype', 'Size', 'Gallery', 'OriginalUrl', 'UrlCore', 'UrlHost',
+        'UrlToken', 'PageUrl', 'MailboxId', 'TextCn', 'Flags', 'IsVideo',
+        'Duration', 'Caption', 'FileName', 'UploadedOn', 'TakenOn', 'Keywords',
+        'Categories', 'Copyright', 'Rotation', 'ExifTags', 'ShortExif', 'Views',
+        'FileHash', 'PricingKey',
+    )
+    INTERN = frozenset((
+        'Owner', 'Mimetype', 'UrlHost', 'Flags', 'Copyright', 'Rotation',
+        'Keywords', 'Categories', 'Sequence',
+    ))
+
+
+@register
+class PhotoSet(Model):
+    __slots__ = (
+        'Id', 'GroupIndex', 'Title', 'AccessDescriptor', 'Owner', 'HideBranding',
+        'Type', 'Caption', 'CreatedOn', 'ModifiedOn', 'PhotoCount', 'VideoCount',
+        'PhotoBytes', 'Views', 'TitlePhoto', 'IsRandomTitlePhoto', 'ParentGroups',
+        'Photos', 'Keywords', 'Categories', 'UploadUrl', 'VideoUploadUrl',
+        'PageUrl', 'MailboxId', 'TextCn', 'FeaturedIndex', 'IsFeatured',
+        'CustomReference', 'PricingKey',
+    )
+    INTERN = frozenset(('Owner', 'Type', 'Keywords', 'Categories'))
+
+
+@register
+class Group(Model):
+    __slots__ = (
+        'Id', 'GroupIndex', 'Title', 'AccessDescriptor', 'Owner', 'HideBranding',
+        'CreatedOn', 'ModifiedOn', 'PageUrl', 'TitlePhoto', 'MailboxId',
+        'ImmediateChildrenCount', 'TextCn', 'Caption', 'CollectionCount',
+        'SubGroupCount', 'GalleryCount', 'PhotoCount', 'ParentGroups', 'Elements',
+        'CustomReference',
+    )
+    INTERN = frozenset(('Owner',))
+
+
+@register
+class Message(Model):
+    __slots__ = (
+        'MailboxId', 'Index', 'CreatedOn', 'PosterName', 'PosterUrl',
+        'PosterEmail', 'Body', 'IsPrivate', 'IsDeleted', 'PhotoId',
+    )
+
+
+@register
+class User(Model):
+    __slots__ = (
+        'LoginName', 'DisplayName', 'FirstName', 'LastName', 'PrimaryEmail',
+        'BioPhoto', 'Bio', 'Views', 'GalleryCount', 'CollectionCount',
+        'PhotoCount', 'PhotoBytes', 'UserSince', 'LastUpdated', 'PublicAddress',
+        'PersonalAddress', 'RecentPhotoSets', 'FeaturedPhotoSets', 'RootGroup',
+        'ReferralCode', 'ExpiresOn', 'Balance', 'DomainName', 'StorageQuota',
+        'PhotoBytesQuota', 'VideoBytesQuota', 'VideoDurationQuota',
+    )
+
+
+@register
+class ExifTag(Model):
+    __slots__ = ('Id', 'Value', 'DisplayValue')
+
+
+@register
+class PhotoResult(Model):
+    __slots__ = ('Photos', 'TotalCount')
+
+
+@register
+class PhotoSetResult(Model):
+    __slots__ = ('PhotoSets', 'TotalCount')
+
+
+@register
+class AuthChallenge(Model):
+    __slots__ = ('PasswordSalt', 'Challenge')
+
+
+def decode_model(pairs):
+    """
+    ``object_pairs_hook`` which decodes objects with known ``$type``
+    into :class:`Model` instances and everything else same as
+    :func:`pyzenfolio.utils.decode_object`.
+    """
+    if pairs and pairs[0][0] == '$type':
+        type_ = pairs[0][1]
+    else:
+        type_ = next((v for k, v in pairs if k == '$type'), None)
+
+    if type_ in MODELS:
+        return MODELS[type_].from_pairs(pairs)
+    elif type_ == 'DateTime':
+        return parse_datetime(dict(pairs)['Value'])
+    return decode_object(pairs)
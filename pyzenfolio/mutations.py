@@ -0,0 +1,304 @@
+from __future__ import print_function, unicode_literals
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .constants import BATCH_SIZE, DEFAULT_OBJECTS
+
+
+# index of the photo id in params of queued methods
+PHOTO_PARAM = {
+    'UpdatePhoto': 0,
+    'MovePhoto': 1,
+    'DeletePhoto': 0,
+    'CollectionAddPhoto': 1,
+}
+
+
+class Mutation(object):
+    """
+    Queued operation. ``future`` is resolved with the result
+    (or the exception) of the request which applied it.
+    """
+
+    def __init__(self, method, params):
+        self.method = method
+        self.params = params
+        self.future = Future()
+
+    def __repr__(self):
+        return '<Mutation {0}{1}>'.format(self.method, self.params)
+
+
+class MutationReport(object):
+    """
+    Results of a flush of :class:`MutationQueue`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.completed = []
+        self.failed = []
+        self.requests = 0
+
+    def add(self, mutations, result):
+        with self.lock:
+            self.requests += 1
+            for mutation in mutations:
+                if isinstance(result, Exception):
+                    mutation.future.set_exception(result)
+                    self.failed.append((mutation, result))
+                else:
+                    mutation.future.set_result(result)
+                    self.completed.append((mutation, result))
+
+    def __str__(self):
+        return ('{0} operations in {1} requests, {2} failed'
+                ''.format(len(self.completed) + len(self.failed),
+                          self.requests, len(self.failed)))
+
+
+class MutationQueue(object):
+    """
+    Write-behind queue which coalesces photo mutations.
+
+    Within a flush:
+
+    * successive ``UpdatePhoto`` updaters of the same photo are merged
+      into a single ``UpdatePhoto`` call
+    * ``MovePhoto`` calls without an index between the same photosets
+      are folded into ``MovePhotos`` and ``DeletePhoto`` calls into
+      ``DeletePhotos``
+    * duplicate ``CollectionAddPhoto`` calls are sent once
+
+    Operations of the same photo are applied in the order they were
+    queued. Whenever a photo repeats (other than successive updates),
+    its operation goes into the next round and rounds are sent one
+    after another. Within a round, requests are sent as JSON-RPC
+    batches of ``batch_size`` calls using up to ``workers`` threads
+    and deletes are sent after all other mutations.
+
+    Queue is flushed once it has ``max_size`` operations, by a
+    background thread after ``max_delay`` seconds (when given) or
+    explicitly with ``flush``. Each operation returns a
+    :class:`Mutation` whose ``future`` has the result of the request
+    which applied it. ``callback`` is called with
+    :class:`MutationReport` after each flush.
+
+    Updaters are validated when queued hence flushed requests
+    are sent without any further validation.
+    """
+
+    def __init__(self, api, max_size=1000, max_delay=None, workers=4,
+                 batch_size=BATCH_SIZE, callback=None):
+        self.api = api
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.workers = workers
+        self.batch_size = batch_size
+        self.callback = callback
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.pending = []
+        self.oldest = None
+        self.closed = False
+        self.thread = None
+
+    # ---------------------------------------------------------------#
+    #                          Operations                            #
+    # ---------------------------------------------------------------#
+
+    def UpdatePhoto(self, photo_id, photo=None):
+        photo = dict(photo or {})
+        self.api.validate_object(photo, 'PhotoUpdater', 'UpdatePhoto')
+        return self.add(Mutation('UpdatePhoto', [photo_id, photo]))
+
+    def MovePhoto(self, photoset_id, photo_id, dest_photoset_id, index=None):
+        return self.add(Mutation('MovePhoto', [photoset_id, photo_id, dest_photoset_id, index]))
+
+    def DeletePhoto(self, photo_id):
+        return self.add(Mutation('DeletePhoto', [photo_id]))
+
+    def CollectionAddPhoto(self, coll_id, photo_id):
+        return self.add(Mutation('CollectionAddPhoto', [coll_id, photo_id]))
+
+    def add(self, mutation):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError('Mutation queue is closed')
+            if not self.pending:
+                self.oldest = time.time()
+            self.pending.append(mutation)
+            full = len(self.pending) >= self.max_size
+            if self.max_delay is not None:
+                self.start()
+                if full:
+                    self.condition.notify()
+                return mutation
+        if full:
+            self.flush()
+        return mutation
+
+    # ---------------------------------------------------------------#
+    #                           Flushing                             #
+    # ---------------------------------------------------------------#
+
+    def plan(self, mutations):
+        """
+        Split ``mutations`` into rounds so that each photo is touched
+        by at most one request of a round. Returns coalesced requests
+        (see ``coalesce``) of each round.
+        """
+        rounds = []
+        last = {}
+        for mutation in mutations:
+            photo_id = mutation.params[PHOTO_PARAM[mutation.method]]
+            previous = last.get(photo_id)
+            if previous is None:
+                index = 0
+            elif self.can_merge(previous[1], mutation):
+                index = previous[0]
+            else:
+                index = previous[0] + 1
+            if index == len(rounds):
+                rounds.append([])
+            rounds[index].append(mutation)
+            last[photo_id] = (index, mutation)
+        return [self.coalesce(i) for i in rounds]
+
+    @staticmethod
+    def can_merge(previous, mutation):
+        if previous.method != mutation.method:
+            return False
+        return mutation.method == 'UpdatePhoto' or previous.params == mutation.params
+
+    def coalesce(self, mutations):
+        """
+        Coalesce ``mutations`` into requests. Returns lists of
+        ``(method, params, mutations)`` of all requests to be sent
+        before deletes and of deletes.
+        """
+        updates = OrderedDict()
+        moves = OrderedDict()
+        deletes = OrderedDict()
+        collections = OrderedDict()
+        requests = []
+
+        for mutation in mutations:
+            method, params = mutation.method, mutation.params
+            if method == 'UpdatePhoto':
+                updater, merged = updates.setdefault(params[0], ({}, []))
+                updater.update(params[1])
+                merged.append(mutation)
+            elif method == 'MovePhoto' and params[3] is None:
+                ids = moves.setdefault((params[0], params[2]), OrderedDict())
+                ids.setdefault(params[1], []).append(mutation)
+            elif method == 'MovePhoto':
+                requests.append((method, params, [mutation]))
+            elif method == 'DeletePhoto':
+                deletes.setdefault(params[0], []).append(mutation)
+            elif method == 'CollectionAddPhoto':
+                collections.setdefault(tuple(params), []).append(mutation)
+
+        for photo_id, (photo, merged) in updates.items():
+            updater = dict(DEFAULT_OBJECTS['PhotoUpdater'])
+            updater.update(photo)
+            requests.append(('UpdatePhoto', [photo_id, updater], merged))
+        for (coll_id, photo_id), merged in collections.items():
+            requests.append(('CollectionAddPhoto', [coll_id, photo_id], merged))
+        for (photoset_id, dest_photoset_id), ids in moves.items():
+            for chunk in self.chunks(list(ids.items())):
+                requests.append(('MovePhotos',
+                                 [photoset_id, dest_photoset_id, [i for i, _ in chunk]],
+                                 [m for _, merged in chunk for m in merged]))
+
+        delete_requests = [
+            ('DeletePhotos', [[i for i, _ in chunk]], [m for _, merged in chunk for m in merged])
+            for chunk in self.chunks(list(deletes.items()))
+        ]
+        return requests, delete_requests
+
+    def chunks(self, items):
+        return [items[i:i + self.batch_size]
+                for i in range(0, len(items), self.batch_size)]
+
+    def send(self, requests, report):
+        try:
+            results = self.api.call_many([(method, params) for method, params, _ in requests],
+                                         self.batch_size)
+        except Exception as e:
+            results = [e] * len(requests)
+        for (_, _, mutations), result in zip(requests, results):
+            report.add(mutations, result)
+
+    def execute(self, requests, report):
+        batches = self.chunks(requests)
+        if len(batches) <= 1 or self.workers <= 1:
+            for batch in batches:
+                self.send(batch, report)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(batches))) as executor:
+            for future in [executor.submit(self.send, batch, report) for batch in batches]:
+                future.result()
+
+    def flush(self):
+        """
+        Send all queued operations and return :class:`MutationReport`.
+        """
+        # flushes are serialized so that mutations of the same
+        # photo are always applied in the order they were queued
+        with self.flush_lock:
+            with self.condition:
+                mutations, self.pending, self.oldest = self.pending, [], None
+
+            report = MutationReport()
+            if mutations:
+                for requests, deletes in self.plan(mutations):
+                    self.execute(requests, report)
+                    self.execute(deletes, report)
+                if self.callback is not None:
+                    self.callback(report)
+            return report
+
+    # ---------------------------------------------------------------#
+    #                      Background flushing                       #
+    # ---------------------------------------------------------------#
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run)
+            self.thread.daemon = True
+            self.thread.start()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.closed:
+                    if self.pending:
+                        delay = self.oldest + self.max_delay - time.time()
+                        if delay <= 0 or len(self.pending) >= self.max_size:
+                            break
+                        self.condition.wait(delay)
+                    else:
+                        self.condition.wait()
+                if self.closed:
+                    return
+            self.flush()
+
+    def close(self):
+        """
+        Flush all queued operations and stop the background thread.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+        return self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
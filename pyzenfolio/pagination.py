@@ -0,0 +1,78 @@
+from __future__ import print_function, unicode_literals
+import threading
+
+from six.moves import queue
+
+
+DONE = object()
+
+
+def get_page_items(page, key=None):
+    if page is None:
+        return []
+    if key is not None:
+        return page[key] or []
+    return page
+
+
+def iter_items(fetch, page_size, prefetch=1, key=None):
+    """
+    Iterate over all items of a paged API method.
+
+    ``fetch`` is called with ``(offset, limit)`` and should return
+    a page of items (or an object which has items under ``key``).
+    Pages are fetched in a background thread up to ``prefetch`` pages
+    ahead of the consumer hence next page is already being downloaded
+    while current page is processed. Memory is bounded by
+    ``prefetch + 2`` pages regardless of the total number of items.
+    """
+    if prefetch < 1:
+        offset = 0
+        while True:
+            page = get_page_items(fetch(offset, page_size), key)
+            for item in page:
+                yield item
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    pages = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        offset = 0
+        try:
+            while not stop.is_set():
+                page = get_page_items(fetch(offset, page_size), key)
+                if not put(page) or len(page) < page_size:
+                    break
+                offset += page_size
+            put(DONE)
+        except Exception as e:
+            put(e)
+
+    producer = threading.Thread(target=produce)
+    producer.daemon = True
+    producer.start()
+
+    try:
+        while True:
+            page = pages.get()
+            if page is DONE:
+                return
+            if isinstance(page, Exception):
+                raise page
+            for item in page:
+                yield item
+    finally:
+        # consumer is done (possibly early) so release the producer
+        stop.set()
@@ -0,0 +1,53 @@
+from __future__ import print_function, unicode_literals
+import threading
+
+from .api import PyZenfolio
+from .constants import POOL_CONNECTIONS, POOL_MAXSIZE
+from .transport import RequestsTransport
+
+
+class PooledPyZenfolio(PyZenfolio):
+    """
+    :class:`PyZenfolio` which can be shared by many threads.
+
+    Requests are sent with :class:`pyzenfolio.transport.RequestsTransport`
+    which gives each thread its own ``requests.Session`` on top of a
+    single connection pool of up to ``pool_maxsize`` connections per
+    host. Threads wait for a free connection unless ``pool_block`` is
+    disabled. Authentication token is shared by all threads and only
+    one of them authenticates at a time::
+
+        api = PooledPyZenfolio(auth={...}, pool_maxsize=64)
+        api.Authenticate()
+        with ThreadPoolExecutor(max_workers=64) as executor:
+            photos = list(executor.map(api.LoadPhoto, photo_ids))
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.pool_connections = kwargs.pop('pool_connections', POOL_CONNECTIONS)
+        self.pool_maxsize = kwargs.pop('pool_maxsize', POOL_MAXSIZE)
+        self.pool_block = kwargs.pop('pool_block', True)
+        self.keep_alive = kwargs.pop('keep_alive', True)
+        super(PooledPyZenfolio, self).__init__(*args, **kwargs)
+        # reauthenticate holds the lock while calling Authenticate
+        self.auth_lock = threading.RLock()
+
+    def init_session(self):
+        if self.transport is None:
+            self.transport = RequestsTransport(pool_connections=self.pool_connections,
+                                               pool_maxsize=self.pool_maxsize,
+                                               pool_block=self.pool_block,
+                                               keep_alive=self.keep_alive)
+
+    def Authenticate(self, force=False):
+        with self.auth_lock:
+            return super(PooledPyZenfolio, self).Authenticate(force)
+
+    def close(self):
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,229 @@
+from __future__ import print_function, unicode_literals
+import json
+import os
+from hashlib import sha256
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+
+import six
+
+from .constants import AUTH_ERROR_CODES, READ_METHOD_PREFIXES, SECRET_METHODS
+from .exceptions import ReplayError
+from .transport import LocalResponse, RequestsTransport, Transport
+
+
+MODES = ('auto', 'record', 'replay')
+
+
+class ReplayTransport(Transport):
+    """
+    Transport which records JSON-RPC calls into a SQLite database at
+    ``path`` and serves them back later without any network access.
+
+    Calls are keyed by method and params only hence neither the request
+    ``id`` nor the authentication token matter. Replayed responses get
+    the id of the request. ``mode`` is one of:
+
+    * ``'auto'`` - replay recorded calls, send and record all others
+    * ``'record'`` - send all calls and record (or re-record) them
+    * ``'replay'`` - replay recorded calls, others raise :class:`ReplayError`
+
+    Only calls of ``methods`` (read methods by default) are recorded so
+    mutations are always sent. Uploads and downloads are sent as well.
+    Authentication calls and others in ``SECRET_METHODS`` are never
+    recorded hence offline clients should be given any ``token``
+    instead of authenticating. Params are stored hashed and results
+    zlib compressed. ``hits``, ``misses`` and ``recorded`` count calls
+    per method.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS calls (
+            key TEXT PRIMARY KEY,
+            method TEXT NOT NULL,
+            result BLOB NOT NULL,
+            error TEXT,
+            recorded REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path, mode='auto', transport=None, methods=READ_METHOD_PREFIXES,
+                 timeout=30):
+        super(ReplayTransport, self).__init__()
+        if mode not in MODES:
+            raise ValueError('Unknown replay mode `{0}`'.format(mode))
+        if transport is None and mode != 'replay':
+            transport = RequestsTransport()
+        self.path = path
+        self.mode = mode
+        self.transport = transport
+        self.methods = tuple(methods)
+        self.timeout = timeout
+        self.local = threading.local()
+        self.hits = Counter()
+        self.misses = Counter()
+        self.recorded = Counter()
+        with self.connection as connection:
+            connection.executescript(self.SCHEMA)
+
+    @property
+    def connection(self):
+        # sqlite connections cannot be shared across threads
+        # or inherited by forked worker processes
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM calls').fetchone()[0]
+
+    @staticmethod
+    def get_key(method, params):
+        params = json.dumps(params, sort_keys=True).encode('utf-8')
+        return '{0}:{1}'.format(method, sha256(params).hexdigest())
+
+    def should_record(self, method):
+        return method not in SECRET_METHODS and method.startswith(self.methods)
+
+    def parse_calls(self, method, params, data):
+        """
+        JSON-RPC requests sent in ``data`` and whether they are a batch.
+        Returns ``None`` for any other requests (e.g. uploads).
+        """
+        if method != 'POST' or params or not isinstance(data, (six.binary_type, six.text_type)):
+            return None
+        if isinstance(data, six.binary_type):
+            data = data.decode('utf-8')
+        try:
+            calls = json.loads(data)
+        except ValueError:
+            return None
+        batch = isinstance(calls, list)
+        if not batch:
+            calls = [calls]
+        if not all(isinstance(i, dict) and 'method' in i for i in calls):
+            return None
+        return calls, batch
+
+    def request(self, method, url, params=None, data=None, headers=None, stream=False):
+        parsed = self.parse_calls(method, params, data)
+        if parsed is not None and self.mode != 'record':
+            content = self.replay(*parsed)
+            if content is not None:
+                content = content.encode('utf-8')
+                response = LocalResponse(200, content)
+                if not stream:
+                    self.record(response, len(content))
+                return response
+
+        if self.transport is None:
+            if parsed is None:
+                raise ReplayError('Cannot send `{0}` in replay mode'.format(url))
+            raise ReplayError('Cannot send `{0}` in replay mode'.format(
+                ', '.join(i['method'] for i in parsed[0])))
+
+        # recorded responses have to be read as a whole
+        response = self.transport.request(method, url,
+                                          params=params,
+                                          data=data,
+                                          headers=headers,
+                                          stream=stream and parsed is None)
+        if parsed is not None:
+            self.save(parsed[0], response)
+            if not stream:
+                self.record(response, len(response.content))
+        return response
+
+    def replay(self, calls, batch):
+        """
+        Response body of recorded ``calls`` or ``None`` when
+        some of them were not recorded.
+        """
+        if not all(self.should_record(i['method']) for i in calls):
+            return None
+
+        rows = []
+        for call in calls:
+            rows.append(self.connection.execute(
+                'SELECT result, error FROM calls WHERE key = ?',
+                (self.get_key(call['method'], call.get('params')),)).fetchone())
+
+        missing = [call['method'] for call, row in zip(calls, rows) if row is None]
+        with self.lock:
+            if missing:
+                self.misses.update(missing)
+            else:
+                self.hits.update(i['method'] for i in calls)
+        if missing:
+            if self.mode == 'replay':
+                raise ReplayError('No recorded response of `{0}`'.format(
+                    ', '.join(sorted(set(missing)))))
+            return None
+
+        responses = [
+            '{{"id": {0}, "result": {1}, "error": {2}}}'.format(
+                json.dumps(call.get('id')),
+                zlib.decompress(result).decode('utf-8'),
+                error or 'null')
+            for call, (result, error) in zip(calls, rows)
+        ]
+        if batch:
+            return '[{0}]'.format(', '.join(responses))
+        return responses[0]
+
+    def save(self, calls, response):
+        if response.status_code != 200:
+            return
+        try:
+            responses = json.loads(response.content.decode('utf-8'))
+        except ValueError:
+            return
+        if not isinstance(responses, list):
+            responses = [responses]
+        responses = {i.get('id'): i for i in responses if isinstance(i, dict)}
+
+        rows = []
+        now = time.time()
+        for call in calls:
+            body = responses.get(call.get('id'))
+            if body is None or not self.should_record(call['method']):
+                continue
+            error = body.get('error')
+            # authentication errors depend on the token rather than on the call
+            if isinstance(error, dict) and error.get('code') in AUTH_ERROR_CODES:
+                continue
+            result = zlib.compress(json.dumps(body.get('result')).encode('utf-8'))
+            rows.append((self.get_key(call['method'], call.get('params')),
+                         call['method'],
+                         sqlite3.Binary(result),
+                         json.dumps(error) if error else None,
+                         now))
+
+        if rows:
+            with self.connection as connection:
+                connection.executemany('INSERT OR REPLACE INTO calls '
+                                       '(key, method, result, error, recorded) '
+                                       'VALUES (?, ?, ?, ?, ?)', rows)
+            with self.lock:
+                self.recorded.update(row[1] for row in rows)
+
+    def get_received_bytes(self, response, size):
+        if isinstance(response, LocalResponse) or self.transport is None:
+            return size
+        return self.transport.get_received_bytes(response, size)
+
+    def clear(self):
+        with self.connection as connection:
+            connection.execute('DELETE FROM calls')
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
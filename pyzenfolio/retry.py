@@ -0,0 +1,134 @@
+from __future__ import print_function, unicode_literals
+import random
+import threading
+import time
+from email.utils import mktime_tz, parsedate_tz
+
+from .constants import IDEMPOTENT_METHOD_PREFIXES, RETRY_STATUS_CODES
+from .exceptions import CircuitOpenError, HTTPError, TransportError
+
+
+def is_server_failure(error):
+    """
+    Whether the error means that the API is unhealthy
+    as opposed to the request being invalid.
+    """
+    if isinstance(error, TransportError):
+        return True
+    return isinstance(error, HTTPError) and error.status_code in RETRY_STATUS_CODES
+
+
+class RetryPolicy(object):
+    """
+    Retry failed requests with jittered exponential backoff.
+
+    Only transport errors and ``RETRY_STATUS_CODES`` HTTP errors of
+    idempotent methods (``Load*``, ``Get*`` and ``Search*`` by default)
+    are retried. ``Retry-After`` response header is honored unless it
+    asks to wait longer than ``max_delay`` in which case the error
+    is raised right away.
+    """
+
+    def __init__(self, retries=3, backoff=0.5, max_delay=30, methods=IDEMPOTENT_METHOD_PREFIXES):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.methods = tuple(methods)
+
+    def is_idempotent(self, methods):
+        return all(i.startswith(self.methods) for i in methods)
+
+    def get_retry_after(self, error):
+        headers = getattr(error, 'headers', None) or {}
+        value = headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            date = parsedate_tz(value)
+            if date is None:
+                return None
+            return max(mktime_tz(date) - time.time(), 0)
+
+    def get_delay(self, attempt, error):
+        """
+        Seconds to wait before retrying or ``None`` when
+        the request should not be retried.
+        """
+        retry_after = self.get_retry_after(error)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        # "full jitter" spreads retries of concurrent clients
+        return random.uniform(0, min(self.max_delay, self.backoff * 2 ** attempt))
+
+    def should_retry(self, methods, error, attempt):
+        return (attempt < self.retries
+                and is_server_failure(error)
+                and self.is_idempotent(methods))
+
+
+class CircuitBreaker(object):
+    """
+    Fail fast while the API is unhealthy.
+
+    After ``threshold`` consecutive server failures the circuit opens
+    and all calls fail with ``CircuitOpenError`` for ``timeout``
+    seconds. Then up to ``probes`` calls are let through (half-open)
+    and the circuit closes again once one of them succeeds.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold=5, timeout=30, probes=1):
+        self.threshold = threshold
+        self.timeout = timeout
+        self.probes = probes
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = 0
+
+    def before_call(self):
+        with self.lock:
+            if self.state == self.OPEN:
+                if time.time() - self.opened_at < self.timeout:
+                    raise CircuitOpenError('Circuit is open after {0} failures'
+                                           ''.format(self.failures))
+                self.state = self.HALF_OPEN
+                self.probing = 0
+            if self.state == self.HALF_OPEN:
+                if self.probing >= self.probes:
+                    raise CircuitOpenError('Circuit is half-open and already probing')
+                self.probing += 1
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probing = 0
+
+    def release(self):
+        """
+        Free the probe slot of a call which was abandoned
+        (e.g. cancelled) without telling anything about the API.
+        """
+        with self.lock:
+            if self.state == self.HALF_OPEN and self.probing:
+                self.probing -= 1
+
+    def record_failure(self, error):
+        with self.lock:
+            if not is_server_failure(error):
+                # request reached a healthy server
+                self.state = self.CLOSED
+                self.failures = 0
+                self.probing = 0
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.time()
@@ -0,0 +1,57 @@
+from __future__ import print_function, unicode_literals
+import json
+import threading
+from concurrent.futures import Future
+
+import six
+
+from .constants import AUTH_METHODS, IDEMPOTENT_METHOD_PREFIXES
+
+
+class SingleFlight(object):
+    """
+    Coalesce identical in-flight calls of idempotent methods.
+
+    While a call with the same method, params and authentication token
+    is in flight, other threads wait for it and share its result (or
+    its exception) instead of sending a duplicate request. Note that
+    all callers get the same result object. Authentication calls are
+    never coalesced.
+    """
+
+    def __init__(self, methods=IDEMPOTENT_METHOD_PREFIXES):
+        self.methods = tuple(methods)
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.coalesced = 0
+
+    def should_coalesce(self, method):
+        # each login needs its own challenge (and visitor key)
+        return method not in AUTH_METHODS and method.startswith(self.methods)
+
+    def get_key(self, method, params, token):
+        return json.dumps([method, params, token], sort_keys=True, default=six.text_type)
+
+    def do(self, key, function):
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = function()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.calls[key]
@@ -0,0 +1,169 @@
+from __future__ import print_function, unicode_literals
+import codecs
+import json
+import re
+
+from .exceptions import APIError
+from .utils import decode_object
+
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+NUMBER_START = '-0123456789'
+# characters which may follow a complete number
+NUMBER_END = ',]} \t\n\r'
+NOTHING = object()
+
+
+class Incomplete(Exception):
+    """
+    More data is needed to parse the next token.
+    """
+
+
+class ArrayFrame(object):
+    def __init__(self):
+        self.first = True
+
+
+class ObjectFrame(object):
+    def __init__(self, path, fields):
+        self.path = path
+        self.fields = fields
+        self.first = True
+
+
+class ResponseParser(object):
+    """
+    Incremental parser of a JSON-RPC response whose member at ``path``
+    (e.g. ``('result', 'Photos')``) is a list.
+
+    Response body is fed in chunks as it is received and ``feed``
+    returns an iterator of the list items completed so far, decoded
+    with ``hook``. It has to be exhausted before the next chunk is fed.
+    Items are decoded one at a time hence memory usage depends on the
+    chunk and item sizes rather than on the size of the response.
+    All other members are decoded as usual and kept in ``envelope``
+    (``id``, ``error``, ...) and ``fields`` (other members of nested
+    objects on ``path``, e.g. photoset ``Title``).
+    """
+
+    def __init__(self, path=('result',), hook=decode_object):
+        self.path = tuple(path)
+        self.decoder = json.JSONDecoder(object_pairs_hook=hook)
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.wanted = 0
+        self.eof = False
+        self.done = False
+        self.stack = None
+        self.envelope = {}
+        self.fields = {}
+
+    def feed(self, chunk):
+        self.buffer += self.text.decode(chunk)
+        return self.parse()
+
+    def close(self):
+        self.buffer += self.text.decode(b'', True)
+        self.eof = True
+        for item in self.parse():
+            yield item
+        if not self.done:
+            raise APIError('Incomplete JSON response')
+
+    def parse(self):
+        if not self.eof and len(self.buffer) < self.wanted:
+            return
+        while not self.done:
+            start = self.pos
+            try:
+                item = self.step()
+            except Incomplete:
+                self.pos = start
+                # partial value is parsed again only once the buffered
+                # data doubles hence large values are parsed in linear time
+                self.wanted = 2 * len(self.buffer) - start
+                break
+            if item is not NOTHING:
+                yield item
+        self.buffer = self.buffer[self.pos:]
+        self.wanted -= self.pos
+        self.pos = 0
+
+    def step(self):
+        """
+        Parse the next token and return list item, if it was one.
+        Frames are updated only after the whole token was parsed so
+        an incomplete token is simply parsed again once more data
+        is available.
+        """
+        if self.stack is None:
+            self.expect('{')
+            self.stack = [ObjectFrame(self.path, self.envelope)]
+            return NOTHING
+
+        frame = self.stack[-1]
+        if isinstance(frame, ArrayFrame):
+            if self.peek() == ']':
+                self.pos += 1
+                self.stack.pop()
+                return NOTHING
+            if not frame.first:
+                self.expect(',')
+            item = self.value()
+            frame.first = False
+            return item
+
+        if self.peek() == '}':
+            self.pos += 1
+            self.stack.pop()
+            self.done = not self.stack
+            return NOTHING
+        if not frame.first:
+            self.expect(',')
+        key = self.value()
+        self.expect(':')
+
+        path = frame.path
+        if path and key == path[0] and self.peek() == ('[' if len(path) == 1 else '{'):
+            self.pos += 1
+            if len(path) == 1:
+                self.stack.append(ArrayFrame())
+            else:
+                self.stack.append(ObjectFrame(path[1:], self.fields))
+        else:
+            frame.fields[key] = self.value()
+        frame.first = False
+        return NOTHING
+
+    def incomplete(self):
+        if self.eof:
+            raise APIError('Invalid JSON response')
+        raise Incomplete()
+
+    def peek(self):
+        self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+        if self.pos >= len(self.buffer):
+            self.incomplete()
+        return self.buffer[self.pos]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise APIError('Invalid JSON response, expected `{0}` at `{1}`'.format(
+                char, self.buffer[self.pos:self.pos + 20]))
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, self.pos)
+        except ValueError:
+            self.incomplete()
+        # numbers and literals might continue in the next chunk
+        # and numbers split at ``.``, ``e`` or a sign look complete
+        if not self.eof and (end == len(self.buffer) or (
+                self.buffer[self.pos] in NUMBER_START and self.buffer[end] not in NUMBER_END)):
+            self.incomplete()
+        self.pos = end
+        return value
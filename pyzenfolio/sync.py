@@ -0,0 +1,218 @@
+from __future__ import print_function, unicode_literals
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+
+from .constants import DATETIME_FORMAT, SYNC_BATCH_SIZE
+from .exceptions import APIError
+from .helpers import HierarchyIndex
+
+
+def format_datetime(value):
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    return value
+
+
+class Snapshot(object):
+    """
+    Local state of an account used to detect changes between syncs.
+
+    For each group and photoset only the fields needed for change
+    detection are kept together with photo ids of each photoset.
+    When ``path`` is given, snapshot is persisted as a JSON file
+    which is replaced atomically on each save.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path=None):
+        self.path = path
+        self.elements = {}
+        self.photos = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with io.open(self.path, 'r', encoding='utf-8') as fid:
+            data = json.load(fid)
+        if data.get('version') != self.VERSION:
+            return
+        # JSON object keys are always strings
+        self.elements = {int(k): v for k, v in data['elements'].items()}
+        self.photos = {int(k): v for k, v in data['photos'].items()}
+
+    def save(self):
+        if not self.path:
+            return
+        data = {
+            'version': self.VERSION,
+            'elements': self.elements,
+            'photos': self.photos,
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, path = tempfile.mkstemp(dir=directory, prefix='.snapshot')
+        with os.fdopen(fd, 'w') as fid:
+            json.dump(data, fid)
+        os.rename(path, self.path)
+
+
+class ChangeSet(object):
+    """
+    Changes of an account since the previous sync.
+
+    ``added``, ``modified``, ``moved`` and ``deleted`` are lists of
+    element ids. An element can be both moved and modified.
+    ``elements`` has hierarchy objects of all changed elements (except
+    deleted ones) and ``photosets`` full photosets with photos which
+    were fetched for added and modified photosets.
+    ``photos_added`` and ``photos_deleted`` map photoset ids to photo ids.
+    Photosets which could not be fetched are in ``failed`` and are
+    reported as changed again by the next sync.
+    """
+
+    def __init__(self):
+        self.added = []
+        self.modified = []
+        self.moved = []
+        self.deleted = []
+        self.elements = {}
+        self.photosets = {}
+        self.photos_added = {}
+        self.photos_deleted = {}
+        self.failed = {}
+        # snapshot entries of the whole hierarchy
+        self.entries = {}
+
+    def __bool__(self):
+        return bool(self.added or self.modified or self.moved or self.deleted)
+
+    __nonzero__ = __bool__
+
+    def __str__(self):
+        return ('{0} added, {1} modified, {2} moved, {3} deleted, '
+                '{4} photos added, {5} photos deleted, {6} failed'
+                ''.format(len(self.added), len(self.modified), len(self.moved),
+                          len(self.deleted),
+                          sum(len(i) for i in self.photos_added.values()),
+                          sum(len(i) for i in self.photos_deleted.values()),
+                          len(self.failed)))
+
+
+class AccountSync(object):
+    """
+    Incrementally sync groups and photosets of an account.
+
+    Each sync loads the group hierarchy with a single
+    ``LoadGroupHierarchy`` call and compares titles, modification
+    times and photo counts with the snapshot. Full details (with
+    photos) are only loaded for added or modified photosets, in
+    batches of ``batch_size``, hence the cost of a sync depends on
+    the number of changes rather than on the size of the account::
+
+        sync = AccountSync(api, 'snapshot.json')
+        changes = sync.sync()
+        for photoset_id, photoset in changes.photosets.items():
+            ...
+    """
+
+    FIELDS = ('Title', 'CustomReference', 'ModifiedOn', 'PhotoCount', 'VideoCount')
+
+    def __init__(self, api, snapshot=None, username=None, info_level='Level2',
+                 batch_size=SYNC_BATCH_SIZE):
+        if not isinstance(snapshot, Snapshot):
+            snapshot = Snapshot(snapshot)
+        self.api = api
+        self.snapshot = snapshot
+        self.username = username
+        self.info_level = info_level
+        self.batch_size = batch_size
+
+    def get_entry(self, element, parent_id):
+        entry = {
+            'type': element.get('$type'),
+            'parent': parent_id,
+        }
+        for field in self.FIELDS:
+            value = element.get(field)
+            if value is not None:
+                entry[field] = format_datetime(value)
+        return entry
+
+    def diff(self, root):
+        """
+        Compare hierarchy ``root`` with the snapshot without
+        loading any photosets.
+        """
+        changes = ChangeSet()
+        entries = {}
+
+        for element, parent_id in HierarchyIndex.walk(root):
+            entry = entries[element.Id] = self.get_entry(element, parent_id)
+            previous = self.snapshot.elements.get(element.Id)
+            if previous is None:
+                changes.added.append(element.Id)
+            else:
+                moved = previous['parent'] != parent_id
+                modified = any(previous.get(i) != entry.get(i) for i in self.FIELDS)
+                if moved:
+                    changes.moved.append(element.Id)
+                if modified:
+                    changes.modified.append(element.Id)
+                if not moved and not modified:
+                    continue
+            changes.elements[element.Id] = element
+
+        changes.deleted.extend(i for i in self.snapshot.elements if i not in entries)
+        changes.entries = entries
+        return changes
+
+    def fetch(self, changes):
+        """
+        Load added and modified photosets with their photos.
+        """
+        ids = [i for i in changes.added + changes.modified
+               if changes.entries[i]['type'] == 'PhotoSet']
+        calls = [('LoadPhotoSet', [i, self.info_level, True]) for i in ids]
+        results = self.api.call_many(calls, self.batch_size)
+
+        for photoset_id, result in zip(ids, results):
+            if isinstance(result, APIError):
+                changes.failed[photoset_id] = result
+                continue
+            changes.photosets[photoset_id] = result
+            photo_ids = [i.Id for i in result.get('Photos') or []]
+            previous = set(self.snapshot.photos.get(photoset_id) or [])
+            current = set(photo_ids)
+            if current - previous:
+                changes.photos_added[photoset_id] = [i for i in photo_ids if i not in previous]
+            if previous - current:
+                changes.photos_deleted[photoset_id] = sorted(previous - current)
+
+    def apply(self, changes):
+        snapshot = self.snapshot
+        for element_id in changes.deleted:
+            snapshot.elements.pop(element_id, None)
+            snapshot.photos.pop(element_id, None)
+        for element_id in set(changes.added + changes.modified + changes.moved):
+            if element_id in changes.failed:
+                # keep previous state so the photoset is fetched again
+                continue
+            snapshot.elements[element_id] = changes.entries[element_id]
+            if element_id in changes.photosets:
+                snapshot.photos[element_id] = [
+                    i.Id for i in changes.photosets[element_id].get('Photos') or []
+                ]
+
+    def sync(self):
+        """
+        Sync the account, save the snapshot and return :class:`ChangeSet`.
+        """
+        root = self.api.LoadGroupHierarchy(self.username)
+        changes = self.diff(root)
+        self.fetch(changes)
+        self.apply(changes)
+        self.snapshot.save()
+        return changes
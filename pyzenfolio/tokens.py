@@ -0,0 +1,128 @@
+from __future__ import print_function, unicode_literals
+import io
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class BaseTokenStore(object):
+    """
+    Base class for authentication token stores.
+
+    Token stores allow multiple clients (and processes) to reuse
+    the same authentication token instead of each authenticating
+    separately. ``lock`` guards authentication so concurrent clients
+    do not all request a new token at the same time.
+    """
+
+    def get(self, username):
+        raise NotImplementedError
+
+    def set(self, username, token):
+        raise NotImplementedError
+
+    def delete(self, username, token=None):
+        """
+        Delete token of ``username``. When ``token`` is given, stored
+        token is only deleted if it is still the same token.
+        """
+        raise NotImplementedError
+
+    def lock(self, username):
+        raise NotImplementedError
+
+
+class MemoryTokenStore(BaseTokenStore):
+    """
+    Token store shared by all clients within a process.
+    """
+
+    def __init__(self):
+        self.tokens = {}
+        self.locks = {}
+        self.guard = threading.Lock()
+
+    def get(self, username):
+        return self.tokens.get(username)
+
+    def set(self, username, token):
+        self.tokens[username] = token
+
+    def delete(self, username, token=None):
+        with self.guard:
+            if token is None or self.tokens.get(username) == token:
+                self.tokens.pop(username, None)
+
+    def lock(self, username):
+        with self.guard:
+            return self.locks.setdefault(username, threading.Lock())
+
+
+class FileTokenStore(BaseTokenStore):
+    """
+    Token store persisted in a JSON file shared by multiple processes.
+
+    File is replaced atomically on each write and, where ``fcntl``
+    is available, writes and authentication are guarded by exclusive
+    locks on ``.lock`` files next to it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.write_lock = threading.Lock()
+        self.auth_lock = threading.Lock()
+
+    def read(self):
+        try:
+            with io.open(self.path, 'r', encoding='utf-8') as fid:
+                return json.load(fid)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def write(self, tokens):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, path = tempfile.mkstemp(dir=directory, prefix='.tokens')
+        with os.fdopen(fd, 'w') as fid:
+            json.dump(tokens, fid)
+        os.rename(path, self.path)
+
+    def get(self, username):
+        return self.read().get(username)
+
+    def set(self, username, token):
+        with self.file_lock(self.write_lock, '.lock'):
+            tokens = self.read()
+            tokens[username] = token
+            self.write(tokens)
+
+    def delete(self, username, token=None):
+        with self.file_lock(self.write_lock, '.lock'):
+            tokens = self.read()
+            if username in tokens and (token is None or tokens[username] == token):
+                del tokens[username]
+                self.write(tokens)
+
+    @contextmanager
+    def file_lock(self, lock, suffix):
+        # flock only excludes other processes hence
+        # threads are excluded with a regular lock
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path + suffix, 'a') as fid:
+                fcntl.flock(fid, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fid, fcntl.LOCK_UN)
+
+    def lock(self, username):
+        return self.file_lock(self.auth_lock, '.auth.lock')
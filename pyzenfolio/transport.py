@@ -0,0 +1,172 @@
+from __future__ import print_function, unicode_literals
+import threading
+
+import requests
+import six
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .constants import (
+    CONNECT_TIMEOUT,
+    POOL_CONNECTIONS,
+    POOL_MAXSIZE,
+    READ_TIMEOUT,
+)
+
+
+class Transport(object):
+    """
+    Base class of HTTP transports used for all API calls and uploads.
+
+    ``request`` returns a response with the ``requests.Response``
+    interface (``status_code``, ``headers``, ``content``, ``text``,
+    ``iter_content`` and ``close``). Transports also count response
+    bytes received over the wire and after decoding (e.g. after gzip
+    decompression) hence ``saved_bytes`` tells how much compression saved.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.received_bytes = 0
+        self.decoded_bytes = 0
+
+    def request(self, method, url, params=None, data=None, headers=None, stream=False):
+        raise NotImplementedError
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    @property
+    def saved_bytes(self):
+        return self.decoded_bytes - self.received_bytes
+
+    def get_received_bytes(self, response, size):
+        return size
+
+    def record(self, response, size):
+        """
+        Count response of ``size`` decoded bytes. Non-streamed responses
+        are counted by the transport, streamed ones once they were read.
+        """
+        received = self.get_received_bytes(response, size)
+        with self.lock:
+            self.received_bytes += received
+            self.decoded_bytes += size
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    Transport using ``requests``.
+
+    Each thread gets its own ``requests.Session`` but all of them share
+    a single pool of up to ``pool_maxsize`` keep-alive connections per
+    host. When ``pool_block`` is set, threads wait for a free connection
+    instead of opening (and later discarding) extra connections.
+    ``timeout`` is a ``(connect, read)`` tuple in seconds. Responses are
+    requested gzip compressed unless ``compress`` is disabled.
+    """
+
+    def __init__(self, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                 pool_block=False, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                 compress=True, keep_alive=True):
+        super(RequestsTransport, self).__init__()
+        self.timeout = timeout
+        self.compress = compress
+        self.keep_alive = keep_alive
+        self.local = threading.local()
+        self.adapter = HTTPAdapter(pool_connections=pool_connections,
+                                   pool_maxsize=pool_maxsize,
+                                   pool_block=pool_block)
+
+    @property
+    def session(self):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+            session.mount('http://', self.adapter)
+            session.mount('https://', self.adapter)
+            session.headers['Accept-Encoding'] = 'gzip' if self.compress else 'identity'
+            if not self.keep_alive:
+                session.headers['Connection'] = 'close'
+        return session
+
+    def request(self, method, url, params=None, data=None, headers=None, stream=False):
+        response = self.session.request(method, url,
+                                        params=params,
+                                        data=data,
+                                        headers=headers,
+                                        stream=stream,
+                                        timeout=self.timeout)
+        if not stream:
+            self.record(response, len(response.content))
+        return response
+
+    def get_received_bytes(self, response, size):
+        # urllib3 counts bytes read from the socket before decompression
+        try:
+            return response.raw.tell()
+        except Exception:
+            return size
+
+    def close(self):
+        self.adapter.close()
+
+
+class LocalResponse(object):
+    def __init__(self, status_code, content, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.raw_headers = headers
+
+    @property
+    def headers(self):
+        return CaseInsensitiveDict(self.raw_headers or {})
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class LocalTransport(Transport):
+    """
+    In-memory transport which passes requests to ``handler`` instead
+    of sending them over the network, e.g. for tests::
+
+        def handler(method, url, params, data, headers):
+            request = json.loads(data)
+            return json.dumps({'id': request['id'], 'result': ..., 'error': None})
+
+        api = PyZenfolio(transport=LocalTransport(handler))
+
+    ``handler`` returns the response body or ``(status_code, body)``.
+    """
+
+    def __init__(self, handler):
+        super(LocalTransport, self).__init__()
+        self.handler = handler
+
+    def request(self, method, url, params=None, data=None, headers=None, stream=False):
+        if data is not None and not isinstance(data, (six.binary_type, six.text_type)):
+            # uploads are streamed from file objects
+            data = b''.join(data)
+        result = self.handler(method, url, params, data, headers)
+        status_code, content = result if isinstance(result, tuple) else (200, result)
+        if isinstance(content, six.text_type):
+            content = content.encode('utf-8')
+        response = LocalResponse(status_code, content)
+        if not stream:
+            self.record(response, len(content))
+        return response
@@ -0,0 +1,218 @@
+from __future__ import print_function, unicode_literals
+import io
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import six
+
+from .dedupe import DuplicateIndex
+from .utils import TransferReport
+from .validate import assert_type
+
+
+class UploadManifest(object):
+    """
+    Append-only JSON lines log of completed uploads.
+
+    Each line is written and flushed as soon as a file is uploaded
+    hence a crashed job can resume by skipping files already
+    present in the manifest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with io.open(path, 'r', encoding='utf-8') as fid:
+                for line in fid:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # partially written last line of a crashed job
+                        continue
+                    self.entries[self.get_key(entry['photoset'], entry['path'])] = entry
+        self.fid = io.open(path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def get_key(photoset_id, path):
+        return '{0}:{1}'.format(photoset_id, path)
+
+    def get_uploaded(self, photoset_id, path, size, mtime):
+        """
+        Id of photo uploaded from ``path`` or ``None`` when it was
+        not uploaded yet or it changed since it was uploaded.
+        """
+        entry = self.entries.get(self.get_key(photoset_id, path))
+        if entry is not None and entry['size'] == size and entry['mtime'] == mtime:
+            return entry['photo']
+        return None
+
+    def is_uploaded(self, photoset_id, path, size, mtime):
+        return self.get_uploaded(photoset_id, path, size, mtime) is not None
+
+    def add(self, photoset_id, path, size, mtime, photo_id):
+        entry = {
+            'photoset': photoset_id,
+            'path': path,
+            'size': size,
+            'mtime': mtime,
+            'photo': photo_id,
+        }
+        line = json.dumps(entry)
+        with self.lock:
+            self.entries[self.get_key(photoset_id, path)] = entry
+            self.fid.write(six.text_type(line) + '\n')
+            self.fid.flush()
+            os.fsync(self.fid.fileno())
+
+    def close(self):
+        self.fid.close()
+
+
+class UploadReport(TransferReport):
+    """
+    Aggregate statistics of a bulk upload.
+    """
+
+    verb = 'uploaded'
+
+    @property
+    def uploaded(self):
+        return self.completed
+
+
+class BulkUploader(object):
+    """
+    Upload many files into a photoset using a pool of worker threads.
+
+    ``manifest`` is an optional path to an :class:`UploadManifest`
+    which allows to resume interrupted uploads. ``index`` is an optional
+    path to a :class:`pyzenfolio.dedupe.DuplicateIndex` and files whose
+    content was already uploaded into the photoset are skipped even when
+    they were renamed or uploaded by another job. ``callback`` is called
+    with ``(path, photo_id, error)`` after each file is processed
+    (skipped files have the id of the photo uploaded before).
+    Failures are recorded in the report and do not abort the upload.
+    """
+
+    def __init__(self, api, photoset, manifest=None, workers=4, callback=None, index=None):
+        assert_type(photoset, 'PhotoSet', 'photoset', 'BulkUploader')
+        self.api = api
+        self.photoset = photoset
+        self.manifest = UploadManifest(manifest) if manifest else None
+        self.index = DuplicateIndex(index) if index else None
+        self.workers = workers
+        self.callback = callback
+        self.lock = threading.Lock()
+        self.uploading = {}
+
+    @staticmethod
+    def find_files(paths, extensions=None):
+        if isinstance(paths, six.string_types):
+            paths = [paths]
+        if extensions is not None:
+            extensions = {i.lower().lstrip('.') for i in extensions}
+
+        for path in paths:
+            if os.path.isdir(path):
+                for dirpath, dirnames, filenames in os.walk(path):
+                    dirnames[:] = sorted(i for i in dirnames if not i.startswith('.'))
+                    for filename in sorted(filenames):
+                        if filename.startswith('.'):
+                            continue
+                        if extensions is not None:
+                            extension = os.path.splitext(filename)[1].lower().lstrip('.')
+                            if extension not in extensions:
+                                continue
+                        yield os.path.join(dirpath, filename)
+            else:
+                yield path
+
+    def upload_file(self, path, report):
+        path = os.path.abspath(path)
+        photo_id = error = None
+        try:
+            stat = os.stat(path)
+            mtime = int(stat.st_mtime)
+            if self.manifest:
+                photo_id = self.manifest.get_uploaded(self.photoset.Id, path, stat.st_size, mtime)
+            if photo_id is not None:
+                report.add_skipped(path)
+            else:
+                if self.index is None:
+                    photo_id, uploaded = self.upload_photo(path), True
+                else:
+                    photo_id, uploaded = self.upload_unique(path)
+                if uploaded:
+                    if self.manifest:
+                        self.manifest.add(self.photoset.Id, path, stat.st_size, mtime, photo_id)
+                    report.add_completed(path, stat.st_size, photo_id)
+                else:
+                    report.add_skipped(path)
+        except Exception as e:
+            error = e
+            report.add_failed(path, e)
+        if self.callback is not None:
+            self.callback(path, photo_id, error)
+
+    def upload_photo(self, path):
+        # response is the id of the uploaded photo as text
+        return int(self.api.UploadPhoto(self.photoset, path))
+
+    def upload_unique(self, path):
+        """
+        Upload file unless the same content was already uploaded into
+        the photoset. Files with the same content as a file being
+        uploaded by another worker wait for it and are only uploaded
+        when it fails. Returns ``(photo_id, uploaded)``.
+        """
+        size, digest = self.index.hash(path)
+        key = (digest, size)
+        while True:
+            with self.lock:
+                uploading = self.uploading.get(key)
+                if uploading is None:
+                    uploading = self.uploading[key] = threading.Event()
+                    break
+            uploading.wait()
+
+        try:
+            photo_id = self.index.lookup(self.photoset.Id, digest, size)
+            if photo_id is not None:
+                return photo_id, False
+            photo_id = self.upload_photo(path)
+            self.index.add(self.photoset.Id, digest, size, photo_id, os.path.basename(path))
+            return photo_id, True
+        finally:
+            with self.lock:
+                del self.uploading[key]
+            uploading.set()
+
+    def upload(self, paths, extensions=None):
+        """
+        Upload ``paths`` which can be a directory or an iterable
+        of files and/or directories. Returns :class:`UploadReport`.
+        """
+        report = UploadReport()
+        pending = set()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for path in self.find_files(paths, extensions):
+                # bound number of queued files so huge trees are not
+                # all loaded into the executor queue at once
+                if len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.add(executor.submit(self.upload_file, path, report))
+            wait(pending)
+
+        report.finish()
+        return report
+
+    def close(self):
+        if self.manifest:
+            self.manifest.close()
+        if self.index:
+            self.index.close()
@@ -1,7 +1,14 @@
 from __future__ import print_function, unicode_literals
+import json
+import mmap
+import os
+import threading
+import time
 from datetime import datetime
 
-from .constants import DATETIME_FORMAT
+import six
+
+from .constants import DATETIME_FORMAT, UPLOAD_CHUNK_SIZE
 
 
 class AttrDict(dict):
@@ -27,7 +34,7 @@ class ConvertToDateTime(object):
         for k, v in items:
             if isinstance(v, dict):
                 if '$type' in v and v['$type'] == 'DateTime':
-                    root[k] = datetime.strptime(v['Value'], DATETIME_FORMAT)
+                    root[k] = parse_datetime(v['Value'])
                 else:
                     self.find_and_convert_dates(v, v.items())
             elif isinstance(v, (list, tuple)):
@@ -41,6 +48,47 @@ class ConvertToDateTime(object):
 convert_to_datetime = ConvertToDateTime()
 
 
+def parse_datetime(value):
+    """
+    Parse Zenfolio ``DateTime`` value.
+
+    Values in the fixed ``DATETIME_FORMAT`` are sliced directly
+    which is much faster than ``datetime.strptime``.
+    """
+    if len(value) == 19 and value[4] == '-' and value[13] == ':':
+        try:
+            return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                            int(value[11:13]), int(value[14:16]), int(value[17:19]))
+        except ValueError:
+            pass
+    return datetime.strptime(value, DATETIME_FORMAT)
+
+
+def decode_object(pairs):
+    # JSON objects are decoded bottom-up hence all nested values
+    # are already decoded and AttrDict conversion can be skipped
+    obj = AttrDict.__new__(AttrDict)
+    dict.__init__(obj, pairs)
+    if '$type' in obj and obj['$type'] == 'DateTime':
+        return parse_datetime(obj['Value'])
+    obj.__dict__ = obj
+    return obj
+
+
+def decode_json(content, hook=decode_object):
+    """
+    Decode JSON API response into ``AttrDict``s with all ``DateTime``
+    values converted to ``datetime`` objects in a single pass.
+
+    Equivalent to ``convert_to_datetime(AttrDict(json.loads(content)))``.
+    ``hook`` can be used to decode objects differently
+    (e.g. :func:`pyzenfolio.models.decode_model`).
+    """
+    if isinstance(content, six.binary_type):
+        content = content.decode('utf-8')
+    return json.loads(content, object_pairs_hook=hook)
+
+
 def convert_from_datetime(value):
     if isinstance(value, datetime):
         return AttrDict({
@@ -48,3 +96,145 @@ def convert_from_datetime(value):
             'Value': value.strftime(DATETIME_FORMAT)
         })
     return value
+
+
+class UploadStream(object):
+    """
+    File-like upload body which streams data in chunks.
+
+    ``data`` can be a file object or any buffer (``bytes``,
+    ``memoryview``, ``mmap``, etc). Buffers are never copied - chunks
+    are memoryview slices of the original buffer. ``callback`` is
+    called with ``(sent, total)`` bytes after each chunk.
+
+    When ``chunked`` is set or when the size of the data cannot be
+    determined, ``len`` is ``None`` hence the body is sent with
+    ``Transfer-Encoding: chunked``.
+    """
+
+    def __init__(self, data, callback=None, chunked=False, chunk_size=UPLOAD_CHUNK_SIZE):
+        self.callback = callback
+        self.chunk_size = chunk_size
+        self.sent = 0
+        self.owns_file = False
+
+        if isinstance(data, (six.binary_type, bytearray, memoryview, mmap.mmap)):
+            self.buffer = memoryview(data)
+            self.fid = None
+            self.total = self.buffer.nbytes
+        else:
+            self.buffer = None
+            self.fid = data
+            self.total = self.get_file_size(data)
+
+        self.len = None if chunked else self.total
+
+    @classmethod
+    def open(cls, data, *args, **kwargs):
+        """
+        Open ``data`` which can also be a path in which case
+        the file is closed when the stream is closed.
+        """
+        if isinstance(data, six.string_types):
+            stream = cls(open(data, 'rb'), *args, **kwargs)
+            stream.owns_file = True
+            return stream
+        return cls(data, *args, **kwargs)
+
+    @staticmethod
+    def get_file_size(fid):
+        try:
+            return os.fstat(fid.fileno()).st_size - fid.tell()
+        except (AttributeError, IOError, OSError, ValueError):
+            pass
+        try:
+            position = fid.tell()
+            fid.seek(0, os.SEEK_END)
+            size = fid.tell() - position
+            fid.seek(position)
+            return size
+        except (AttributeError, IOError, OSError, ValueError):
+            return None
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.chunk_size
+
+        if self.buffer is not None:
+            chunk = self.buffer[self.sent:self.sent + size]
+        else:
+            chunk = self.fid.read(size)
+
+        self.sent += len(chunk)
+        if chunk and self.callback is not None:
+            self.callback(self.sent, self.total)
+        return chunk
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        if self.owns_file:
+            self.fid.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class TransferReport(object):
+    """
+    Aggregate statistics of bulk uploads or downloads.
+    """
+
+    verb = 'transferred'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.completed = []
+        self.skipped = []
+        self.failed = []
+        self.bytes = 0
+        self.started = time.time()
+        self.finished = None
+
+    def add_completed(self, path, size, result=None):
+        with self.lock:
+            self.completed.append((path, result))
+            self.bytes += size
+
+    def add_skipped(self, path):
+        with self.lock:
+            self.skipped.append(path)
+
+    def add_failed(self, path, error):
+        with self.lock:
+            self.failed.append((path, error))
+
+    def finish(self):
+        self.finished = time.time()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def files_per_second(self):
+        return len(self.completed) / max(self.elapsed, 1e-9)
+
+    @property
+    def megabytes_per_second(self):
+        return self.bytes / 1024. / 1024. / max(self.elapsed, 1e-9)
+
+    def __str__(self):
+        return ('{0} {1}, {2} skipped, {3} failed in {4:.1f}s '
+                '({5:.1f} files/s, {6:.2f} MB/s)'
+                ''.format(len(self.completed), self.verb, len(self.skipped),
+                          len(self.failed), self.elapsed, self.files_per_second,
+                          self.megabytes_per_second))
@@ -131,6 +131,22 @@ VALID_OBJECTS = {
 }
 
 
+# compiled once so validation is a few dict and set lookups
+ENUMS = {k: frozenset(v) for k, v in VALID_ENUM.items()}
+SCHEMAS = {
+    name: {k: None if v is None else (v, ENUMS[v]) for k, v in fields.items()}
+    for name, fields in VALID_OBJECTS.items()
+}
+
+
+def is_valid_value(value, enum):
+    try:
+        return value in enum
+    except TypeError:
+        # unhashable values are never valid enum values
+        return False
+
+
 def assert_type(value, expected_type, param, method):
     if value['$type'] != expected_type:
         raise APIError('Got `{0}` instead of `{1}` value for `{2}` for `{3}` method.'
@@ -138,7 +154,7 @@ def assert_type(value, expected_type, param, method):
 
 
 def validate_value(value, data_struct, method):
-    if value not in VALID_ENUM[data_struct]:
+    if not is_valid_value(value, ENUMS[data_struct]):
         raise APIError('`{0}` is an invalid value for `{1}` enumeration for `{2}` method.'
                        ''.format(value, data_struct, method))
 
@@ -148,10 +164,13 @@ def validate_object(value, data_struct, method):
         raise APIError('`{0}` must be a dict for `{1}` method.'
                        ''.format(data_struct, method))
 
+    schema = SCHEMAS[data_struct]
     for k, v in value.items():
-        if k not in VALID_OBJECTS[data_struct]:
+        try:
+            enum = schema[k]
+        except KeyError:
             raise APIError('`{0}` is an invalid key for `{1}` object for `{2}` method.'
-                           ''.format(value, data_struct, method))
-        enum = VALID_OBJECTS[data_struct][k]
-        if enum is not None:
-            validate_value(v, enum, method)
+                           ''.format(k, data_struct, method))
+        if enum is not None and not is_valid_value(v, enum[1]):
+            raise APIError('`{0}` is an invalid value for `{1}` enumeration for `{2}` method.'
+                           ''.format(v, enum[0], method))
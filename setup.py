@@ -40,7 +40,11 @@ setup(
     install_requires=[
         'requests',
         'six',
+        'futures; python_version < "3"',
     ],
+    extras_require={
+        'async': ['aiohttp'],
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         'Intended Audience :: Developers',
@@ -0,0 +1,99 @@
+from __future__ import print_function, unicode_literals
+import json
+import threading
+
+import pytest
+
+from benchmarks.server import FakeZenfolioServer
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.transport import LocalTransport
+
+
+AUTH = {'username': 'photographer', 'password': 'secret', 'token': 'token'}
+
+
+class RPCError(Exception):
+    """
+    Raised by :class:`Server` methods to respond with a JSON-RPC error.
+    """
+
+    def __init__(self, code, message=''):
+        super(RPCError, self).__init__(code, message)
+        self.code = code
+        self.message = message
+
+
+class HTTPStatus(Exception):
+    """
+    Raised by :class:`Server` methods to respond with ``status``.
+    """
+
+    def __init__(self, status, body=''):
+        super(HTTPStatus, self).__init__(status, body)
+        self.status = status
+        self.body = body
+
+
+class Server(object):
+    """
+    :class:`LocalTransport` handler which answers JSON-RPC calls
+    (including batches) with ``methods`` and records them in ``calls``
+    as ``(method, params, token)``. Uploads are passed to ``upload``
+    and ``GET`` requests to ``download``.
+    """
+
+    def __init__(self, **methods):
+        self.methods = methods
+        self.calls = []
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def respond(self, request, token):
+        method, params = request['method'], request.get('params') or []
+        with self.lock:
+            self.calls.append((method, params, token))
+        if method not in self.methods:
+            raise HTTPStatus(500, 'Unknown method {0}'.format(method))
+        try:
+            result = self.methods[method](*params)
+        except RPCError as e:
+            error = {'code': e.code, 'message': e.message}
+            return {'id': request['id'], 'result': None, 'error': error}
+        return {'id': request['id'], 'result': result, 'error': None}
+
+    def get_methods(self):
+        return [i[0] for i in self.calls]
+
+    def __call__(self, method, url, params, data, headers):
+        with self.lock:
+            self.requests += 1
+        token = (headers or {}).get('X-Zenfolio-Token')
+        try:
+            if method == 'GET':
+                return self.methods['download'](url, params, headers)
+            if params:
+                return self.methods['upload'](url, params, data)
+            if isinstance(data, bytes):
+                data = data.decode('utf-8')
+            request = json.loads(data)
+            if isinstance(request, list):
+                return json.dumps([self.respond(i, token) for i in request])
+            return json.dumps(self.respond(request, token))
+        except HTTPStatus as e:
+            return e.status, e.body
+
+
+@pytest.fixture
+def server():
+    return Server()
+
+
+@pytest.fixture
+def api(server):
+    return PyZenfolio(auth=dict(AUTH), transport=LocalTransport(server))
+
+
+@pytest.fixture(scope='session')
+def fake_zenfolio():
+    with FakeZenfolioServer(groups=2, sets_per_group=2, photos_per_set=20) as server:
+        yield server
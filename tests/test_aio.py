@@ -0,0 +1,65 @@
+from __future__ import print_function, unicode_literals
+import asyncio
+
+import pytest
+
+from pyzenfolio.aio import AsyncPyZenfolio
+from pyzenfolio.exceptions import ZenfolioError
+
+from .conftest import AUTH
+
+
+def run(fake_zenfolio, function, **kwargs):
+    async def main():
+        async with AsyncPyZenfolio(auth=dict(AUTH), endpoint=fake_zenfolio.endpoint,
+                                   **kwargs) as api:
+            return await function(api)
+
+    return asyncio.run(main())
+
+
+def get_photoset_id(fake_zenfolio):
+    return sorted(fake_zenfolio.zenfolio.photosets)[0]
+
+
+def test_call(fake_zenfolio):
+    photoset_id = get_photoset_id(fake_zenfolio)
+
+    async def load(api):
+        return await api.LoadPhotoSet(photoset_id, 'Level1', True)
+
+    photoset = run(fake_zenfolio, load)
+    assert photoset.Id == photoset_id
+    assert len(photoset.Photos) == 20
+    assert photoset.Photos[0].UploadedOn.year >= 2010
+
+
+def test_error(fake_zenfolio):
+    async def delete(api):
+        return await api.call('DeletePhoto', [1])
+
+    with pytest.raises(ZenfolioError) as e:
+        run(fake_zenfolio, delete)
+    assert e.value.code == 'E_INVALIDPARAM'
+
+
+def test_call_many(fake_zenfolio):
+    async def load(api):
+        return await api.call_many([('LoadPhoto', [1]), ('DeletePhoto', [1]), ('LoadPhoto', [2])])
+
+    first, error, second = run(fake_zenfolio, load)
+    assert (first.Id, second.Id) == (1, 2)
+    assert isinstance(error, ZenfolioError)
+
+
+def test_iter_and_stream(fake_zenfolio):
+    photoset_id = get_photoset_id(fake_zenfolio)
+
+    async def load(api):
+        paged = [i.Id async for i in api.iter_photoset_photos(photoset_id, page_size=7)]
+        streamed = [i.Id async for i in api.stream_photoset_photos(photoset_id, 0, 100)]
+        return paged, streamed
+
+    paged, streamed = run(fake_zenfolio, load)
+    assert len(paged) == 20
+    assert paged == streamed
@@ -0,0 +1,195 @@
+from __future__ import print_function, unicode_literals
+import threading
+import time
+
+import pytest
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.exceptions import ZenfolioError
+from pyzenfolio.singleflight import SingleFlight
+from pyzenfolio.tokens import FileTokenStore, MemoryTokenStore
+from pyzenfolio.transport import LocalTransport
+
+from .conftest import RPCError, Server
+
+
+class Accounts(Server):
+    """
+    Server which issues tokens and rejects calls with any other token.
+    """
+
+    def __init__(self):
+        super(Accounts, self).__init__(
+            GetChallenge=self.get_challenge,
+            Authenticate=self.authenticate,
+            LoadPhoto=self.load_photo,
+        )
+        self.tokens = set()
+        self.challenges = 0
+        self.local = threading.local()
+
+    def get_challenge(self, username):
+        with self.lock:
+            self.challenges += 1
+            return {'PasswordSalt': [1, 2], 'Challenge': [self.challenges % 256]}
+
+    def authenticate(self, challenge, proof):
+        with self.lock:
+            token = 'token{0}'.format(len(self.tokens) + 1)
+            self.tokens.add(token)
+            return token
+
+    def load_photo(self, photo_id, level):
+        if self.local.token not in self.tokens:
+            raise RPCError('E_NOTAUTHENTICATED', 'Token expired')
+        return {'Id': photo_id}
+
+    def __call__(self, method, url, params, data, headers):
+        self.local.token = (headers or {}).get('X-Zenfolio-Token')
+        return super(Accounts, self).__call__(method, url, params, data, headers)
+
+
+def get_api(server, token=None, **kwargs):
+    auth = {'username': 'photographer', 'password': 'secret'}
+    if token:
+        auth['token'] = token
+    return PyZenfolio(auth=auth, transport=LocalTransport(server), **kwargs)
+
+
+def run_threads(count, target):
+    errors = []
+
+    def run():
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def test_authenticate():
+    server = Accounts()
+    api = get_api(server)
+    assert api.Authenticate() == 'token1'
+    assert api.LoadPhoto(1).Id == 1
+    assert server.get_methods() == ['GetChallenge', 'Authenticate', 'LoadPhoto']
+
+
+def test_reauthenticate_expired_token():
+    server = Accounts()
+    api = get_api(server, token='expired')
+    assert api.LoadPhoto(1).Id == 1
+    assert api.auth.token == 'token1'
+    assert server.get_methods() == ['LoadPhoto', 'GetChallenge', 'Authenticate', 'LoadPhoto']
+
+
+def test_no_reauthenticate_without_password():
+    server = Accounts()
+    api = PyZenfolio(auth={'token': 'expired'}, transport=LocalTransport(server))
+    with pytest.raises(ZenfolioError) as e:
+        api.LoadPhoto(1)
+    assert e.value.code == 'E_NOTAUTHENTICATED'
+
+
+def test_reauthenticate_once_under_threads():
+    server = Accounts()
+    api = get_api(server, token='expired')
+    run_threads(8, lambda: [api.LoadPhoto(i) for i in range(20)])
+    assert server.get_methods().count('Authenticate') == 1
+
+
+@pytest.mark.parametrize('store', ['memory', 'file'])
+def test_token_store_is_shared(store, tmpdir):
+    if store == 'memory':
+        store = MemoryTokenStore()
+    else:
+        store = FileTokenStore(str(tmpdir.join('tokens.json')))
+    server = Accounts()
+    first = get_api(server, token_store=store)
+    second = get_api(server, token_store=store)
+    first.Authenticate()
+    second.Authenticate()
+    assert second.auth.token == first.auth.token
+
+    # expired token is renewed once and picked up by the other client
+    server.tokens.clear()
+    first.LoadPhoto(1)
+    second.LoadPhoto(1)
+    assert second.auth.token == first.auth.token == 'token1'
+    assert server.get_methods().count('Authenticate') == 2
+
+
+def test_single_flight_under_threads():
+    release = threading.Event()
+    server = Server(LoadPhoto=lambda photo_id, level: release.wait(5) and {'Id': photo_id})
+    single_flight = SingleFlight()
+    api = get_api(server, token='token', single_flight=single_flight)
+
+    def wait_and_release():
+        deadline = time.time() + 5
+        while single_flight.coalesced < 7 and time.time() < deadline:
+            time.sleep(0.001)
+        release.set()
+
+    releaser = threading.Thread(target=wait_and_release)
+    releaser.start()
+    results = []
+    run_threads(8, lambda: results.append(api.LoadPhoto(1)))
+    releaser.join()
+    assert server.get_methods() == ['LoadPhoto']
+    assert len(results) == 8 and all(i is results[0] for i in results)
+
+
+def test_single_flight_shares_errors():
+    release = threading.Event()
+
+    def load_photo(photo_id, level):
+        release.wait(5)
+        raise RPCError('E_NOSUCHOBJECT', 'No such photo')
+
+    server = Server(LoadPhoto=load_photo)
+    single_flight = SingleFlight()
+    api = get_api(server, token='token', single_flight=single_flight)
+    errors = []
+
+    def load():
+        try:
+            api.LoadPhoto(1)
+        except ZenfolioError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while single_flight.coalesced < 3 and time.time() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 4
+    assert server.requests == 1
+
+
+def test_single_flight_does_not_coalesce_logins():
+    # every login waits until all of them sent their own request
+    barrier = threading.Barrier(4, timeout=5)
+    server = Accounts()
+    get_challenge = server.methods['GetChallenge']
+
+    def wait_for_all(username):
+        barrier.wait()
+        return get_challenge(username)
+
+    server.methods['GetChallenge'] = wait_for_all
+    single_flight = SingleFlight()
+    run_threads(4, lambda: get_api(server, single_flight=single_flight).Authenticate())
+    assert single_flight.coalesced == 0
+    assert server.challenges == 4
+    assert not single_flight.should_coalesce('GetVisitorKey')
@@ -0,0 +1,108 @@
+from __future__ import print_function, unicode_literals
+import json
+
+import pytest
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.exceptions import CircuitOpenError, HTTPError, TransportError, ZenfolioError
+from pyzenfolio.retry import CircuitBreaker
+from pyzenfolio.transport import LocalTransport
+
+from .conftest import AUTH, RPCError, Server
+
+
+class Photos(Server):
+    """
+    Server which responds to ``batch_statuses`` batches with the
+    given status (or ``'object'`` with a single non-list response
+    and ``'error'`` with a transport failure).
+    """
+
+    def __init__(self, *batch_statuses):
+        super(Photos, self).__init__(LoadPhoto=self.load_photo)
+        self.batch_statuses = list(batch_statuses)
+        self.batches = 0
+
+    def load_photo(self, photo_id, level='Level1'):
+        if photo_id < 0:
+            raise RPCError('E_NOSUCHOBJECT', 'No such photo')
+        return {'Id': photo_id}
+
+    def __call__(self, method, url, params, data, headers):
+        request = json.loads(data.decode('utf-8'))
+        if isinstance(request, list):
+            self.batches += 1
+            if self.batch_statuses:
+                self.requests += 1
+                status = self.batch_statuses.pop(0)
+                if status == 'object':
+                    return json.dumps({'id': None, 'result': None, 'error': None})
+                if status == 'error':
+                    raise IOError('Connection reset by peer')
+                return status, ''
+        return super(Photos, self).__call__(method, url, params, data, headers)
+
+
+def get_api(server):
+    return PyZenfolio(auth=dict(AUTH), transport=LocalTransport(server))
+
+
+def test_call_many():
+    server = Photos()
+    api = get_api(server)
+    results = api.call_many([('LoadPhoto', [i]) for i in (1, -1, 2, 3)], batch_size=2)
+    assert results[0].Id == 1
+    assert isinstance(results[1], ZenfolioError)
+    assert [i.Id for i in results[2:]] == [2, 3]
+    assert server.requests == 2
+
+
+def test_batch_context():
+    api = get_api(Photos())
+    with api.batch() as batch:
+        photos = [batch.LoadPhoto(i) for i in range(3)]
+    assert [i.result.Id for i in photos] == [0, 1, 2]
+
+
+def test_transient_error_keeps_batching():
+    server = Photos(503)
+    api = get_api(server)
+    results = api.call_many([('LoadPhoto', [1]), ('LoadPhoto', [2])])
+    assert all(isinstance(i, HTTPError) and i.status_code == 503 for i in results)
+    assert api.batch_supported
+
+    results = api.call_many([('LoadPhoto', [1]), ('LoadPhoto', [2])])
+    assert [i.Id for i in results] == [1, 2]
+    assert server.requests == 2
+
+
+def test_failed_batch_keeps_other_results():
+    server = Photos('error')
+    api = get_api(server)
+    results = api.call_many([('LoadPhoto', [i]) for i in range(4)], batch_size=2)
+    assert all(isinstance(i, TransportError) for i in results[:2])
+    assert [i.Id for i in results[2:]] == [2, 3]
+    assert api.batch_supported
+
+
+def test_open_circuit_keeps_other_results():
+    breaker = CircuitBreaker(threshold=1, timeout=60)
+    api = PyZenfolio(auth=dict(AUTH), transport=LocalTransport(Photos(503)),
+                     circuit_breaker=breaker)
+    results = api.call_many([('LoadPhoto', [i]) for i in range(4)], batch_size=2)
+    assert isinstance(results[0], HTTPError)
+    assert all(isinstance(i, CircuitOpenError) for i in results[2:])
+
+
+@pytest.mark.parametrize('status', [400, 404, 405, 'object'])
+def test_unsupported_batches(status):
+    server = Photos(status)
+    api = get_api(server)
+    results = api.call_many([('LoadPhoto', [1]), ('LoadPhoto', [2])])
+    assert [i.Id for i in results] == [1, 2]
+    assert not api.batch_supported
+
+    # no more batches are sent
+    api.call_many([('LoadPhoto', [3]), ('LoadPhoto', [4])])
+    assert server.batches == 1
+    assert server.requests == 5
@@ -0,0 +1,140 @@
+from __future__ import print_function, unicode_literals
+import asyncio
+import io
+import threading
+
+import pytest
+
+from pyzenfolio.aio import AsyncPyZenfolio
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.cache import MemoryCache, SQLiteCache
+from pyzenfolio.transport import LocalTransport
+from pyzenfolio.utils import AttrDict
+
+from .conftest import AUTH, Server
+
+
+@pytest.fixture
+def server():
+    def load_photoset(set_id, level, include_photos):
+        return {'$type': 'PhotoSet', 'Id': set_id, 'Title': 'Gallery',
+                'UploadUrl': 'https://up.zenfolio.com/{0}'.format(set_id),
+                'Photos': [{'Id': 10}, {'Id': 11}]}
+
+    return Server(
+        upload=lambda url, params, data: '12',
+        LoadPhotoSet=load_photoset,
+        LoadPrivateProfile=lambda: {'LoginName': 'private'},
+        UpdatePhoto=lambda photo_id, updater: {'Id': photo_id},
+        UpdatePhotoSet=lambda set_id, updater: None,
+    )
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmpdir):
+    ttls = {'LoadPhotoSet': 60, 'LoadPrivateProfile': 60}
+    if request.param == 'memory':
+        return MemoryCache(ttls=ttls)
+    return SQLiteCache(str(tmpdir.join('cache.db')), ttls=ttls)
+
+
+def get_api(server, cache, **auth):
+    return PyZenfolio(auth=auth or {'username': 'foo', 'token': 'token'},
+                      cache=cache, transport=LocalTransport(server))
+
+
+def test_hit_and_invalidate(server, cache):
+    api = get_api(server, cache)
+    assert api.LoadPhotoSet(1, 'Level1', True).Title == 'Gallery'
+    assert api.LoadPhotoSet(1, 'Level1', True).Title == 'Gallery'
+    assert server.get_methods() == ['LoadPhotoSet']
+    assert (cache.hits['LoadPhotoSet'], cache.misses['LoadPhotoSet']) == (1, 1)
+
+    # photo of the photoset was updated
+    api.UpdatePhoto(11, {'Title': 'new'})
+    api.LoadPhotoSet(1, 'Level1', True)
+    # photoset itself was updated
+    api.UpdatePhotoSet(1, {'Title': 'new'})
+    api.LoadPhotoSet(1, 'Level1', True)
+    assert server.get_methods().count('LoadPhotoSet') == 3
+
+
+def test_accounts_do_not_share_results(server, cache):
+    get_api(server, cache).LoadPrivateProfile()
+    get_api(server, cache).LoadPrivateProfile()
+    get_api(server, cache, username='bar', token='other').LoadPrivateProfile()
+    get_api(server, cache, token='anonymous').LoadPrivateProfile()
+    get_api(server, cache).LoadPrivateProfile()
+    assert server.get_methods().count('LoadPrivateProfile') == 3
+    assert cache.hits['LoadPrivateProfile'] == 2
+
+
+def test_invalidation_applies_to_all_accounts(server, cache):
+    get_api(server, cache).LoadPhotoSet(1, 'Level1', True)
+    get_api(server, cache, username='bar', token='other').UpdatePhoto(10, {})
+    get_api(server, cache).LoadPhotoSet(1, 'Level1', True)
+    assert server.get_methods().count('LoadPhotoSet') == 2
+
+
+def test_counters_under_threads(server):
+    cache = MemoryCache(ttls={'LoadPhotoSet': 60})
+    api = get_api(server, cache)
+    api.LoadPhotoSet(1, 'Level1', True)
+
+    def work():
+        for _ in range(2000):
+            api.LoadPhotoSet(1, 'Level1', True)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.hits['LoadPhotoSet'] == 16000
+
+
+def test_upload_invalidates(server, cache):
+    api = get_api(server, cache)
+    photoset = api.LoadPhotoSet(1, 'Level1', True)
+    assert api.UploadPhoto(photoset, io.BytesIO(b'photo'), 'photo.jpg') == '12'
+    api.LoadPhotoSet(1, 'Level1', True)
+    assert server.get_methods().count('LoadPhotoSet') == 2
+
+
+def test_upload_invalidates_after_upload(server, cache):
+    api = get_api(server, cache)
+    photoset = api.LoadPhotoSet(1, 'Level1', True)
+
+    def upload(url, params, data):
+        # loaded while uploading hence before the photo is added
+        api.LoadPhotoSet(1, 'Level1', True)
+        return '12'
+
+    server.methods['upload'] = upload
+    api.UploadPhoto(photoset, io.BytesIO(b'photo'), 'photo.jpg')
+    api.LoadPhotoSet(1, 'Level1', True)
+    assert server.get_methods().count('LoadPhotoSet') == 2
+
+    photoset = AttrDict({'$type': 'PhotoSet', 'UploadUrl': photoset.UploadUrl})
+    assert api.UploadPhoto(photoset, io.BytesIO(b'photo'), 'photo.jpg') == '12'
+
+
+def test_async_upload_invalidates(fake_zenfolio, tmpdir):
+    cache = MemoryCache(ttls={'LoadPhotoSet': 60})
+    photoset_id = sorted(fake_zenfolio.zenfolio.photosets)[0]
+    path = tmpdir.join('photo.jpg')
+    path.write_binary(b'photo' * 100000)
+
+    async def main():
+        async with AsyncPyZenfolio(auth=dict(AUTH), endpoint=fake_zenfolio.endpoint,
+                                   cache=cache) as api:
+            photoset = await api.LoadPhotoSet(photoset_id)
+            await api.LoadPhotoSet(photoset_id)
+            uploads = fake_zenfolio.zenfolio.uploaded_bytes
+            with open(str(path), 'rb') as fid:
+                await api.UploadPhoto(photoset, fid)
+            assert fake_zenfolio.zenfolio.uploaded_bytes - uploads == 500000
+            await api.LoadPhotoSet(photoset_id)
+
+    asyncio.run(main())
+    assert (cache.hits['LoadPhotoSet'], cache.misses['LoadPhotoSet']) == (1, 2)
@@ -0,0 +1,56 @@
+from __future__ import print_function, unicode_literals
+import json
+
+import pytest
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.codec import CODECS, JSONCodec, orjson
+from pyzenfolio.metrics import Metrics
+from pyzenfolio.models import Photo, PhotoSet
+from pyzenfolio.transport import LocalTransport
+
+from .conftest import Server
+
+
+CODEC_NAMES = ['json'] + (['orjson'] if orjson is not None else [])
+
+
+@pytest.mark.parametrize('name', CODEC_NAMES)
+def test_encode_models(name):
+    codec = CODECS[name]()
+    photo = Photo({'Id': 1, 'Title': 'Sunset'})
+    body = codec.encode({'method': 'UpdatePhoto', 'params': [photo, [photo]]})
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+    expected = {'$type': 'Photo', 'Id': 1, 'Title': 'Sunset'}
+    assert json.loads(body) == {'method': 'UpdatePhoto', 'params': [expected, [expected]]}
+    with pytest.raises(TypeError):
+        codec.encode([object()])
+
+
+class CountingCodec(JSONCodec):
+
+    def __init__(self):
+        super(CountingCodec, self).__init__()
+        self.decoded = 0
+
+    def decode(self, *args, **kwargs):
+        self.decoded += 1
+        return super(CountingCodec, self).decode(*args, **kwargs)
+
+
+def test_metrics_decode_with_codec():
+    server = Server(LoadPhotoSet=lambda set_id, level, include_photos: {
+        '$type': 'PhotoSet', 'Id': set_id, 'Photos': [{'$type': 'Photo', 'Id': 2}]})
+    codec = CountingCodec()
+    metrics = Metrics()
+    api = PyZenfolio(auth={'username': 'foo', 'token': 'token'}, models=True, codec=codec,
+                     hooks=[metrics], transport=LocalTransport(server))
+
+    for _ in range(3):
+        photoset = api.LoadPhotoSet(1, 'Level1', True)
+        assert isinstance(photoset, PhotoSet)
+        assert isinstance(photoset.Photos[0], Photo)
+    assert codec.decoded == 3
+    # decoders of per call hooks are not kept
+    assert codec.decoders == {}
@@ -0,0 +1,82 @@
+from __future__ import print_function, unicode_literals
+import hashlib
+
+import pytest
+
+from pyzenfolio import dedupe
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.dedupe import DuplicateIndex, hash_file
+from pyzenfolio.transport import LocalTransport
+from pyzenfolio.utils import AttrDict
+
+from .conftest import Server
+
+
+PHOTOSET = AttrDict({'$type': 'PhotoSet', 'Id': 1})
+
+
+@pytest.fixture
+def index(tmpdir):
+    index = DuplicateIndex(str(tmpdir.join('index.db')), workers=2, chunk_size=4)
+    yield index
+    index.close()
+
+
+def write_files(tmpdir, contents):
+    paths = []
+    for name, content in contents:
+        path = tmpdir.join('photos', name)
+        path.write_binary(content, ensure=True)
+        paths.append(str(path))
+    return paths
+
+
+def test_hash(index, tmpdir, monkeypatch):
+    path, = write_files(tmpdir, [('a.jpg', b'content')])
+    digest = hashlib.sha256(b'content').hexdigest()
+    assert hash_file(path, 3) == digest
+    assert index.hash(path) == (7, digest)
+
+    # unchanged files are not hashed again
+    monkeypatch.setattr(dedupe, 'hash_file', None)
+    assert index.hash(path) == (7, digest)
+
+
+def test_find_duplicates(index, tmpdir):
+    paths = write_files(tmpdir, [('a.jpg', b'a'), ('b.jpg', b'b'), ('renamed.jpg', b'a')])
+    assert index.find_duplicates(PHOTOSET.Id, paths) == {}
+
+    size, digest = index.hash(paths[0])
+    index.add(PHOTOSET.Id, digest, size, 100, 'a.jpg')
+    assert len(index) == 1
+    assert index.lookup(PHOTOSET.Id, digest, size) == 100
+    assert index.find_duplicates(PHOTOSET.Id, paths) == {paths[0]: 100, paths[2]: 100}
+    # other photosets have no duplicates
+    assert index.find_duplicates(2, paths) == {}
+
+    index.clear()
+    assert index.find_duplicates(PHOTOSET.Id, paths) == {}
+
+
+def test_reconcile(index, tmpdir):
+    paths = write_files(tmpdir, [('a.jpg', b'a'), ('B.JPG', b'bb'), ('c.jpg', b'c'),
+                                 ('d.jpg', b'dd')])
+    photos = [
+        {'Id': 100, 'FileName': 'a.jpg', 'Size': 1},
+        {'Id': 101, 'FileName': 'b.jpg', 'Size': 2},
+        # size does not match hence it is not the same file
+        {'Id': 103, 'FileName': 'd.jpg', 'Size': 5},
+    ]
+    server = Server(LoadPhotoSetPhotos=lambda set_id, start, limit: photos[start:start + limit])
+    api = PyZenfolio(auth={'username': 'foo', 'token': 'token'},
+                     transport=LocalTransport(server))
+
+    size, digest = index.hash(paths[2])
+    index.add(PHOTOSET.Id, digest, size, 102, 'c.jpg')
+    missing = str(tmpdir.join('photos', 'missing.jpg'))
+    assert index.reconcile(api, PHOTOSET, [missing] + paths) == (2, 1)
+    assert index.find_duplicates(PHOTOSET.Id, paths) == {paths[0]: 100, paths[1]: 101}
+
+    # indexed photos are kept
+    assert index.reconcile(api, PHOTOSET, paths) == (0, 0)
+    assert len(index) == 2
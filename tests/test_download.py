@@ -0,0 +1,158 @@
+from __future__ import print_function, unicode_literals
+import os
+
+import pytest
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.download import BulkDownloader
+from pyzenfolio.transport import LocalTransport
+from pyzenfolio.utils import AttrDict
+
+from .conftest import RPCError, Server
+
+
+CONTENT = {i: '{0}'.format(i).encode('utf-8') * 3000 for i in (1, 2, 3)}
+
+
+def get_photo(photo_id):
+    return {'$type': 'Photo', 'Id': photo_id, 'FileName': 'photo.jpg',
+            'Size': len(CONTENT[photo_id]),
+            'OriginalUrl': 'https://www.zenfolio.com/photo/{0}.jpg'.format(photo_id)}
+
+
+class Originals(object):
+    """
+    Download handler which serves ``CONTENT`` by url and honors
+    ``Range`` headers unless ``ranges`` is disabled.
+    """
+
+    def __init__(self, ranges=True):
+        self.ranges = ranges
+        self.requests = []
+
+    def __call__(self, url, params, headers):
+        self.requests.append((url, params, headers.get('Range')))
+        content = CONTENT[int(url.rsplit('/', 1)[1].split('.')[0])]
+        if self.ranges and 'Range' in headers:
+            offset = int(headers['Range'].split('=')[1].rstrip('-'))
+            if offset >= len(content):
+                return 416, ''
+            return 206, content[offset:]
+        return 200, content
+
+
+@pytest.fixture
+def originals():
+    return Originals()
+
+
+@pytest.fixture
+def server(originals):
+    return Server(
+        download=originals,
+        LoadPhoto=lambda photo_id, level: get_photo(photo_id),
+        GetDownloadOriginalKey=lambda photo_ids, password: 'key',
+    )
+
+
+@pytest.fixture
+def downloader(server, tmpdir):
+    api = PyZenfolio(auth={'username': 'foo', 'token': 'token'},
+                     transport=LocalTransport(server))
+    return BulkDownloader(api, str(tmpdir.join('originals')), workers=2)
+
+
+def read(downloader, photo_id):
+    path = downloader.get_path(AttrDict(get_photo(photo_id)))
+    with open(path, 'rb') as fid:
+        return fid.read()
+
+
+def write_partial(downloader, photo_id, content):
+    if not os.path.isdir(downloader.destination):
+        os.makedirs(downloader.destination)
+    partial = downloader.get_path(AttrDict(get_photo(photo_id))) + '.part'
+    with open(partial, 'wb') as fid:
+        fid.write(content)
+    return partial
+
+
+def test_download(downloader, server, originals):
+    report = downloader.download([1, downloader.api.LoadPhoto(2)])
+    assert (len(report.completed), len(report.failed)) == (2, 0)
+    assert read(downloader, 1) == CONTENT[1]
+    assert read(downloader, 2) == CONTENT[2]
+    assert all(params == {'key': 'key'} for _, params, _ in originals.requests)
+    assert server.get_methods().count('GetDownloadOriginalKey') == 1
+
+
+def test_skip_by_size(downloader, originals):
+    downloader.download([1])
+    report = downloader.download([1])
+    assert (len(report.completed), len(report.skipped)) == (0, 1)
+    assert len(originals.requests) == 1
+
+
+def test_resume(downloader, originals):
+    write_partial(downloader, 1, CONTENT[1][:1500])
+    report = downloader.download([1])
+    assert len(report.completed) == 1
+    assert originals.requests[0][2] == 'bytes=1500-'
+    assert read(downloader, 1) == CONTENT[1]
+
+
+def test_restart(downloader, originals):
+    # server ignores the range and sends the whole file
+    originals.ranges = False
+    write_partial(downloader, 1, b'x' * 1500)
+    report = downloader.download([1])
+    assert len(report.completed) == 1
+    assert read(downloader, 1) == CONTENT[1]
+
+
+def test_range_not_satisfiable(downloader):
+    write_partial(downloader, 1, CONTENT[1])
+    report = downloader.download([1])
+    assert len(report.completed) == 1
+    assert read(downloader, 1) == CONTENT[1]
+
+    # partial file larger than the photo is removed and restarted
+    partial = write_partial(downloader, 2, CONTENT[2] + b'x')
+    report = downloader.download([2])
+    assert len(report.failed) == 1
+    assert not os.path.exists(partial)
+    report = downloader.download([2])
+    assert len(report.completed) == 1
+    assert read(downloader, 2) == CONTENT[2]
+
+
+def test_oversized_download(downloader, originals):
+    originals.ranges = False
+    partial = write_partial(downloader, 3, b'')
+    photo = AttrDict(get_photo(3))
+    CONTENT[3], content = CONTENT[3] + b'x', CONTENT[3]
+    try:
+        report = downloader.download([photo])
+    finally:
+        CONTENT[3] = content
+    assert len(report.failed) == 1
+    assert not os.path.exists(partial)
+    assert len(downloader.download([3]).completed) == 1
+
+
+def test_failed_key_lookup(downloader, server, originals):
+    downloader.download([1])
+
+    def get_key(photo_ids, password):
+        raise RPCError('E_ACCESSDENIED', 'Access denied')
+
+    server.methods['GetDownloadOriginalKey'] = get_key
+    processed = []
+    downloader.callback = lambda photo, path, error: processed.append((photo.Id, error))
+    downloader.batch_size = 2
+    report = downloader.download([1, 2, 3])
+    # existing file does not need a key
+    assert (len(report.skipped), len(report.failed)) == (1, 2)
+    assert sorted(i for i, _ in processed) == [2, 3]
+    assert all(error.code == 'E_ACCESSDENIED' for _, error in report.failed)
+    assert len(originals.requests) == 1
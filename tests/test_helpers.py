@@ -0,0 +1,34 @@
+from __future__ import print_function, unicode_literals
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.helpers import HierarchyIndex, search_sets_by_title
+from pyzenfolio.transport import LocalTransport
+
+from .conftest import Server
+
+
+def get_hierarchy(titles):
+    return {'$type': 'Group', 'Id': 1, 'Title': 'photographer', 'Elements': [
+        {'$type': 'PhotoSet', 'Id': i + 10, 'Title': title} for i, title in enumerate(titles)
+    ]}
+
+
+def test_search_sets_by_title():
+    titles = ['Wedding', 'Birthday', 'Wedding party']
+    server = Server(LoadGroupHierarchy=lambda username: get_hierarchy(titles))
+    api = PyZenfolio(auth={'username': 'foo', 'token': 'token'},
+                     transport=LocalTransport(server))
+
+    assert [i.Id for i in search_sets_by_title(api, 'wedding')] == [10, 12]
+    titles[1] = 'Wedding rehearsal'
+    assert [i.Id for i in search_sets_by_title(api, 'wedding')] == [10, 11, 12]
+    assert server.get_methods() == ['LoadGroupHierarchy'] * 2
+    # helper keeps no state between calls
+    assert not vars(search_sets_by_title)
+
+    # repeated searches of an index do not load the hierarchy again
+    index = HierarchyIndex(api)
+    assert [i.Id for i in search_sets_by_title(api, 'party', index=index)] == [12]
+    assert [i.Id for i in search_sets_by_title(api, 'rehearsal', index=index)] == [11]
+    assert [i.Id for i in index.search('birthday')] == []
+    assert server.get_methods() == ['LoadGroupHierarchy'] * 3
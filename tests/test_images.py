@@ -0,0 +1,158 @@
+from __future__ import print_function, unicode_literals
+import os
+
+import pytest
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.exceptions import APIError
+from pyzenfolio.images import (
+    ThumbnailCache,
+    get_best_photo_size,
+    get_photo_size,
+    get_photo_url,
+    get_video_url,
+)
+from pyzenfolio.transport import LocalTransport
+from pyzenfolio.utils import AttrDict
+
+from .conftest import Server
+
+
+def get_photo(photo_id, width=4000, height=3000, **kwargs):
+    return AttrDict(dict({
+        'Id': photo_id, 'Width': width, 'Height': height,
+        'UrlHost': 'photos.zenfolio.com', 'UrlCore': '/img/s1/v2/p{0}'.format(photo_id),
+        'Sequence': '{0}'.format(photo_id),
+    }, **kwargs))
+
+
+def test_photo_url():
+    photo = get_photo(5, Sequence='a b', UrlToken='tk/1')
+    assert (get_photo_url(photo, 10)
+            == 'https://photos.zenfolio.com/img/s1/v2/p5-10.jpg?sn=a%20b&tk=tk/1')
+    photo = get_photo(5, Sequence=None)
+    assert get_photo_url(photo, 50, 'http') == 'http://photos.zenfolio.com/img/s1/v2/p5-50.jpg'
+
+    with pytest.raises(APIError):
+        get_photo_url(photo, 7)
+    with pytest.raises(APIError):
+        get_photo_url(get_photo(5, UrlHost=None), 10)
+
+    video = get_photo(6, IsVideo=True, Sequence=None)
+    assert get_video_url(video) == 'https://photos.zenfolio.com/img/s1/v2/p6-210.mp4'
+    with pytest.raises(APIError):
+        get_video_url(photo)
+    with pytest.raises(APIError):
+        get_video_url(video, 211)
+
+
+def test_photo_size():
+    photo = get_photo(1)
+    assert get_photo_size(photo, 4) == (800, 600)
+    assert get_photo_size(photo, 6) == (1280, 960)
+    # square thumbnails are cropped
+    assert get_photo_size(photo, 1) == (60, 60)
+    # small photos are never scaled up
+    assert get_photo_size(get_photo(1, 100, 50), 6) == (100, 50)
+    assert get_photo_size(get_photo(1, None, None), 4) == (800, 630)
+
+    assert get_best_photo_size(photo, 100, 50) == 0
+    assert get_best_photo_size(photo, 100, 80) == 10
+    assert get_best_photo_size(photo, 500, 300) == 2
+    assert get_best_photo_size(photo, 700, 500) == 4
+    assert get_best_photo_size(photo, 5000, 5000) == 6
+
+
+class Images(object):
+    """
+    Download handler which serves ``size`` bytes for each image.
+    """
+
+    def __init__(self, size=100):
+        self.size = size
+        self.urls = []
+
+    def __call__(self, url, params, headers):
+        self.urls.append(url)
+        return b'\xff' * self.size
+
+
+@pytest.fixture
+def images():
+    return Images()
+
+
+@pytest.fixture
+def server(images):
+    photos = [get_photo(i) for i in range(5)]
+    return Server(download=images,
+                  LoadPhotoSetPhotos=lambda set_id, start, limit: photos[start:start + limit])
+
+
+def get_cache(server, tmpdir, **kwargs):
+    api = PyZenfolio(auth={'username': 'foo', 'token': 'token'},
+                     transport=LocalTransport(server))
+    return ThumbnailCache(api, str(tmpdir.join('thumbnails')), **kwargs)
+
+
+def test_cache(server, images, tmpdir):
+    cache = get_cache(server, tmpdir)
+    photo = get_photo(1)
+    assert cache.get_cached(photo, 10) is None
+    path = cache.get(photo, 10)
+    assert path.endswith(os.path.join('10', '1_1.jpg'))
+    assert os.path.getsize(path) == 100
+    assert cache.get(photo, 10) == path
+    assert images.urls == [get_photo_url(photo, 10)]
+
+    # replaced photo has another sequence
+    assert cache.get(get_photo(1, Sequence='2'), 10) != path
+    assert len(cache) == 2
+
+    # index is loaded from disk
+    assert len(get_cache(server, tmpdir)) == 2
+    cache.clear()
+    assert len(cache) == 0
+    assert not os.path.exists(path)
+
+
+def test_eviction(server, images, tmpdir):
+    cache = get_cache(server, tmpdir, max_bytes=250)
+    photos = [get_photo(i) for i in range(4)]
+    paths = [cache.get(photos[0], 10), cache.get(photos[1], 10)]
+    # recently used image is kept
+    assert cache.get_cached(photos[0], 10) == paths[0]
+    paths.append(cache.get(photos[2], 10))
+    assert cache.get_cached(photos[1], 10) is None
+    assert not os.path.exists(paths[1])
+    assert cache.get_cached(photos[0], 10) == paths[0]
+    assert cache.bytes == 200
+
+    cache.get(photos[3], 10)
+    assert cache.get_cached(photos[2], 10) is None
+    assert len(cache) == 2
+
+
+def test_prewarm_photoset(server, images, tmpdir):
+    cache = get_cache(server, tmpdir, workers=2)
+    photoset = AttrDict({'$type': 'PhotoSet', 'Id': 1})
+    report = cache.prewarm_photoset(photoset, sizes=(10, 4))
+    assert (len(report.completed), len(report.skipped), len(report.failed)) == (10, 0, 0)
+    assert server.get_methods() == ['LoadPhotoSetPhotos']
+    assert all(cache.get_cached(get_photo(i), 4) for i in range(5))
+
+    # photos of the photoset are used when loaded already
+    photoset.Photos = [get_photo(i) for i in range(2)]
+    report = cache.prewarm_photoset(photoset, sizes=(10, 2))
+    assert (len(report.completed), len(report.skipped)) == (2, 2)
+    assert server.get_methods() == ['LoadPhotoSetPhotos']
+    assert len(images.urls) == 12
+
+
+def test_prewarm_failure(server, images, tmpdir):
+    server.methods['download'] = lambda url, params, headers: (404, 'Not Found')
+    cache = get_cache(server, tmpdir)
+    report = cache.prewarm([get_photo(1)], sizes=(10,))
+    assert len(report.failed) == 1
+    assert len(cache) == 0
+    assert os.listdir(str(tmpdir.join('thumbnails', '10'))) == []
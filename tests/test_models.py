@@ -0,0 +1,34 @@
+from __future__ import print_function, unicode_literals
+import json
+
+import six
+
+from pyzenfolio import models
+from pyzenfolio.models import Photo, decode_model
+from pyzenfolio.utils import decode_json
+
+
+def decode_photos(owner, count):
+    content = json.dumps([{'$type': 'Photo', 'Id': i, 'Owner': owner, 'Title': 'photo'}
+                          for i in range(count)])
+    return decode_json(content, decode_model)
+
+
+def test_intern():
+    first, second = decode_photos('photographer', 2), decode_photos('photographer', 1)
+    assert all(isinstance(i, Photo) for i in first + second)
+    assert first[0].Owner is first[1].Owner is second[0].Owner
+    assert first[0].Title is not first[1].Title
+
+
+def test_intern_fallback_is_bounded(monkeypatch):
+    # lookup table is only used on Python 2
+    monkeypatch.setattr(six, 'PY3', False)
+    monkeypatch.setattr(models, 'INTERNED', {})
+    monkeypatch.setattr(models, 'INTERNED_MAX_SIZE', 3)
+    owners = ['owner {0}'.format(i) for i in range(5)]
+    first = [decode_photos(i, 1)[0].Owner for i in owners]
+    second = [decode_photos(i, 1)[0].Owner for i in owners]
+    assert len(models.INTERNED) == 3
+    assert [a is b for a, b in zip(first, second)] == [True] * 3 + [False] * 2
+    assert first == second == owners
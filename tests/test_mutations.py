@@ -0,0 +1,122 @@
+from __future__ import print_function, unicode_literals
+import threading
+
+import pytest
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.exceptions import ZenfolioError
+from pyzenfolio.mutations import MutationQueue
+from pyzenfolio.transport import LocalTransport
+
+from .conftest import AUTH, RPCError, Server
+
+
+class Photos(Server):
+    """
+    Server which keeps photoset of each photo and fails
+    moves of photos which are not in the source photoset.
+    """
+
+    def __init__(self, locations):
+        super(Photos, self).__init__(
+            UpdatePhoto=self.update,
+            MovePhoto=lambda src, photo_id, dest, index: self.move(src, dest, [photo_id]),
+            MovePhotos=self.move,
+            DeletePhotos=self.delete,
+            CollectionAddPhoto=lambda coll_id, photo_id: None,
+        )
+        self.locations = dict(locations)
+        self.titles = {}
+        self.state_lock = threading.Lock()
+
+    def update(self, photo_id, updater):
+        self.titles[photo_id] = updater.get('Title')
+        return {'Id': photo_id}
+
+    def move(self, src, dest, photo_ids):
+        with self.state_lock:
+            for photo_id in photo_ids:
+                if self.locations.get(photo_id) != src:
+                    raise RPCError('E_INVALIDPARAM', 'Photo is not in {0}'.format(src))
+            for photo_id in photo_ids:
+                self.locations[photo_id] = dest
+
+    def delete(self, photo_ids):
+        with self.state_lock:
+            for photo_id in photo_ids:
+                del self.locations[photo_id]
+
+
+def get_queue(server, **kwargs):
+    api = PyZenfolio(auth=dict(AUTH), transport=LocalTransport(server))
+    return MutationQueue(api, **kwargs)
+
+
+def test_coalesce():
+    server = Photos({i: 1 for i in range(10)})
+    queue = get_queue(server)
+    first = queue.UpdatePhoto(1, {'Title': 'a'})
+    second = queue.UpdatePhoto(1, {'Caption': 'b'})
+    for i in range(5):
+        queue.MovePhoto(1, i + 2, 2)
+    queue.CollectionAddPhoto(100, 9)
+    queue.CollectionAddPhoto(100, 9)
+    queue.DeletePhoto(8)
+    report = queue.flush()
+
+    assert server.get_methods() == ['UpdatePhoto', 'CollectionAddPhoto', 'MovePhotos',
+                                    'DeletePhotos']
+    assert server.calls[0][1][1]['Title'] == 'a'
+    assert server.calls[0][1][1]['Caption'] == 'b'
+    assert first.future.result() is second.future.result()
+    assert report.requests == 4
+    assert len(report.completed) == 10
+    assert 8 not in server.locations
+    assert server.locations[6] == 2
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_photo_order(workers):
+    photos = list(range(20))
+    server = Photos({i: 1 for i in photos})
+    queue = get_queue(server, workers=workers, batch_size=1)
+    for i in photos:
+        queue.MovePhoto(1, i, 2)
+        queue.MovePhoto(2, i, 3, 0)
+        queue.UpdatePhoto(i, {'Title': 'first'})
+        queue.MovePhoto(3, i, 4)
+        queue.UpdatePhoto(i, {'Title': 'second'})
+    report = queue.flush()
+
+    assert not report.failed
+    assert set(server.locations.values()) == {4}
+    assert set(server.titles.values()) == {'second'}
+
+
+def test_delete_after_move():
+    server = Photos({1: 1, 2: 1})
+    queue = get_queue(server, workers=4, batch_size=1)
+    queue.MovePhoto(1, 1, 2)
+    queue.DeletePhoto(2)
+    queue.DeletePhoto(1)
+    report = queue.flush()
+    assert not report.failed
+    assert server.locations == {}
+
+
+def test_failures():
+    server = Photos({1: 1})
+    queue = get_queue(server)
+    mutation = queue.MovePhoto(5, 1, 2)
+    report = queue.flush()
+    assert len(report.failed) == 1
+    with pytest.raises(ZenfolioError):
+        mutation.future.result()
+
+
+def test_max_size():
+    server = Photos({i: 1 for i in range(3)})
+    queue = get_queue(server, max_size=3)
+    for i in range(3):
+        queue.MovePhoto(1, i, 2)
+    assert server.get_methods() == ['MovePhotos']
@@ -0,0 +1,85 @@
+from __future__ import print_function, unicode_literals
+import threading
+
+import pytest
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.pagination import iter_items
+from pyzenfolio.transport import LocalTransport
+
+from .conftest import Server
+
+
+class Pages(object):
+    """
+    ``fetch`` of ``count`` items which records requested offsets
+    and the thread which fetched them.
+    """
+
+    def __init__(self, count, key=None):
+        self.items = list(range(count))
+        self.key = key
+        self.offsets = []
+        self.threads = set()
+
+    def __call__(self, offset, limit):
+        self.offsets.append(offset)
+        self.threads.add(threading.current_thread())
+        page = self.items[offset:offset + limit]
+        return {self.key: page} if self.key else page
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+@pytest.mark.parametrize('count, offsets', [
+    (7, [0, 5]),
+    # full last page is followed by an empty one
+    (10, [0, 5, 10]),
+    (4, [0]),
+    (0, [0]),
+])
+def test_page_boundaries(prefetch, count, offsets):
+    pages = Pages(count)
+    assert list(iter_items(pages, 5, prefetch)) == list(range(count))
+    assert pages.offsets == offsets
+
+
+def test_key_and_empty_page():
+    pages = Pages(6, key='Photos')
+    assert list(iter_items(pages, 5, key='Photos')) == list(range(6))
+    assert list(iter_items(lambda offset, limit: None, 5)) == []
+    assert list(iter_items(lambda offset, limit: {'Photos': None}, 5, key='Photos')) == []
+
+
+@pytest.mark.parametrize('prefetch', [1, 2])
+def test_stop_early(prefetch):
+    pages = Pages(1000)
+    items = iter_items(pages, 5, prefetch)
+    assert [next(items) for _ in range(7)] == list(range(7))
+    items.close()
+
+    producer, = pages.threads
+    producer.join(5)
+    assert not producer.is_alive()
+    # producer is at most prefetch pages ahead of the consumer
+    assert len(pages.offsets) <= prefetch + 3
+
+
+def test_error():
+    def fetch(offset, limit):
+        if offset:
+            raise IOError('Connection reset by peer')
+        return list(range(limit))
+
+    items = iter_items(fetch, 5)
+    assert [next(items) for _ in range(5)] == list(range(5))
+    with pytest.raises(IOError):
+        next(items)
+
+
+def test_iter_photoset_photos():
+    photos = [{'Id': i} for i in range(12)]
+    server = Server(LoadPhotoSetPhotos=lambda set_id, start, limit: photos[start:start + limit])
+    api = PyZenfolio(auth={'username': 'foo', 'token': 'token'},
+                     transport=LocalTransport(server))
+    assert [i.Id for i in api.iter_photoset_photos(1, page_size=5)] == list(range(12))
+    assert [params[1] for _, params, _ in server.calls] == [0, 5, 10]
@@ -0,0 +1,48 @@
+from __future__ import print_function, unicode_literals
+import threading
+
+from pyzenfolio.pool import PooledPyZenfolio
+from pyzenfolio.transport import LocalTransport
+
+from .conftest import AUTH
+from .test_auth import Accounts, run_threads
+
+
+def test_connections_are_reused(fake_zenfolio):
+    photo_ids = list(range(1, 11))
+    with PooledPyZenfolio(auth=dict(AUTH), endpoint=fake_zenfolio.endpoint,
+                          pool_maxsize=4) as api:
+        sessions = set()
+        lock = threading.Lock()
+
+        def load():
+            for photo_id in photo_ids * 5:
+                assert api.LoadPhoto(photo_id).Id == photo_id
+            with lock:
+                sessions.add(api.session)
+
+        run_threads(8, load)
+        pools = api.transport.adapter.poolmanager.pools
+        pool, = [pools[i] for i in pools.keys()]
+        # 400 calls of 8 threads over at most pool_maxsize connections
+        assert 1 <= pool.num_connections <= 4
+        assert pool.num_requests == 400
+        assert len(sessions) == 8
+
+
+def test_reauthenticate_once():
+    server = Accounts()
+    api = PooledPyZenfolio(auth={'username': 'photographer', 'password': 'secret',
+                                 'token': 'expired'},
+                           transport=LocalTransport(server))
+    barrier = threading.Barrier(8)
+
+    def load():
+        # all threads find the token expired at once
+        barrier.wait()
+        for i in range(20):
+            assert api.LoadPhoto(i).Id == i
+
+    run_threads(8, load)
+    assert server.get_methods().count('Authenticate') == 1
+    assert api.auth.token == 'token1'
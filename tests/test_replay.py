@@ -0,0 +1,87 @@
+from __future__ import print_function, unicode_literals
+
+import pytest
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.exceptions import ReplayError
+from pyzenfolio.replay import ReplayTransport
+from pyzenfolio.transport import LocalTransport
+
+from .conftest import Server
+
+
+@pytest.fixture
+def server():
+    tokens = iter(range(1, 100))
+    return Server(
+        GetChallenge=lambda username: {'PasswordSalt': [1, 2], 'Challenge': [3, 4]},
+        Authenticate=lambda challenge, proof: 'token{0}'.format(next(tokens)),
+        GetDownloadOriginalKey=lambda photo_ids, password: 'key',
+        LoadPhoto=lambda photo_id, level='Level1': {'Id': photo_id, 'Title': 'Photo'},
+        DeletePhoto=lambda photo_id: None,
+    )
+
+
+def get_api(transport, token=None):
+    auth = {'username': 'photographer', 'password': 'secret'}
+    if token:
+        auth['token'] = token
+    return PyZenfolio(auth=auth, transport=transport)
+
+
+def test_record_and_replay(server, tmpdir):
+    path = str(tmpdir.join('calls.db'))
+    transport = ReplayTransport(path, transport=LocalTransport(server))
+    api = get_api(transport)
+    api.Authenticate()
+    assert api.LoadPhoto(1).Title == 'Photo'
+    api.DeletePhoto(1)
+    assert len(transport) == 1
+    assert transport.recorded == {'LoadPhoto': 1}
+
+    replay = ReplayTransport(path, mode='replay')
+    api = get_api(replay, token='offline')
+    photo = api.LoadPhoto(1)
+    assert photo.Id == 1
+    assert replay.hits == {'LoadPhoto': 1}
+    with pytest.raises(ReplayError):
+        api.LoadPhoto(2)
+    with pytest.raises(ReplayError):
+        api.DeletePhoto(1)
+
+
+def test_auth_calls_are_not_recorded(server, tmpdir):
+    path = str(tmpdir.join('calls.db'))
+    api = get_api(ReplayTransport(path, transport=LocalTransport(server)))
+    api.Authenticate()
+    api.GetDownloadOriginalKey([1], 'secret')
+    api.LoadPhoto(1)
+
+    # second client authenticates live and gets its own token
+    transport = ReplayTransport(path, transport=LocalTransport(server))
+    api = get_api(transport)
+    assert api.Authenticate() == 'token2'
+    api.LoadPhoto(1)
+    assert server.get_methods().count('Authenticate') == 2
+    assert server.get_methods().count('LoadPhoto') == 1
+    assert len(transport) == 1
+
+    content = b''
+    for name in tmpdir.listdir():
+        content += name.read_binary()
+    assert b'secret' not in content
+    assert b'token1' not in content
+
+    with pytest.raises(ReplayError):
+        get_api(ReplayTransport(path, mode='replay')).Authenticate()
+
+
+def test_replay_batch(server, tmpdir):
+    path = str(tmpdir.join('calls.db'))
+    api = get_api(ReplayTransport(path, transport=LocalTransport(server)), token='token')
+    api.call_many([('LoadPhoto', [1]), ('LoadPhoto', [2])])
+
+    transport = ReplayTransport(path, mode='replay')
+    api = get_api(transport, token='other')
+    assert [i.Id for i in api.call_many([('LoadPhoto', [2]), ('LoadPhoto', [1])])] == [2, 1]
+    assert transport.hits == {'LoadPhoto': 2}
@@ -0,0 +1,150 @@
+from __future__ import print_function, unicode_literals
+import asyncio
+import json
+
+import pytest
+
+from pyzenfolio.aio import AsyncPyZenfolio
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.exceptions import CircuitOpenError, HTTPError
+from pyzenfolio.retry import CircuitBreaker, RetryPolicy
+from pyzenfolio.transport import LocalTransport
+
+from .conftest import AUTH, Server
+
+
+class Flaky(Server):
+    """
+    Server which responds with queued ``statuses`` (or bodies) first.
+    """
+
+    def __init__(self, *statuses):
+        super(Flaky, self).__init__(LoadPhoto=lambda photo_id, level: {'Id': photo_id},
+                                    DeletePhoto=lambda photo_id: None)
+        self.statuses = list(statuses)
+
+    def __call__(self, method, url, params, data, headers):
+        if self.statuses:
+            status = self.statuses.pop(0)
+            with self.lock:
+                self.calls.append((json.loads(data.decode('utf-8'))['method'], None, None))
+            return status if isinstance(status, tuple) else (status, '')
+        return super(Flaky, self).__call__(method, url, params, data, headers)
+
+
+def get_api(server, **kwargs):
+    return PyZenfolio(auth=dict(AUTH), transport=LocalTransport(server), **kwargs)
+
+
+def test_retry(monkeypatch):
+    monkeypatch.setattr('time.sleep', lambda delay: None)
+    server = Flaky(503, 502)
+    api = get_api(server, retry=RetryPolicy(retries=3))
+    assert api.LoadPhoto(1).Id == 1
+    assert server.get_methods() == ['LoadPhoto'] * 3
+
+
+def test_no_retry_of_mutations_and_client_errors(monkeypatch):
+    monkeypatch.setattr('time.sleep', lambda delay: None)
+    api = get_api(Flaky(503), retry=RetryPolicy(retries=3))
+    with pytest.raises(HTTPError):
+        api.DeletePhoto(1)
+
+    api = get_api(Flaky(400), retry=RetryPolicy(retries=3))
+    with pytest.raises(HTTPError):
+        api.LoadPhoto(1)
+
+
+def test_retry_after_too_long():
+    policy = RetryPolicy(max_delay=5)
+    error = HTTPError('url', 503, {'Retry-After': '60'}, b'')
+    assert policy.get_delay(0, error) is None
+    error = HTTPError('url', 503, {'Retry-After': '2'}, b'')
+    assert policy.get_delay(0, error) == 2
+
+
+def test_circuit_breaker_transitions():
+    breaker = CircuitBreaker(threshold=2, timeout=0)
+    api = get_api(Flaky(503, 503, 503), circuit_breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(HTTPError):
+            api.LoadPhoto(1)
+    assert breaker.state == breaker.OPEN
+
+    # failed probe opens the circuit again
+    with pytest.raises(HTTPError):
+        api.LoadPhoto(1)
+    assert breaker.state == breaker.OPEN
+
+    # successful probe closes it
+    assert api.LoadPhoto(1).Id == 1
+    assert breaker.state == breaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_circuit_breaker_open():
+    breaker = CircuitBreaker(threshold=1, timeout=60)
+    server = Flaky(500)
+    api = get_api(server, circuit_breaker=breaker)
+    with pytest.raises(HTTPError):
+        api.LoadPhoto(1)
+    with pytest.raises(CircuitOpenError):
+        api.LoadPhoto(1)
+    assert server.requests == 0
+
+
+def test_circuit_breaker_client_errors_close():
+    breaker = CircuitBreaker(threshold=1, timeout=0)
+    api = get_api(Flaky(503, 404), circuit_breaker=breaker)
+    with pytest.raises(HTTPError):
+        api.LoadPhoto(1)
+    with pytest.raises(HTTPError):
+        api.LoadPhoto(1)
+    assert breaker.state == breaker.CLOSED
+
+
+@pytest.mark.parametrize('response', [
+    (200, '<html>Service Unavailable</html>'),
+    (200, '{"id": 1, "result": {'),
+])
+def test_probe_with_non_http_error(response):
+    breaker = CircuitBreaker(threshold=1, timeout=0)
+    api = get_api(Flaky(503, response), circuit_breaker=breaker)
+    with pytest.raises(HTTPError):
+        api.LoadPhoto(1)
+    with pytest.raises(Exception):
+        api.LoadPhoto(1)
+    assert breaker.probing == 0
+    # next call is let through rather than failing with CircuitOpenError
+    assert api.LoadPhoto(1).Id == 1
+
+
+def test_cancelled_probe_frees_slot(fake_zenfolio):
+    breaker = CircuitBreaker(threshold=1, timeout=0)
+
+    async def main():
+        async with AsyncPyZenfolio(auth=dict(AUTH), endpoint=fake_zenfolio.endpoint,
+                                   circuit_breaker=breaker) as api:
+            breaker.record_failure(HTTPError('url', 503, {}, b''))
+            task = asyncio.ensure_future(api.LoadPhoto(1))
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert breaker.probing == 0
+            return await api.LoadPhoto(1)
+
+    assert asyncio.run(main()).Id == 1
+    assert breaker.state == breaker.CLOSED
+
+
+def test_release():
+    breaker = CircuitBreaker(threshold=1, timeout=0)
+    breaker.record_failure(HTTPError('url', 503, {}, b''))
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+    assert breaker.probing == 1
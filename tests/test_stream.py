@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, unicode_literals
+import json
+
+import pytest
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.exceptions import APIError, TransportError, ZenfolioError
+from pyzenfolio.stream import ResponseParser
+from pyzenfolio.transport import LocalTransport
+from pyzenfolio.utils import decode_json
+
+from .conftest import RPCError, Server
+
+
+ITEMS = [
+    1.5, 12.25, -3, 1e-7, -2.5E+10, 0, 7, True, None, 'žluťoučký kůň',
+    {'Id': 1, 'Ratio': 0.125, 'Tags': ['a', 'b'], 'Nested': {'Value': -0.5}},
+    {'$type': 'DateTime', 'Value': '2014-01-02 03:04:05'},
+    [], {}, '',
+]
+PAYLOAD = json.dumps({
+    'id': 1,
+    'result': {'Title': 'Gallery', 'Views': 10.5, 'Photos': ITEMS, 'Size': 2.75},
+    'error': None,
+}, ensure_ascii=False).encode('utf-8')
+
+
+def parse(chunks, path=('result', 'Photos')):
+    parser = ResponseParser(path)
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    items.extend(parser.close())
+    return parser, items
+
+
+def test_parse():
+    parser, items = parse([PAYLOAD])
+    assert items == decode_json(PAYLOAD).result.Photos
+    assert parser.fields == {'Title': 'Gallery', 'Views': 10.5, 'Size': 2.75}
+    assert parser.envelope == {'id': 1, 'error': None}
+
+
+def test_split_at_every_offset():
+    expected = decode_json(PAYLOAD).result.Photos
+    for i in range(len(PAYLOAD) + 1):
+        parser, items = parse([PAYLOAD[:i], PAYLOAD[i:]])
+        assert items == expected, i
+        assert parser.fields['Size'] == 2.75
+
+
+def test_byte_by_byte():
+    chunks = [PAYLOAD[i:i + 1] for i in range(len(PAYLOAD))]
+    assert parse(chunks)[1] == decode_json(PAYLOAD).result.Photos
+
+
+def test_split_number():
+    assert parse([b'{"id": 1, "result": [1.5, 12.', b'25, 3]}'], ('result',))[1] == [1.5, 12.25, 3]
+    assert parse([b'{"result": [1e', b'-3, -', b'2]}'], ('result',))[1] == [1e-3, -2]
+
+
+@pytest.mark.parametrize('payload', [
+    b'{"id": 1, "result": [1, 2',
+    b'{"id": 1, "result": [1 2]}',
+    b'{"id": 1, "result": [1.]}',
+])
+def test_invalid(payload):
+    with pytest.raises(APIError):
+        parse([payload], ('result',))
+
+
+def test_stream_error(api, server):
+    def load(set_id, start, limit):
+        raise RPCError('E_NOSUCHOBJECT', 'No such photoset')
+
+    server.methods['LoadPhotoSetPhotos'] = load
+    with pytest.raises(ZenfolioError) as e:
+        list(api.stream_photoset_photos(1))
+    assert e.value.code == 'E_NOSUCHOBJECT'
+
+
+def test_stream_photoset():
+    # response is longer than STREAM_CHUNK_SIZE
+    server = Server(LoadPhotoSet=lambda set_id, level, include_photos: {
+        'Id': set_id, 'Photos': [{'Id': i, 'Ratio': i / 3.0} for i in range(5000)]})
+    api = PyZenfolio(auth={'token': 'token'}, transport=LocalTransport(server))
+    photos = list(api.stream_photoset(1))
+    assert [i.Ratio for i in photos] == [i / 3.0 for i in range(5000)]
+
+
+class BrokenTransport(LocalTransport):
+    """
+    Transport whose streamed responses fail after the first chunk
+    with an error which is not a ``requests`` exception.
+    """
+
+    def request(self, *args, **kwargs):
+        response = super(BrokenTransport, self).request(*args, **kwargs)
+        content = response.content
+
+        def iter_content(chunk_size=1):
+            yield content[:chunk_size]
+            raise IOError('Connection reset by peer')
+
+        response.iter_content = iter_content
+        return response
+
+
+def test_stream_read_error():
+    server = Server(LoadPhotoSet=lambda set_id, level, include_photos: {
+        'Id': set_id, 'Photos': [{'Id': i} for i in range(5000)]})
+    api = PyZenfolio(auth={'token': 'token'}, transport=BrokenTransport(server))
+    photos = []
+    with pytest.raises(TransportError) as e:
+        for photo in api.stream_photoset(1):
+            photos.append(photo)
+    assert 'Connection reset' in str(e.value)
+    assert photos
@@ -0,0 +1,140 @@
+from __future__ import print_function, unicode_literals
+import json
+
+import pytest
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.sync import AccountSync, Snapshot
+from pyzenfolio.transport import LocalTransport
+
+from .conftest import RPCError, Server
+
+
+def get_photoset(photoset_id, title, photo_ids, modified='2020-01-01 00:00:00'):
+    return {'$type': 'PhotoSet', 'Id': photoset_id, 'Title': title,
+            'PhotoCount': len(photo_ids), 'Photos': [{'Id': i} for i in photo_ids],
+            'ModifiedOn': {'$type': 'DateTime', 'Value': modified}}
+
+
+class Account(Server):
+    """
+    Account of groups ``1`` (root) and ``2`` and photosets in
+    ``photosets`` placed into groups by ``parents``.
+    """
+
+    def __init__(self):
+        super(Account, self).__init__(LoadGroupHierarchy=self.load_hierarchy,
+                                      LoadPhotoSet=self.load_photoset)
+        self.photosets = {
+            10: get_photoset(10, 'Wedding', [100, 101]),
+            11: get_photoset(11, 'Birthday', [110]),
+        }
+        self.parents = {10: 1, 11: 2}
+        self.failing = set()
+
+    def load_hierarchy(self, username):
+        def get_elements(group_id):
+            # hierarchy has no photos of photosets
+            return [dict((k, v) for k, v in self.photosets[i].items() if k != 'Photos')
+                    for i in sorted(self.photosets) if self.parents[i] == group_id]
+
+        group = {'$type': 'Group', 'Id': 2, 'Title': 'Family', 'Elements': get_elements(2)}
+        return {'$type': 'Group', 'Id': 1, 'Title': 'photographer',
+                'Elements': [group] + get_elements(1)}
+
+    def load_photoset(self, photoset_id, level, include_photos):
+        if photoset_id in self.failing:
+            raise RPCError('E_UNSPECIFIED', 'Temporary failure')
+        return self.photosets[photoset_id]
+
+
+@pytest.fixture
+def account():
+    return Account()
+
+
+def get_sync(account, path):
+    api = PyZenfolio(auth={'username': 'foo', 'token': 'token'},
+                     transport=LocalTransport(account))
+    return AccountSync(api, path)
+
+
+def test_initial_sync(account, tmpdir):
+    path = str(tmpdir.join('snapshot.json'))
+    changes = get_sync(account, path).sync()
+    assert sorted(changes.added) == [1, 2, 10, 11]
+    assert not changes.modified and not changes.deleted and not changes.failed
+    assert sorted(changes.photosets) == [10, 11]
+    assert changes.photos_added == {10: [100, 101], 11: [110]}
+
+    # nothing changed hence no photoset is loaded
+    del account.calls[:]
+    changes = get_sync(account, path).sync()
+    assert not changes
+    assert account.get_methods() == ['LoadGroupHierarchy']
+
+
+def test_moved_modified_and_deleted(account, tmpdir):
+    path = str(tmpdir.join('snapshot.json'))
+    get_sync(account, path).sync()
+
+    account.parents[11] = 1
+    account.photosets[10] = get_photoset(10, 'Wedding', [101, 102], '2020-02-01 00:00:00')
+    account.photosets[12] = get_photoset(12, 'Holiday', [120])
+    account.parents[12] = 2
+    del account.photosets[11], account.parents[11]
+    account.photosets[13] = get_photoset(13, 'Birthday', [110])
+    account.parents[13] = 1
+
+    del account.calls[:]
+    changes = get_sync(account, path).sync()
+    assert sorted(changes.added) == [12, 13]
+    assert changes.modified == [10]
+    assert changes.deleted == [11]
+    assert changes.photos_added == {10: [102], 12: [120], 13: [110]}
+    assert changes.photos_deleted == {10: [100]}
+    loaded = sorted(params[0] for method, params, _ in account.calls if method == 'LoadPhotoSet')
+    assert loaded == [10, 12, 13]
+
+    # photoset moved into another group without being modified
+    account.parents[12] = 1
+    changes = get_sync(account, path).sync()
+    assert changes.moved == [12]
+    assert not changes.modified and not changes.photosets
+    assert 12 in changes.elements
+
+
+def test_failed_photoset_is_retried(account, tmpdir):
+    path = str(tmpdir.join('snapshot.json'))
+    account.failing.add(11)
+    changes = get_sync(account, path).sync()
+    assert list(changes.failed) == [11]
+    assert sorted(changes.photosets) == [10]
+
+    account.failing.clear()
+    changes = get_sync(account, path).sync()
+    assert changes.added == [11]
+    assert sorted(changes.photosets) == [11]
+    assert changes.photos_added == {11: [110]}
+
+    assert not get_sync(account, path).sync()
+
+
+def test_snapshot_save_and_load(account, tmpdir):
+    path = str(tmpdir.join('snapshot.json'))
+    sync = get_sync(account, path)
+    sync.sync()
+
+    snapshot = Snapshot(path)
+    assert snapshot.elements == sync.snapshot.elements
+    assert snapshot.photos == {10: [100, 101], 11: [110]}
+    assert snapshot.elements[10]['ModifiedOn'] == '2020-01-01 00:00:00'
+    assert snapshot.elements[11]['parent'] == 2
+    # saved atomically without leftover temporary files
+    assert [i.basename for i in tmpdir.listdir()] == ['snapshot.json']
+
+    # snapshots of other versions are ignored
+    with open(path, 'w') as fid:
+        json.dump({'version': Snapshot.VERSION + 1, 'elements': {}, 'photos': {}}, fid)
+    assert Snapshot(path).elements == {}
+    assert Snapshot().elements == {}
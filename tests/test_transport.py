@@ -0,0 +1,32 @@
+from __future__ import print_function, unicode_literals
+import threading
+
+import requests
+
+from pyzenfolio.aio import AsyncPyZenfolio
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.pool import PooledPyZenfolio
+from pyzenfolio.transport import LocalTransport
+
+from .conftest import AUTH
+
+
+def test_session():
+    api = PyZenfolio(auth=dict(AUTH))
+    assert isinstance(api.session, requests.Session)
+    assert api.session is api.transport.session
+
+    # each thread has its own session
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(api.session))
+    thread.start()
+    thread.join()
+    assert isinstance(sessions[0], requests.Session)
+    assert sessions[0] is not api.session
+
+    with PooledPyZenfolio(auth=dict(AUTH)) as api:
+        assert isinstance(api.session, requests.Session)
+
+    api = PyZenfolio(auth=dict(AUTH), transport=LocalTransport(lambda *args: ''))
+    assert api.session is None
+    assert AsyncPyZenfolio(auth=dict(AUTH)).session is None
@@ -0,0 +1,119 @@
+from __future__ import print_function, unicode_literals
+import itertools
+import json
+import threading
+import time
+
+from pyzenfolio.api import PyZenfolio
+from pyzenfolio.transport import LocalTransport
+from pyzenfolio.upload import BulkUploader
+from pyzenfolio.utils import AttrDict
+
+from .conftest import HTTPStatus, Server
+
+
+PHOTOSET = AttrDict({'$type': 'PhotoSet', 'Id': 1,
+                     'UploadUrl': 'https://up.zenfolio.com/1'})
+
+
+class Uploads(object):
+    """
+    Upload handler which returns new photo ids and fails uploads
+    while ``failures`` is not exhausted.
+    """
+
+    def __init__(self, failures=0, delay=None):
+        self.ids = itertools.count(100)
+        self.failures = failures
+        self.delay = delay
+        self.uploaded = []
+        self.lock = threading.Lock()
+
+    def __call__(self, url, params, data):
+        if self.delay is not None:
+            self.delay()
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise HTTPStatus(500, 'Upload failed')
+            self.uploaded.append(params['filename'])
+            return '{0}'.format(next(self.ids))
+
+
+def get_uploader(uploads, tmpdir, **kwargs):
+    api = PyZenfolio(auth={'username': 'foo', 'token': 'token'},
+                     transport=LocalTransport(Server(upload=uploads)))
+    return BulkUploader(api, PHOTOSET, index=str(tmpdir.join('index.db')), **kwargs)
+
+
+def write_files(tmpdir, contents):
+    paths = []
+    for name, content in sorted(contents.items()):
+        path = tmpdir.join('photos', name)
+        path.write_binary(content, ensure=True)
+        paths.append(str(path))
+    return paths
+
+
+def test_skipped_files_are_reported(tmpdir):
+    paths = write_files(tmpdir, {'a.jpg': b'a', 'b.jpg': b'b', 'copy.jpg': b'a'})
+    uploads = Uploads()
+    processed = []
+    uploader = get_uploader(uploads, tmpdir, workers=1, manifest=str(tmpdir.join('manifest')),
+                            callback=lambda *args: processed.append(args))
+
+    report = uploader.upload(paths)
+    assert (len(report.completed), len(report.skipped)) == (2, 1)
+    assert sorted(uploads.uploaded) == ['a.jpg', 'b.jpg']
+    ids = dict((path, photo_id) for path, photo_id, _ in processed)
+    assert ids == {paths[0]: 100, paths[1]: 101, paths[2]: 100}
+    assert sorted(i[1] for i in report.completed) == [100, 101]
+
+    # files in the manifest are skipped with their photo ids
+    del processed[:]
+    report = uploader.upload(paths)
+    assert (len(report.completed), len(report.skipped)) == (0, 3)
+    assert dict((path, photo_id) for path, photo_id, _ in processed) == ids
+    with open(str(tmpdir.join('manifest'))) as fid:
+        assert sorted(json.loads(i)['photo'] for i in fid) == [100, 101]
+    assert all(error is None for _, _, error in processed)
+    uploader.close()
+
+
+def test_twin_uploaded_when_original_fails(tmpdir):
+    paths = write_files(tmpdir, {'a.jpg': b'same', 'b.jpg': b'same'})
+    hashed = threading.Semaphore(0)
+
+    def delay():
+        # first upload waits until the twin is hashed and waits for it
+        uploads.delay = None
+        hashed.acquire()
+        hashed.acquire()
+        time.sleep(0.1)
+
+    uploads = Uploads(failures=1, delay=delay)
+    uploader = get_uploader(uploads, tmpdir, workers=2)
+    index_hash = uploader.index.hash
+
+    def hash_file(path):
+        try:
+            return index_hash(path)
+        finally:
+            hashed.release()
+
+    uploader.index.hash = hash_file
+
+    report = uploader.upload(paths)
+    assert (len(report.completed), len(report.failed), len(report.skipped)) == (1, 1, 0)
+    assert len(uploads.uploaded) == 1
+    assert not uploader.uploading
+    uploader.close()
+
+
+def test_close(tmpdir):
+    paths = write_files(tmpdir, {'a.jpg': b'a', 'b.jpg': b'b'})
+    uploader = get_uploader(Uploads(), tmpdir, workers=2)
+    uploader.upload(paths)
+    assert uploader.index.connections
+    uploader.close()
+    assert not uploader.index.connections